@@ -153,6 +153,12 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
               cmdline="--ext",
               default=None),
 
+    StrOption("preimport",
+              "Comma-separated list of app-level modules to import at "
+              "translation time, so that they are prebuilt in sys.modules",
+              cmdline="--preimport",
+              default=None),
+
     BoolOption("translationmodules",
           "use only those modules that are needed to run translate.py on pypy",
                default=False,
@@ -179,6 +185,10 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                "make sure that all calls go through space.call_args",
                default=False),
 
+    BoolOption("superinstructions",
+               "run common pairs of bytecodes in one step when not jitted",
+               default=False),
+
     OptionDescription("std", "Standard Object Space Options", [
         BoolOption("withtproxy", "support transparent proxies",
                    default=True),
@@ -198,6 +208,10 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
         BoolOption("withstrbuf", "use strings optimized for addition (ver 2)",
                    default=False),
 
+        BoolOption("withunicodebuf",
+                   "use unicode strings optimized for addition",
+                   default=False),
+
         BoolOption("withprebuiltchar",
                    "use prebuilt single-character string objects",
                    default=False),
@@ -223,6 +237,11 @@ pypy_optiondescription = OptionDescription("objspace", "Object Space Options", [
                              ("objspace.std.withtypeversion", True),
                        ]),
 
+        BoolOption("withmapdictkwargs",
+                   "use map-based shared-key dicts for **kwargs",
+                   default=False,
+                   requires=[("objspace.std.withmapdict", True)]),
+
         BoolOption("withrangelist",
                    "enable special range list implementation that does not "
                    "actually create the full list until the resulting "
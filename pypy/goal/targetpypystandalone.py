@@ -186,6 +186,50 @@ def create_entry_point(space, w_dict):
                          'pypy_setup_home': pypy_setup_home}
 
 
+def preimport_modules(space, modulenames):
+    """NOT_RPYTHON: import the given app-level modules from the stdlib of
+    this source tree.  Called at translation time, this leaves the module
+    objects in sys.modules, where they become part of the prebuilt heap:
+    importing them later needs no filesystem access at all.  Avoid modules
+    whose import depends on the environment, like 'site'.
+
+    The modules remember where they were imported from; pypy_find_stdlib()
+    moves their __file__ and __path__ to the stdlib found at startup.
+    """
+    from pypy.module.sys.initpath import compute_stdlib_path
+    from pypy.module.sys.state import get as get_state
+    w_preimport = space.appexec([], """():
+        def preimport(path, name):
+            import sys
+            saved_path = sys.path[:]
+            saved_modules = set(sys.modules)
+            sys.path[:] = path
+            try:
+                __import__(name)
+            finally:
+                sys.path[:] = saved_path
+            return [module for modname, module in sys.modules.items()
+                    if modname not in saved_modules and module is not None]
+        return preimport
+    """)
+    prefix = os.path.dirname(pypydir)
+    stdlib_path = compute_stdlib_path(None, prefix)
+    w_stdlib_path = space.newlist([space.wrap(p) for p in stdlib_path])
+    state = get_state(space)
+    for modulename in modulenames:
+        modulename = modulename.strip()
+        if not modulename:
+            continue
+        try:
+            w_modules = space.call_function(w_preimport, w_stdlib_path,
+                                            space.wrap(modulename))
+        except OperationError, e:
+            raise Exception("cannot pre-import %r: %s" % (
+                modulename, e.errorstr(space)))
+        state.preimported_modules.extend(space.listview(w_modules))
+    state.preimport_prefix = prefix
+
+
 # _____ Define and setup target ___
 
 # for now this will do for option handling
@@ -312,6 +356,9 @@ class PyPyTarget(object):
         w_dict = app.getwdict(space)
         entry_point, _ = create_entry_point(space, w_dict)
 
+        if config.objspace.preimport:
+            preimport_modules(space, config.objspace.preimport.split(','))
+
         return entry_point, None, PyPyAnnotatorPolicy(single_space = space)
 
     def interface(self, ns):
@@ -49,6 +49,50 @@ def cpython_code_signature(code):
     kwargname = varnames[argcount] if code.co_flags & CO_VARKEYWORDS else None
     return Signature(argnames, varargname, kwargname)
 
+# superinstructions: pairs of bytecodes that the interpreter runs in one go
+# when config.objspace.superinstructions is enabled.  co_code is left
+# untouched; instead, _superinstructions has one byte per byte of co_code,
+# which is non-zero where an instruction starts such a pair.
+SUPER_NONE = 0
+SUPER_LOAD_FAST_LOAD_FAST = 1
+SUPER_LOAD_FAST_LOAD_ATTR = 2
+SUPER_COMPARE_OP_POP_JUMP_IF_FALSE = 3
+SUPER_LOAD_CONST_RETURN_VALUE = 4
+
+def _get_superinstruction(op1, op2):
+    if op1 == opcodedesc.LOAD_FAST.index:
+        if op2 == opcodedesc.LOAD_FAST.index:
+            return SUPER_LOAD_FAST_LOAD_FAST
+        if op2 == opcodedesc.LOAD_ATTR.index:
+            return SUPER_LOAD_FAST_LOAD_ATTR
+    elif op1 == opcodedesc.COMPARE_OP.index:
+        if op2 == opcodedesc.POP_JUMP_IF_FALSE.index:
+            return SUPER_COMPARE_OP_POP_JUMP_IF_FALSE
+    elif op1 == opcodedesc.LOAD_CONST.index:
+        if op2 == opcodedesc.RETURN_VALUE.index:
+            return SUPER_LOAD_CONST_RETURN_VALUE
+    return SUPER_NONE
+
+def find_superinstructions(co_code):
+    """Return the string that goes into PyCode._superinstructions."""
+    result = ['\x00'] * len(co_code)
+    i = 0
+    while i < len(co_code):
+        op1 = ord(co_code[i])
+        next = i + 1
+        if op1 >= HAVE_ARGUMENT:
+            next += 2
+        if next >= len(co_code):
+            break
+        op2 = ord(co_code[next])
+        end = next + 1
+        if op2 >= HAVE_ARGUMENT:
+            end += 2
+        if end <= len(co_code):
+            result[i] = chr(_get_superinstruction(op1, op2))
+        i = next
+    return ''.join(result)
+
 
 class PyCode(eval.Code):
     "CPython-style code objects."
@@ -123,6 +167,11 @@ class PyCode(eval.Code):
         if self.space.config.objspace.std.withmapdict:
             from pypy.objspace.std.mapdict import init_mapdict_cache
             init_mapdict_cache(self)
+        if self.space.config.objspace.std.withcelldict:
+            from pypy.objspace.std.celldict import init_global_cache
+            init_global_cache(self)
+        if self.space.config.objspace.superinstructions:
+            self._superinstructions = find_superinstructions(self.co_code)
 
     def _cleanup_(self):
         if (self.magic == cpython_magic and
@@ -16,7 +16,10 @@ from pypy.interpreter import (
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.nestedscope import Cell
-from pypy.interpreter.pycode import PyCode, BytecodeCorruption
+from pypy.interpreter.pycode import (
+    PyCode, BytecodeCorruption, SUPER_NONE, SUPER_LOAD_FAST_LOAD_FAST,
+    SUPER_LOAD_FAST_LOAD_ATTR, SUPER_COMPARE_OP_POP_JUMP_IF_FALSE,
+    SUPER_LOAD_CONST_RETURN_VALUE)
 from pypy.tool.stdlib_opcode import bytecode_spec
 
 def unaryoperation(operationname):
@@ -46,6 +49,11 @@ def binaryoperation(operationname):
 opcodedesc = bytecode_spec.opcodedesc
 HAVE_ARGUMENT = bytecode_spec.HAVE_ARGUMENT
 
+def _read_oparg(co_code, instr):
+    lo = ord(co_code[instr + 1])
+    hi = ord(co_code[instr + 2])
+    return (hi * 256) | lo
+
 class __extend__(pyframe.PyFrame):
     """A PyFrame that knows about interpretation of standard Python opcodes
     minus the ones related to nested scopes."""
@@ -174,6 +182,14 @@ class __extend__(pyframe.PyFrame):
                 next_instr += 3
                 oparg = (oparg * 65536) | (hi * 256) | lo
 
+            if (self.space.config.objspace.superinstructions and
+                    not jit.we_are_jitted() and self.w_f_trace is None):
+                superop = ord(self.pycode._superinstructions[self.last_instr])
+                if superop != SUPER_NONE:
+                    next_instr = self.dispatch_superinstruction(
+                        superop, oparg, co_code, next_instr)
+                    continue
+
             if opcode == opcodedesc.RETURN_VALUE.index:
                 w_returnvalue = self.popvalue()
                 block = self.unrollstack(SReturnValue.kind)
@@ -442,6 +458,43 @@ class __extend__(pyframe.PyFrame):
             if jit.we_are_jitted():
                 return next_instr
 
+    def dispatch_superinstruction(self, superop, oparg, co_code, next_instr):
+        # Runs a pair of instructions found by find_superinstructions(),
+        # without going through the per-instruction work at the start of
+        # dispatch_bytecode().  This is only done if there is no trace
+        # function, and last_instr is updated before the second instruction
+        # so that tracebacks and f_lasti see the usual values.
+        # 'next_instr' is the position of the second instruction.
+        second_instr = next_instr
+        next_instr += 3
+        if superop == SUPER_LOAD_FAST_LOAD_FAST:
+            self.LOAD_FAST(oparg, second_instr)
+            self.last_instr = intmask(second_instr)
+            self.LOAD_FAST(_read_oparg(co_code, second_instr),
+                           next_instr)
+        elif superop == SUPER_LOAD_FAST_LOAD_ATTR:
+            self.LOAD_FAST(oparg, second_instr)
+            self.last_instr = intmask(second_instr)
+            self.LOAD_ATTR(_read_oparg(co_code, second_instr),
+                           next_instr)
+        elif superop == SUPER_COMPARE_OP_POP_JUMP_IF_FALSE:
+            self.COMPARE_OP(oparg, second_instr)
+            self.last_instr = intmask(second_instr)
+            next_instr = self.POP_JUMP_IF_FALSE(
+                _read_oparg(co_code, second_instr), next_instr)
+        elif superop == SUPER_LOAD_CONST_RETURN_VALUE:
+            self.LOAD_CONST(oparg, second_instr)
+            if self.blockstack_non_empty():
+                # let RETURN_VALUE unroll the blocks in the normal way
+                return second_instr
+            self.last_instr = intmask(second_instr)
+            # this is what RETURN_VALUE does when there is no block
+            self.frame_finished_execution = True
+            raise Return
+        else:
+            raise BytecodeCorruption
+        return next_instr
+
     @jit.unroll_safe
     def unrollstack(self, unroller_kind):
         while self.blockstack_non_empty():
@@ -860,10 +913,15 @@ class __extend__(pyframe.PyFrame):
 
     def STORE_ATTR(self, nameindex, next_instr):
         "obj.attributename = newvalue"
-        w_attributename = self.getname_w(nameindex)
         w_obj = self.popvalue()
         w_newvalue = self.popvalue()
-        self.space.setattr(w_obj, w_attributename, w_newvalue)
+        if (self.space.config.objspace.std.withmapdict
+            and not jit.we_are_jitted()):
+            from pypy.objspace.std.mapdict import STORE_ATTR_caching
+            STORE_ATTR_caching(self.getcode(), w_obj, nameindex, w_newvalue)
+        else:
+            w_attributename = self.getname_w(nameindex)
+            self.space.setattr(w_obj, w_attributename, w_newvalue)
 
     def DELETE_ATTR(self, nameindex, next_instr):
         "del obj.attributename"
@@ -905,7 +963,13 @@ class __extend__(pyframe.PyFrame):
     _load_global_failed._dont_inline_ = True
 
     def LOAD_GLOBAL(self, nameindex, next_instr):
-        self.pushvalue(self._load_global(self.getname_u(nameindex)))
+        if (self.space.config.objspace.std.withcelldict
+            and not jit.we_are_jitted()):
+            from pypy.objspace.std.celldict import LOAD_GLOBAL_caching
+            w_value = LOAD_GLOBAL_caching(self, nameindex)
+        else:
+            w_value = self._load_global(self.getname_u(nameindex))
+        self.pushvalue(w_value)
     LOAD_GLOBAL._always_inline_ = True
 
     def DELETE_FAST(self, varindex, next_instr):
@@ -0,0 +1,126 @@
+from pypy.interpreter.pycode import (
+    find_superinstructions, SUPER_NONE, SUPER_LOAD_FAST_LOAD_FAST,
+    SUPER_LOAD_FAST_LOAD_ATTR, SUPER_COMPARE_OP_POP_JUMP_IF_FALSE,
+    SUPER_LOAD_CONST_RETURN_VALUE)
+from pypy.interpreter.test.test_interpreter import (
+    TestInterpreter, AppTestInterpreter)
+from pypy.interpreter.test.test_pyframe import AppTestPyFrame
+
+
+def test_find_superinstructions():
+    def f(a, b):
+        if a < b:
+            return a.x
+        return None
+    co_code = f.func_code.co_code
+    table = find_superinstructions(co_code)
+    assert len(table) == len(co_code)
+    found = sorted([ord(c) for c in table if ord(c) != SUPER_NONE])
+    assert found == [SUPER_LOAD_FAST_LOAD_FAST,
+                     SUPER_LOAD_FAST_LOAD_ATTR,
+                     SUPER_COMPARE_OP_POP_JUMP_IF_FALSE,
+                     SUPER_LOAD_CONST_RETURN_VALUE]
+
+def test_find_superinstructions_truncated():
+    def f(a, b):
+        return a
+    co_code = f.func_code.co_code
+    # LOAD_FAST at the end, without room for the next instruction
+    assert find_superinstructions(co_code[:3]) == '\x00' * 3
+    # LOAD_FAST followed by a truncated LOAD_FAST
+    assert find_superinstructions(co_code[:3] * 2 + '\x7c\x00') == (
+        '\x01' + '\x00' * 7)
+
+
+class TestInterpreterWithSuperinstructions(TestInterpreter):
+    spaceconfig = {"objspace.superinstructions": True}
+
+
+class AppTestInterpreterWithSuperinstructions(AppTestInterpreter):
+    spaceconfig = {"objspace.superinstructions": True}
+
+
+class AppTestPyFrameWithSuperinstructions(AppTestPyFrame):
+    spaceconfig = {"objspace.superinstructions": True}
+
+
+class AppTestSuperinstructions(object):
+    spaceconfig = {"objspace.superinstructions": True}
+
+    def test_unbound_second_local(self):
+        def f():
+            a = 1
+            if 0:
+                b = 2
+            return a, b
+        raises(UnboundLocalError, f)
+
+    def test_traceback_points_to_second_instruction(self):
+        import sys
+        def f(a):
+            return a.missing
+        try:
+            f(1)
+        except AttributeError:
+            tb = sys.exc_info()[2].tb_next
+        # the LOAD_ATTR, not the LOAD_FAST before it
+        assert ord(f.func_code.co_code[tb.tb_lasti]) == 106
+
+    def test_f_lasti(self):
+        import sys
+        def f():
+            frame = sys._getframe()
+            return frame.f_lasti
+        code = f.func_code.co_code
+        lasti = f()
+        # the LOAD_ATTR of 'f_lasti', run together with 'LOAD_FAST frame'
+        assert ord(code[lasti]) == 106
+        assert ord(code[lasti - 3]) == 124
+
+    def test_compare_and_jump(self):
+        class A(object):
+            def __lt__(self, other):
+                return 0
+        def f(a, b):
+            if a < b:
+                return "yes"
+            return "no"
+        assert f(1, 2) == "yes"
+        assert f(2, 1) == "no"
+        assert f(A(), 1) == "no"
+        raises(TypeError, f, 1j, 2j)
+
+    def test_return_const_in_finally(self):
+        l = []
+        def f():
+            try:
+                return 42
+            finally:
+                l.append(1)
+        assert f() == 42
+        assert l == [1]
+
+    def test_generator(self):
+        def g(a):
+            yield a
+            return
+        assert list(g(5)) == [5]
+
+    def test_trace(self):
+        import sys
+        lines = []
+        def trace(frame, event, arg):
+            if frame.f_code is f.func_code:
+                lines.append((event, frame.f_lineno))
+            return trace
+        def f(a, b):
+            c = a
+            return b
+        sys.settrace(trace)
+        try:
+            f(1, 2)
+        finally:
+            sys.settrace(None)
+        first = f.func_code.co_firstlineno
+        assert lines == [('call', first), ('line', first + 1),
+                         ('line', first + 2), ('return', first + 2)]
@@ -1,4 +1,7 @@
-from pypy.goal.targetpypystandalone import get_entry_point, create_entry_point
+import py
+import os
+from pypy.goal.targetpypystandalone import (
+    get_entry_point, create_entry_point, preimport_modules)
 from pypy.config.pypyoption import get_pypy_config
 from rpython.rtyper.lltypesystem import rffi, lltype
 
@@ -30,3 +33,57 @@ def test_execute_source(space):
     assert lltype.typeOf(res) == rffi.INT
     assert rffi.cast(lltype.Signed, res) == 0
     lltype.free(lls, flavor='raw')
+
+def test_preimport_modules(space):
+    w_path = space.getattr(space.builtin_modules['sys'], space.wrap('path'))
+    saved_path = space.unwrap(w_path)[:]
+    preimport_modules(space, ['keyword', ' bisect', ''])
+    w_modules = space.getattr(space.builtin_modules['sys'],
+                              space.wrap('modules'))
+    for name in ['keyword', 'bisect']:
+        w_module = space.getitem(w_modules, space.wrap(name))
+        assert space.is_true(space.getattr(w_module, space.wrap('__file__')))
+    # sys.path is left alone
+    assert space.unwrap(w_path) == saved_path
+    py.test.raises(Exception, preimport_modules, space, ['does_not_exist'])
+
+def test_preimport_modules_follow_stdlib(space, tmpdir):
+    # a pre-imported package finds its submodules in the stdlib of the
+    # installed pypy, not in the source tree it was translated from
+    from pypy.module.sys.version import CPYTHON_VERSION
+    from pypy.module.sys.state import get as get_state
+    preimport_modules(space, ['xml'])
+    state = get_state(space)
+    build_prefix = state.preimport_prefix
+    stdlib = tmpdir.join('lib-python', '%d.%d' % CPYTHON_VERSION[:2])
+    py.path.local(build_prefix).join('lib-python', stdlib.basename,
+                                     'xml').copy(stdlib.join('xml'))
+    tmpdir.join('lib_pypy').ensure(dir=True)
+    w_sys = space.builtin_modules['sys']
+    w_prefix = space.getattr(w_sys, space.wrap('prefix'))
+    w_find_stdlib = space.getattr(w_sys, space.wrap('pypy_find_stdlib'))
+    try:
+        w_path = space.call_function(w_find_stdlib,
+                                     space.wrap(str(tmpdir.join('pypy-c'))))
+        assert not space.is_w(w_path, space.w_None)
+        w_result = space.appexec([], """():
+            import xml
+            import xml.dom
+            return xml.__file__, xml.__path__, xml.dom.__file__
+        """)
+        for path in space.unwrap(w_result):
+            if isinstance(path, list):
+                [path] = path
+            assert path.startswith(str(stdlib.join('xml')))
+    finally:
+        space.call_function(w_find_stdlib, space.wrap(
+            os.path.join(build_prefix, 'pypy', 'bin', 'pypy-c')))
+        space.setattr(w_sys, space.wrap('prefix'), w_prefix)
+        space.setattr(w_sys, space.wrap('exec_prefix'), w_prefix)
+        space.appexec([], """():
+            import sys
+            for name in list(sys.modules):
+                if name.startswith('xml.'):
+                    del sys.modules[name]
+        """)
+    assert state.preimport_prefix == build_prefix
@@ -105,6 +105,8 @@ class Module(MixedModule):
                                  'interp_magic.method_cache_counter')
             self.extra_interpdef('reset_method_cache_counter',
                                  'interp_magic.reset_method_cache_counter')
+            self.extra_interpdef('code_cache_counters',
+                                 'interp_magic.code_cache_counters')
             if self.space.config.objspace.std.withmapdict:
                 self.extra_interpdef('mapdict_cache_counter',
                                      'interp_magic.mapdict_cache_counter')
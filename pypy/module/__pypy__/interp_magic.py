@@ -53,6 +53,37 @@ def mapdict_cache_counter(space, name):
     return space.newtuple([space.newint(cache.hits.get(name, 0)),
                            space.newint(cache.misses.get(name, 0))])
 
+def code_cache_counters(space, w_code):
+    """Return a list of (name, kind, hits, misses) tuples for the inline
+    caches of the interpreter in the given code object.  'kind' is one of
+    'attr', 'store' or 'global'; only the caches that were used appear."""
+    from pypy.interpreter.pycode import PyCode
+    assert space.config.objspace.std.withmethodcachecounter
+    code = space.interp_w(PyCode, w_code)
+    result_w = []
+    if space.config.objspace.std.withmapdict:
+        from pypy.objspace.std.mapdict import INVALID_CACHE_ENTRY
+        for kind, caches in [('attr', code._mapdict_caches),
+                             ('store', code._mapdict_store_caches)]:
+            for i in range(len(caches)):
+                entry = caches[i]
+                if entry is not INVALID_CACHE_ENTRY:
+                    result_w.append(space.newtuple([
+                        code.co_names_w[i], space.wrap(kind),
+                        space.newint(entry.success_counter),
+                        space.newint(entry.failure_counter)]))
+    if space.config.objspace.std.withcelldict:
+        from pypy.objspace.std.celldict import INVALID_GLOBAL_CACHE_ENTRY
+        caches = code._globals_caches
+        for i in range(len(caches)):
+            entry = caches[i]
+            if entry is not INVALID_GLOBAL_CACHE_ENTRY:
+                result_w.append(space.newtuple([
+                    code.co_names_w[i], space.wrap('global'),
+                    space.newint(entry.success_counter),
+                    space.newint(entry.failure_counter)]))
+    return space.newlist(result_w)
+
 def builtinify(space, w_func):
     from pypy.interpreter.function import Function, BuiltinFunction
     func = space.interp_w(Function, w_func)
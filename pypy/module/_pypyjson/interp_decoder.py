@@ -5,6 +5,7 @@ from rpython.rlib import rfloat, runicode
 from rpython.rtyper.lltypesystem import lltype, rffi
 from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter import unicodehelper
+from pypy.objspace.std.unicodeobject import W_UnicodeObject
 
 OVF_DIGITS = len(str(sys.maxint))
 
@@ -19,29 +20,6 @@ def neg_pow_10(x, exp):
         return 0.0
     return x * NEG_POW_10[exp]
 
-def strslice2unicode_latin1(s, start, end):
-    """
-    Convert s[start:end] to unicode. s is supposed to be an RPython string
-    encoded in latin-1, which means that the numeric value of each char is the
-    same as the corresponding unicode code point.
-
-    Internally it's implemented at the level of low-level helpers, to avoid
-    the extra copy we would need if we take the actual slice first.
-
-    No bound checking is done, use carefully.
-    """
-    from rpython.rtyper.annlowlevel import llstr, hlunicode
-    from rpython.rtyper.lltypesystem.rstr import malloc, UNICODE
-    from rpython.rtyper.lltypesystem.lltype import cast_primitive, UniChar
-    length = end-start
-    ll_s = llstr(s)
-    ll_res = malloc(UNICODE, length)
-    ll_res.hash = 0
-    for i in range(length):
-        ch = ll_s.chars[start+i]
-        ll_res.chars[i] = cast_primitive(UniChar, ch)
-    return hlunicode(ll_res)
-
 TYPE_UNKNOWN = 0
 TYPE_STRING = 1
 class JSONDecoder(object):
@@ -295,18 +273,16 @@ class JSONDecoder(object):
             i += 1
             bits |= ord(ch)
             if ch == '"':
+                self.last_type = TYPE_STRING
+                self.pos = i
                 if bits & 0x80:
                     # the 8th bit is set, it's an utf8 strnig
                     content_utf8 = self.getslice(start, i-1)
                     content_unicode = unicodehelper.decode_utf8(self.space, content_utf8)
-                else:
-                    # ascii only, fast path (ascii is a strict subset of
-                    # latin1, and we already checked that all the chars are <
-                    # 128)
-                    content_unicode = strslice2unicode_latin1(self.s, start, i-1)
-                self.last_type = TYPE_STRING
-                self.pos = i
-                return self.space.wrap(content_unicode)
+                    return self.space.wrap(content_unicode)
+                # ascii only, fast path: we already checked that all the
+                # chars are < 128, so keep them in the compact storage
+                return W_UnicodeObject.from_ascii(self.getslice(start, i-1))
             elif ch == '\\':
                 content_so_far = self.getslice(start, i-1)
                 self.pos = i-1
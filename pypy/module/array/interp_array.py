@@ -122,12 +122,31 @@ UNICODE_ARRAY = lltype.Ptr(lltype.Array(lltype.UniChar,
                                         hints={'nolength': True}))
 
 class W_ArrayBase(W_Root):
-    _attrs_ = ('space', 'len', 'allocated', '_lifeline_') # no buffer
+    _attrs_ = ('space', 'len', 'allocated', '_lifeline_',
+               'resize_locks') # no buffer
 
     def __init__(self, space):
         self.space = space
         self.len = 0
         self.allocated = 0
+        self.resize_locks = 0
+
+    def lock_resize(self):
+        """Prevent the array from being resized, and its buffer moved.
+
+        This is for objects sharing the array's memory, such as a js view
+        of it.  Each call must be matched by a call to unlock_resize().
+        """
+        self.resize_locks += 1
+
+    def unlock_resize(self):
+        assert self.resize_locks > 0
+        self.resize_locks -= 1
+
+    def _check_resizable(self):
+        if self.resize_locks > 0:
+            raise OperationError(self.space.w_BufferError, self.space.wrap(
+                "cannot resize an array that is exporting buffers"))
 
     def readbuf_w(self, space):
         return ArrayBuffer(self, True)
@@ -638,7 +657,8 @@ def make_array(mytype):
         itemsize = mytype.bytes
         typecode = mytype.typecode
 
-        _attrs_ = ('space', 'len', 'allocated', '_lifeline_', 'buffer')
+        _attrs_ = ('space', 'len', 'allocated', '_lifeline_',
+                   'resize_locks', 'buffer')
 
         def __init__(self, space):
             W_ArrayBase.__init__(self, space)
@@ -704,6 +724,8 @@ def make_array(mytype):
                 lltype.free(self.buffer, flavor='raw')
 
         def setlen(self, size, zero=False, overallocate=True):
+            if size != self.len:
+                self._check_resizable()
             if size > 0:
                 if size > self.allocated or size < self.allocated / 2:
                     if overallocate:
@@ -875,6 +897,7 @@ def make_array(mytype):
             if i < 0 or i >= self.len:
                 msg = 'pop index out of range'
                 raise OperationError(space.w_IndexError, space.wrap(msg))
+            self._check_resizable()
             w_val = self.w_getitem(space, i)
             while i < self.len - 1:
                 self.buffer[i] = self.buffer[i + 1]
@@ -954,6 +977,7 @@ def make_array(mytype):
                 j = self.len
             if i >= j:
                 return None
+            self._check_resizable()
             oldbuffer = self.buffer
             self.buffer = lltype.malloc(
                 mytype.arraytype, max(self.len - (j - i), 0), flavor='raw',
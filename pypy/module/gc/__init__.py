@@ -19,8 +19,15 @@ class Module(MixedModule):
                 space.config.translation.gctransformer == "framework"):
             self.appleveldefs.update({
                 'dump_rpy_heap': 'app_referents.dump_rpy_heap',
+                'dump_allocation_samples':
+                    'app_sampling.dump_allocation_samples',
                 })
             self.interpleveldefs.update({
+                'get_stats': 'interp_gc.get_stats',
+                'start_allocation_sampling':
+                    'sampling.start_allocation_sampling',
+                'stop_allocation_sampling': 'sampling.stop_allocation_sampling',
+                'get_allocation_samples': 'sampling.get_allocation_samples',
                 'get_rpy_roots': 'referents.get_rpy_roots',
                 'get_rpy_referents': 'referents.get_rpy_referents',
                 'get_rpy_memory_usage': 'referents.get_rpy_memory_usage',
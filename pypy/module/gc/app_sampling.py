@@ -0,0 +1,36 @@
+# NOT_RPYTHON
+
+import gc
+
+def dump_allocation_samples(file):
+    """Write the samples collected since start_allocation_sampling() to
+    the given file (a file or a file name), in the 'folded' format read
+    by flamegraph.pl: one line per Python stack and type of object, with
+    the estimated number of bytes allocated there.
+    """
+    names = {}
+    try:
+        import zlib
+        data = zlib.decompress(gc.get_typeids_z())
+    except Exception:
+        data = ''
+    for line in data.splitlines():
+        words = line.split()
+        if len(words) >= 2 and words[0].startswith('member'):
+            if words[1] in ('GcStruct', 'GcArray') and len(words) >= 3:
+                del words[1]
+            names[int(words[0][len('member'):])] = words[1]
+    #
+    if isinstance(file, str):
+        f = open(file, 'w')
+    else:
+        f = file
+    try:
+        for stack, typeindex, nbytes in sorted(gc.get_allocation_samples()):
+            typename = names.get(typeindex, 'type%d' % typeindex)
+            if stack:
+                stack += ';'
+            f.write('%s%s %d\n' % (stack, typename.replace(';', ':'), nbytes))
+    finally:
+        if f is not file:
+            f.close()
@@ -50,6 +50,60 @@ def disable_finalizers(space):
 
 # ____________________________________________________________
 
+def get_stats(space):
+    """Return a dict with the statistics kept by the GC.  For each phase
+    of the GC ('minor', 'marking', 'sweeping' and 'finalizing') there is
+    a dict with the number of pauses, their total and maximal duration,
+    and a histogram of their durations, where 'histogram[k]' counts the
+    pauses that took less than 2**k.  Durations are in the same units
+    as the timestamps in PYPYLOG.  Then come the number of bytes
+    allocated in the nursery, of bytes that survived minor collections,
+    of bytes in large objects allocated outside the nursery, of bytes
+    reported as memory pressure by raw buffers, the number of major
+    collections, the number of bytes of free pages currently given
+    back to the OS (see PYPY_GC_RELEASE_PAGES), and the current size of
+    the nursery with the number of times it changed (see
+    PYPY_GC_NURSERY_MAX).  Everything is zero with GCs that don't keep
+    these statistics."""
+    w_stats = space.newdict()
+    for phase in range(len(rgc.GC_PHASES)):
+        base = phase * rgc.GC_PAUSE_STATS
+        w_histogram = space.newlist([
+            space.wrap(rgc.get_gc_stats(base + rgc.GC_PAUSE_HISTOGRAM + k))
+            for k in range(rgc.GC_PAUSE_HISTOGRAM_SIZE)])
+        w_phase = space.newdict()
+        space.setitem_str(w_phase, 'count', space.wrap(
+            rgc.get_gc_stats(base + rgc.GC_PAUSE_COUNT)))
+        space.setitem_str(w_phase, 'total_time', space.wrap(
+            rgc.get_gc_stats(base + rgc.GC_PAUSE_TOTAL_TIME)))
+        space.setitem_str(w_phase, 'max_time', space.wrap(
+            rgc.get_gc_stats(base + rgc.GC_PAUSE_MAX_TIME)))
+        space.setitem_str(w_phase, 'histogram', w_histogram)
+        space.setitem_str(w_stats, rgc.GC_PHASES[phase], w_phase)
+    #
+    allocated = rgc.get_gc_stats(rgc.GC_STAT_NURSERY_ALLOCATED)
+    survived = rgc.get_gc_stats(rgc.GC_STAT_NURSERY_SURVIVED)
+    if allocated > 0:
+        survival_rate = float(survived) / float(allocated)
+    else:
+        survival_rate = 0.0
+    space.setitem_str(w_stats, 'nursery_allocated', space.wrap(allocated))
+    space.setitem_str(w_stats, 'nursery_survived', space.wrap(survived))
+    space.setitem_str(w_stats, 'survival_rate', space.wrap(survival_rate))
+    space.setitem_str(w_stats, 'rawmalloced', space.wrap(
+        rgc.get_gc_stats(rgc.GC_STAT_RAWMALLOCED)))
+    space.setitem_str(w_stats, 'memory_pressure', space.wrap(
+        rgc.get_gc_stats(rgc.GC_STAT_MEMORY_PRESSURE)))
+    space.setitem_str(w_stats, 'major_collections', space.wrap(
+        rgc.get_gc_stats(rgc.GC_STAT_MAJOR_COLLECTIONS)))
+    space.setitem_str(w_stats, 'released_memory', space.wrap(
+        rgc.get_gc_stats(rgc.GC_STAT_RELEASED_MEMORY)))
+    space.setitem_str(w_stats, 'nursery_size', space.wrap(
+        rgc.get_gc_stats(rgc.GC_STAT_NURSERY_SIZE)))
+    space.setitem_str(w_stats, 'nursery_resizes', space.wrap(
+        rgc.get_gc_stats(rgc.GC_STAT_NURSERY_RESIZES)))
+    return w_stats
+
 @unwrap_spec(filename='str0')
 def dump_heap_stats(space, filename):
     tb = rgc._heap_stats()
@@ -0,0 +1,109 @@
+"""
+Sampling of the allocations done in the nursery, to find out which parts
+of a program allocate the memory that keeps the GC busy.
+
+The GC calls _allocation_sample_hook() about once every 'every' bytes.
+This occurs in the middle of an allocation, possibly from JIT-compiled
+code, where it is not safe to look at the Python frames; so the hook only
+records the type of the object and fires an action.  The Python stack is
+recorded by the action, just before the next bytecode is executed.
+"""
+
+from pypy.interpreter.error import OperationError
+from pypy.interpreter.executioncontext import AsyncAction
+from pypy.interpreter.gateway import unwrap_spec
+from rpython.rlib import rgc
+from rpython.rtyper.annlowlevel import llhelper
+from rpython.rtyper.lltypesystem import lltype
+
+MAX_DEPTH = 128
+
+
+class AllocationSampleAction(AsyncAction):
+    """Record the current Python stack for the pending samples."""
+
+    def __init__(self, space):
+        AsyncAction.__init__(self, space)
+        self.every = 0
+        self.pending = []     # type indexes of the samples not recorded yet
+        self.samples = {}     # {(stack, typeindex): estimated bytes}
+
+    def perform(self, executioncontext, frame):
+        pending = self.pending
+        if not pending:
+            return
+        self.pending = []
+        stack = self.get_stack(executioncontext)
+        for typeindex in pending:
+            key = (stack, typeindex)
+            self.samples[key] = self.samples.get(key, 0) + self.every
+
+    def get_stack(self, ec):
+        # outermost frame first, like the 'folded' format of flame graphs
+        names = []
+        frame = ec.gettopframe_nohidden()
+        while frame is not None and len(names) < MAX_DEPTH:
+            code = frame.getcode()
+            names.append('%s (%s:%d)' % (code.co_name, code.co_filename,
+                                         code.co_firstlineno))
+            frame = ec.getnextframe_nohidden(frame)
+        names.reverse()
+        return ';'.join(names)
+
+
+class SamplingState(object):
+    action = None
+
+sampling_state = SamplingState()
+
+def _allocation_sample_hook(typeindex, size):
+    action = sampling_state.action
+    if action is not None and action.every > 0:
+        action.pending.append(typeindex)
+        action.fire()
+
+def _get_hook():
+    return llhelper(lltype.Ptr(rgc.ALLOCATION_SAMPLE_HOOK),
+                    _allocation_sample_hook)
+
+def get_action(space):
+    action = space.fromcache(AllocationSampleAction)
+    sampling_state.action = action
+    return action
+
+# ____________________________________________________________
+
+@unwrap_spec(every=int)
+def start_allocation_sampling(space, every=512*1024):
+    """Start sampling the allocations: about once every 'every' bytes,
+    remember the Python stack and the type of the allocated object.
+    Forgets the samples of any previous run."""
+    if every <= 0:
+        raise OperationError(space.w_ValueError,
+                             space.wrap("'every' must be positive"))
+    action = get_action(space)
+    action.every = every
+    action.pending = []
+    action.samples = {}
+    rgc.set_allocation_sampling(_get_hook(), every)
+
+def stop_allocation_sampling(space):
+    """Stop sampling the allocations.  The samples are kept."""
+    action = get_action(space)
+    action.every = 0
+    action.pending = []
+    rgc.set_allocation_sampling(_get_hook(), 0)
+
+def get_allocation_samples(space):
+    """Return a list of tuples (stack, typeindex, bytes): the Python stack
+    as a string 'outermost;...;innermost', the type of the allocated
+    objects as in get_rpy_type_index(), or -1 if unknown, and the estimated
+    number of bytes allocated there."""
+    action = get_action(space)
+    samples_w = []
+    for key, nbytes in action.samples.items():
+        stack, typeindex = key
+        samples_w.append(space.newtuple([space.wrap(stack),
+                                         space.wrap(typeindex),
+                                         space.wrap(nbytes)]))
+    return space.newlist(samples_w)
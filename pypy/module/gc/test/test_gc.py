@@ -71,6 +71,69 @@ class AppTestGC(object):
         assert gc.isenabled()
 
 
+    def test_get_stats(self):
+        import gc
+        stats = gc.get_stats()
+        for phase in ['minor', 'marking', 'sweeping', 'finalizing']:
+            assert sorted(stats[phase]) == ['count', 'histogram',
+                                            'max_time', 'total_time']
+            assert stats[phase]['count'] == sum(stats[phase]['histogram'])
+            assert len(stats[phase]['histogram']) == 40
+        assert stats['nursery_survived'] <= stats['nursery_allocated']
+        assert 0.0 <= stats['survival_rate'] <= 1.0
+        assert stats['major_collections'] >= 0
+        assert stats['released_memory'] >= 0
+        assert stats['nursery_size'] >= 0
+        assert stats['nursery_resizes'] >= 0
+
+
+class AppTestAllocationSampling(object):
+
+    def setup_class(cls):
+        from rpython.tool.udir import udir
+        from pypy.interpreter.gateway import interp2app, unwrap_spec
+        from pypy.module.gc.sampling import _allocation_sample_hook
+        # untranslated, the GC never calls the hook: call it ourselves
+        @unwrap_spec(typeindex=int)
+        def fake_sample(space, typeindex):
+            _allocation_sample_hook(typeindex, 16)
+        cls.w_fake_sample = cls.space.wrap(interp2app(fake_sample))
+        cls.w_fname = cls.space.wrap(str(udir.join('allocation_samples')))
+
+    def test_samples(self):
+        import gc
+        raises(ValueError, gc.start_allocation_sampling, 0)
+        gc.start_allocation_sampling(1000)
+        def allocating_function():
+            self.fake_sample(42)
+            self.fake_sample(42)
+            return 42       # the samples are recorded before this
+        allocating_function()
+        self.fake_sample(43)
+        gc.stop_allocation_sampling()
+        self.fake_sample(44)       # ignored
+        samples = gc.get_allocation_samples()
+        assert len(samples) == 2
+        samples.sort(key=lambda sample: sample[1])
+        stack, typeindex, nbytes = samples[0]
+        assert typeindex == 42
+        assert nbytes == 2000
+        names = [frame.split(' (')[0] for frame in stack.split(';')]
+        assert names[-2:] == ['test_samples', 'allocating_function']
+        stack, typeindex, nbytes = samples[1]
+        assert typeindex == 43
+        assert stack.split(';')[-1].startswith('test_samples (')
+        #
+        gc.dump_allocation_samples(self.fname)
+        lines = open(self.fname).read().splitlines()
+        assert len(lines) == 2
+        assert samples[0][0] + ';type42 2000' in lines
+        #
+        gc.start_allocation_sampling()
+        gc.stop_allocation_sampling()
+        assert gc.get_allocation_samples() == []
+
+
 class AppTestGcDumpHeap(object):
     pytestmark = py.test.mark.xfail(run=False)
 
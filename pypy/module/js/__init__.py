@@ -42,6 +42,11 @@ interpreter.
         'instanceof': 'interp_js.instanceof',
         'urshift': 'interp_js.urshift',
         'uint32': 'interp_js.uint32',
+        # Shared-memory views between js typed arrays and python buffers.
+        'heapview': 'interp_js.heapview',
+        'heapbuffer': 'interp_js.heapbuffer',
+        # Monitoring of the js-level handle table.
+        'handle_stats': 'interp_js.handle_stats',
         }
 
     appleveldefs = {
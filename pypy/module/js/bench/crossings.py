@@ -0,0 +1,53 @@
+"""Count calls into javascript made by various ways of moving data across.
+
+This runs the untranslated interpreter on top of PyV8, and reports the
+number of calls into the javascript support library needed per item for
+element-by-element access versus the bulk operations.
+
+    python crossings.py [N]
+"""
+
+import sys
+
+from pypy.tool.pytest.objspace import gettestobjspace
+from pypy.module.js import support
+
+
+CASES = [
+    ("index array", "a = js.convert(range(N))",
+                    "for i in range(N): a[i]"),
+    ("Array.to_list", "a = js.convert(range(N))",
+                      "a.to_list()"),
+    ("iterate object", "o = js.eval('({})')\nfor i in range(N): o['k%d' % i] = i",
+                       "for k in o: o[k]"),
+    ("Object.to_dict", "o = js.eval('({})')\nfor i in range(N): o['k%d' % i] = i",
+                       "o.to_dict()"),
+    ("build array by item", "items = [float(i) for i in range(N)]",
+                            "a = js.Array([], N)\n"
+                            "for i in range(N): a[i] = items[i]"),
+    ("build array in bulk", "items = [float(i) for i in range(N)]",
+                            "js.Array(items, 0)"),
+    ("typed array by item", "t = js.eval('new Float64Array(%d)' % N)",
+                            "[float(t[i]) for i in range(N)]"),
+    ("typed array to_array", "t = js.eval('new Float64Array(%d)' % N)",
+                             "t.to_array()"),
+]
+
+
+def main(n):
+    space = gettestobjspace(usemodules=["js", "array"])
+    for name, setup, code in CASES:
+        w_ns = space.newdict()
+        space.exec_("import js\nN = %d\n%s" % (n, setup), w_ns, w_ns)
+        support.reset_call_counts()
+        space.exec_(code, w_ns, w_ns)
+        count = support.get_call_count()
+        print "%-24s %8d calls  %6.2f per item" % (name, count,
+                                                   count / float(n))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(1000)
@@ -0,0 +1,49 @@
+"""Time a DOM-free numeric loop over js.Number values.
+
+This runs the untranslated interpreter on top of PyV8, and reports the
+time and number of calls into the javascript support library per loop
+iteration for some simple arithmetic on js numbers and attribute access.
+
+    python numeric.py [N]
+"""
+
+import sys
+import time
+
+from pypy.tool.pytest.objspace import gettestobjspace
+from pypy.module.js import support
+
+
+CASES = [
+    ("number arithmetic", "x = js.Number(0)",
+                          "for i in range(N):\n"
+                          "    x = x * 0.5 + i\n"
+                          "    if x > 1e6: x = x - 1e6"),
+    ("number comparison", "x = js.Number(0.5)",
+                          "for i in range(N):\n"
+                          "    x < i"),
+    ("attribute access", "o = js.eval('({value: 1})')",
+                         "for i in range(N):\n"
+                         "    o.value = o.value + 1"),
+]
+
+
+def main(n):
+    space = gettestobjspace(usemodules=["js"])
+    for name, setup, code in CASES:
+        w_ns = space.newdict()
+        space.exec_("import js\nN = %d\n%s" % (n, setup), w_ns, w_ns)
+        support.reset_call_counts()
+        start = time.time()
+        space.exec_(code, w_ns, w_ns)
+        elapsed = time.time() - start
+        count = support.get_call_count()
+        print "%-20s %8.3fs  %6.2f calls per iteration" % (
+            name, elapsed, count / float(n))
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        main(int(sys.argv[1]))
+    else:
+        main(1000)
@@ -4,14 +4,19 @@ from __future__ import with_statement
 import os
 
 from rpython.rtyper.lltypesystem import lltype, rffi
-from rpython.rlib import rweakref
+from rpython.rlib import jit, rweakref
+from rpython.rlib.rfloat import isfinite
+from rpython.rlib.buffer import Buffer
 from rpython.rlib.objectmodel import we_are_translated
+from rpython.rtyper.lltypesystem.module.ll_math import math_fmod
 
 import pypy.interpreter.function
-from pypy.interpreter.error import OperationError
+from pypy.interpreter.error import OperationError, oefmt
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.interpreter.typedef import TypeDef, GetSetProperty
 from pypy.interpreter.gateway import interp2app, unwrap_spec
+from pypy.objspace.std.memoryobject import W_MemoryView
+from pypy.module.array.interp_array import W_ArrayBase
 
 from pypy.module.js import support
 
@@ -26,20 +31,38 @@ class W_Value(W_Root):
 
     _immutable_fields_ = ['handle']
 
+    # Set once the handle has been freed ahead of finalization.
+    released = False
+
     def __init__(self, handle):
         self.handle = handle
 
     def __del__(self):
+        if self.released:
+            return
         if we_are_translated() or support and support.emjs_free:
             support.emjs_free(self.handle)
 
+    def release(self):
+        """Free the handle now, rather than waiting for finalization.
+
+        This is only safe for transient values that are not visible
+        to application code.
+        """
+        if not self.released:
+            self.released = True
+            support.emjs_free(self.handle)
+
     def descr__repr__(self, space):
         return space.wrap("<js.Value handle=%d>" % (self.handle,))
 
     # Expose a whole host of operators via app-level magic methods.
 
+    def read_double(self):
+        return support.emjs_read_double(self.handle)
+
     def descr__float__(self, space):
-        res = support.emjs_read_double(self.handle)
+        res = self.read_double()
         return space.wrap(res)
 
     def descr__int__(self, space):
@@ -72,31 +95,49 @@ class W_Value(W_Root):
     # are fairly obvious reasons....
 
     def descr__eq__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return space.newbool(lhs == rhs)
         with _unwrap_handle(space, w_other) as h_other:
             res = support.emjs_op_equiv(self.handle, h_other)
         return space.newbool(bool(res))
 
     def descr__ne__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return space.newbool(lhs != rhs)
         with _unwrap_handle(space, w_other) as h_other:
             res = support.emjs_op_nequiv(self.handle, h_other)
         return space.newbool(bool(res))
 
     def descr__lt__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return space.newbool(lhs < rhs)
         with _unwrap_handle(space, w_other) as h_other:
             res = support.emjs_op_lt(self.handle, h_other)
         return space.newbool(bool(res))
 
     def descr__le__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return space.newbool(lhs <= rhs)
         with _unwrap_handle(space, w_other) as h_other:
             res = support.emjs_op_lteq(self.handle, h_other)
         return space.newbool(bool(res))
         
     def descr__gt__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return space.newbool(lhs > rhs)
         with _unwrap_handle(space, w_other) as h_other:
             res = support.emjs_op_gt(self.handle, h_other)
         return space.newbool(bool(res))
 
     def descr__ge__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return space.newbool(lhs >= rhs)
         with _unwrap_handle(space, w_other) as h_other:
             res = support.emjs_op_gteq(self.handle, h_other)
         return space.newbool(bool(res))
@@ -164,60 +205,89 @@ class W_Value(W_Root):
                 res = support.emjs_prop_delete(self.handle, h_prop)
         _check_error(space, res)
 
+    # Attribute names are almost always constants in the calling code, so
+    # we look them up using cached handles to the corresponding js strings
+    # rather than passing the name across as a C string on each access.
+
     @unwrap_spec(name=str)
     def descr__getattr__(self, space, name):
-        h_res = support.emjs_prop_get_str(self.handle, name)
+        h_name = _attr_name_handle(space, name)
+        if h_name != support.EMJS_ERROR:
+            h_res = support.emjs_prop_get(self.handle, h_name)
+        else:
+            h_res = support.emjs_prop_get_str(self.handle, name)
         if h_res == support.EMJS_UNDEFINED:
             raise OperationError(space.w_AttributeError, space.wrap(name))
         w_res = _wrap_handle(space, h_res)
         # Turn functions into methods during attribute lookup.
-        # XXX TODO: find a non-exception-driven check for this.
-        try:
-            func = space.interp_w(W_Function, w_res)
-        except OperationError, e:
-            if not e.match(space, space.w_TypeError):
-                raise
-        else:
+        if isinstance(w_res, W_Function):
             w_res = bind(space, w_res, space.wrap(self))
         return w_res
 
     @unwrap_spec(name=str)
     def descr__setattr__(self, space, name, w_value):
+        h_name = _attr_name_handle(space, name)
         with _unwrap_handle(space, w_value) as h_value:
-            res = support.emjs_prop_set_str(self.handle, name, h_value)
+            if h_name != support.EMJS_ERROR:
+                res = support.emjs_prop_set(self.handle, h_name, h_value)
+            else:
+                res = support.emjs_prop_set_str(self.handle, name, h_value)
         _check_error(space, res)
 
     @unwrap_spec(name=str)
     def descr__delattr__(self, space, name):
-        res = support.emjs_prop_delete_str(self.handle, name)
+        h_name = _attr_name_handle(space, name)
+        if h_name != support.EMJS_ERROR:
+            res = support.emjs_prop_delete(self.handle, h_name)
+        else:
+            res = support.emjs_prop_delete_str(self.handle, name)
         _check_error(space, res)
 
     def descr__add__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return _make_number(space, lhs + rhs)
         with _unwrap_handle(space, w_other) as h_other:
             h_res = support.emjs_op_add(self.handle, h_other)
         return _wrap_handle(space, h_res)
 
     def descr__sub__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return _make_number(space, lhs - rhs)
         with _unwrap_handle(space, w_other) as h_other:
             h_res = support.emjs_op_sub(self.handle, h_other)
         return _wrap_handle(space, h_res)
 
     def descr__mul__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok:
+            return _make_number(space, lhs * rhs)
         with _unwrap_handle(space, w_other) as h_other:
             h_res = support.emjs_op_mul(self.handle, h_other)
         return _wrap_handle(space, h_res)
 
     def descr__div__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok and rhs != 0.0:
+            return _make_number(space, lhs / rhs)
         with _unwrap_handle(space, w_other) as h_other:
             h_res = support.emjs_op_div(self.handle, h_other)
         return _wrap_handle(space, h_res)
 
     def descr__truediv__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok and rhs != 0.0:
+            return _make_number(space, lhs / rhs)
         with _unwrap_handle(space, w_other) as h_other:
             h_res = support.emjs_op_div(self.handle, h_other)
         return _wrap_handle(space, h_res)
 
     def descr__mod__(self, space, w_other):
+        ok, lhs, rhs = _numeric_operands(space, self, w_other)
+        if ok and rhs != 0.0 and isfinite(lhs) and isfinite(rhs):
+            # Like C's fmod, the result takes the sign of the dividend.
+            return _make_number(space, math_fmod(lhs, rhs))
         with _unwrap_handle(space, w_other) as h_other:
             h_res = support.emjs_op_mod(self.handle, h_other)
         return _wrap_handle(space, h_res)
@@ -248,10 +318,14 @@ class W_Value(W_Root):
         return _wrap_handle(space, h_res)
 
     def descr__neg__(self, space):
+        if isinstance(self, W_Number):
+            return _make_number(space, -self.read_double())
         h_res = support.emjs_op_uminus(self.handle)
         return _wrap_handle(space, h_res)
 
     def descr__pos__(self, space):
+        if isinstance(self, W_Number):
+            return space.wrap(self)
         h_res = support.emjs_op_uplus(self.handle)
         return _wrap_handle(space, h_res)
 
@@ -375,10 +449,25 @@ class W_Number(W_Value):
 
     This class provides no additional methods, and exists mainly to allow
     python code to typecheck for numbers.
+
+    Since js numbers are immutable, the value is cached on the python side
+    once known.  This lets arithmetic and comparisons between numbers be
+    done without calling into javascript.
     """
 
+    def __init__(self, handle, value=0.0, value_known=False):
+        W_Value.__init__(self, handle)
+        self.value = value
+        self.value_known = value_known
+
+    def read_double(self):
+        if not self.value_known:
+            self.value = support.emjs_read_double(self.handle)
+            self.value_known = True
+        return self.value
+
     def descr__repr__(self, space):
-        value = support.emjs_read_double(self.handle)
+        value = self.read_double()
         return space.wrap("<js.Number %f>" % (value,))
 
 
@@ -386,7 +475,7 @@ def W_Number_descr__new__(space, w_subtype, w_value):
     w_self = space.allocate_instance(W_Number, w_subtype)
     value = space.float_w(w_value)
     h_value = support.emjs_make_double(value)
-    W_Number.__init__(space.interp_w(W_Number, w_self), h_value)
+    W_Number.__init__(space.interp_w(W_Number, w_self), h_value, value, True)
     return w_self
 
 
@@ -458,6 +547,17 @@ class W_Object(W_Value):
     python code to typecheck for numbers.
     """
 
+    # A python object whose memory is shared with this js value, and
+    # which must therefore be kept alive at least as long as it is.
+    # If it's an array, it can't be resized until this value is freed.
+    w_base = None
+
+    def __del__(self):
+        w_base = self.w_base
+        if isinstance(w_base, W_ArrayBase):
+            w_base.unlock_resize()
+        W_Value.__del__(self)
+
     def descr__repr__(self, space):
         return space.wrap("<js.Object handle=%d>" % (self.handle,))
 
@@ -476,6 +576,31 @@ class W_Object(W_Value):
         keys_w = W_AllPropertiesIterator(self, space).keys_w
         return space.newlist(keys_w)
 
+    # Bulk conversions.  These fetch the whole object in a constant number
+    # of calls, rather than one or more calls per property or item.
+
+    def descr_to_dict(self, space):
+        keys, values_w = _read_props(space, self.handle)
+        w_dict = space.newdict()
+        for i in xrange(len(keys)):
+            space.setitem(w_dict, space.wrap(keys[i]), values_w[i])
+        return w_dict
+
+    def descr_to_bytearray(self, space):
+        data = _read_bytes(space, self.handle)
+        return space.call_function(space.w_bytearray, space.wrap(data))
+
+    def descr_to_array(self, space):
+        typecode = support.emjs_array_typecode(self.handle)
+        if typecode == 0:
+            errmsg = "js value is not a typed array"
+            raise OperationError(space.w_TypeError, space.wrap(errmsg))
+        data = _read_bytes(space, self.handle)
+        w_array = space.getattr(space.getbuiltinmodule("array"),
+                                space.wrap("array"))
+        return space.call_function(w_array, space.wrap(chr(typecode)),
+                                   space.wrap(data))
+
 
 def W_Object_descr__new__(space, w_subtype):
     w_self = space.allocate_instance(W_Object, w_subtype)
@@ -493,6 +618,9 @@ W_Object.typedef = TypeDef(
     __repr__ = interp2app(W_Object.descr__repr__),
     __iter__ = interp2app(W_Object.descr__iter__),
     __dir__ = interp2app(W_Object.descr__dir__),
+    to_dict = interp2app(W_Object.descr_to_dict),
+    to_bytearray = interp2app(W_Object.descr_to_bytearray),
+    to_array = interp2app(W_Object.descr_to_array),
 )
 
 
@@ -511,28 +639,23 @@ class W_Array(W_Object):
         _check_error(space, res)
         return space.wrap(res)
 
+    def descr_to_list(self, space):
+        return space.newlist(_read_items(space, self.handle))
+
 
 def W_Array_descr__new__(space, w_subtype, w_items, w_size):
     # XXX TODO: default arguments, somehow...
     size = space.int_w(w_size)
-    h_self = support.emjs_make_array(size)
-    _check_error(space, h_self)
     if space.is_true(w_items):
-        w_iterator = space.iter(w_items)
-        idx = 0
-        # XXX TODO: baseobjspace uses a jit merge point in this loop...?
-        while True:
-            try:
-                w_item = space.next(w_iterator)
-            except OperationError, e:
-                if not e.match(space, space.w_StopIteration):
-                    raise
-                break
-            else:
-                with _unwrap_handle(space, w_item) as h_item:
-                    res = support.emjs_prop_set_int(h_self, idx, h_item)
-                    _check_error(space, res)
-                idx += 1
+        h_self = _make_array_from_iterable(space, w_items)
+        _check_error(space, h_self)
+        if size > 0 and size > support.emjs_length(h_self):
+            with _unwrap_handle(space, space.wrap(size)) as h_size:
+                res = support.emjs_prop_set_str(h_self, "length", h_size)
+            _check_error(space, res)
+    else:
+        h_self = support.emjs_make_array(size)
+        _check_error(space, h_self)
     # XXX TODO: we should free the array if the above raises an error.
     w_self = space.allocate_instance(W_Array, w_subtype)
     W_Array.__init__(space.interp_w(W_Array, w_self), h_self)
@@ -546,6 +669,7 @@ W_Array.typedef = TypeDef(
     __new__ = interp2app(W_Array_descr__new__),
     __repr__ = interp2app(W_Array.descr__repr__),
     __len__ = interp2app(W_Array.descr__len__),
+    to_list = interp2app(W_Array.descr_to_list),
 )
 
 
@@ -576,11 +700,8 @@ class W_Function(W_Object):
         return space.wrap("<js.Function handle=%d>" % (self.handle,))
 
     def descr__call__(self, space, args_w):
-        h_args = support.emjs_make_array(len(args_w))
+        h_args = _make_array(space, args_w)
         _check_error(space, h_args)
-        for i in xrange(len(args_w)):
-            with _unwrap_handle(space, args_w[i]) as h_arg:
-                support.emjs_prop_set_int(h_args, i, h_arg)
         w_ctx = self.w_context
         if w_ctx is None:
             w_ctx = undefined
@@ -737,6 +858,8 @@ class State:
         # A permanent object for accessing global scope.
         # This gets assigned the proper handle at module initialization.
         self.w_globals = space.wrap(W_Object(support.EMJS_ERROR))
+        # Permanent handles to js strings for attribute names.
+        self.attr_name_handles = {}
 
     def startup(self, space):
         # Hold a permanent handle to the globals object.
@@ -762,6 +885,39 @@ class State:
         _check_error(space, self.h_pyerror)
 
 
+    # Entries are never evicted, so that lookups can be elidable; once the
+    # cache is full any further names are simply not cached.
+
+    ATTR_NAME_CACHE_SIZE = 1024
+
+    def get_attr_name_handle(self, name):
+        h_name = self._lookup_attr_name_handle(name)
+        if h_name == support.EMJS_ERROR:
+            h_name = self._make_attr_name_handle(name)
+        return h_name
+
+    @jit.elidable
+    def _lookup_attr_name_handle(self, name):
+        return self.attr_name_handles.get(name, support.EMJS_ERROR)
+
+    @jit.dont_look_inside
+    def _make_attr_name_handle(self, name):
+        try:
+            return self.attr_name_handles[name]
+        except KeyError:
+            pass
+        if len(self.attr_name_handles) >= self.ATTR_NAME_CACHE_SIZE:
+            return support.EMJS_ERROR
+        h_name = support.emjs_make_strn(name, len(name))
+        if h_name == support.EMJS_ERROR:
+            # Don't cache the failure; the caller falls back to passing
+            # the name as a string, which will report any real error.
+            support.emjs_clear_error()
+        else:
+            self.attr_name_handles[name] = h_name
+        return h_name
+
+
 def getstate(space):
     """Get the (possibly cached) module state object."""
     return space.fromcache(State)
@@ -800,17 +956,33 @@ def _wrap_handle(space, handle):
     """
     if handle == support.EMJS_ERROR:
         _raise_error(space)
+    if handle <= support.EMJS_MAX_STATIC_HANDLE:
+        return _wrap_static_handle(space, handle)
+    typ = support.emjs_typeof(handle)
+    if typ == support.EMJS_TYPE_ERROR:
+        _raise_error(space)
+    return _wrap_typed_handle(space, handle, typ)
+
+
+def _wrap_static_handle(space, handle):
     if handle == support.EMJS_UNDEFINED:
         return space.wrap(undefined)
     if handle == support.EMJS_NULL:
         return space.wrap(null)
     if handle == support.EMJS_FALSE:
         return space.wrap(false)
-    if handle == support.EMJS_TRUE:
-        return space.wrap(true)
-    typ = support.emjs_typeof(handle)
-    if typ == support.EMJS_TYPE_ERROR:
-        _raise_error(space)
+    assert handle == support.EMJS_TRUE
+    return space.wrap(true)
+
+
+def _wrap_typed_handle(space, handle, typ):
+    """Helper function to wrap a handle whose js-level type is already known.
+
+    The bulk read operations report the type of each item along with its
+    handle, so they can use this to avoid a call to emjs_typeof per item.
+    """
+    if handle <= support.EMJS_MAX_STATIC_HANDLE:
+        return _wrap_static_handle(space, handle)
     if typ == support.EMJS_TYPE_NUMBER:
         return space.wrap(W_Number(handle))
     if typ == support.EMJS_TYPE_STRING:
@@ -852,9 +1024,62 @@ class _unwrap_handle(object):
             return self.w_transient.handle
 
     def __exit__(self, exc_typ, exc_val, exc_tb):
-        # A transient handle will be cleaned up by normal garbage collection.
-        # We just needed to keep it alive until the end of the block.
-        pass
+        # A transient handle is no longer needed at the end of the block,
+        # so free it now rather than leaving it in the handle table until
+        # the wrapper happens to be garbage collected.
+        if self.w_transient is not None:
+            self.w_transient.release()
+
+
+class _handle_arena(object):
+    """Context-manager for freeing a batch of transient handles in bulk.
+
+    Values converted for the duration of a single operation can be added
+    to the arena, and all of their handles will be freed with a single call
+    at the end of the block.
+    """
+
+    def __init__(self, space):
+        self.space = space
+        self.values = []
+
+    def __enter__(self):
+        return self
+
+    def add(self, value):
+        self.values.append(value)
+
+    def __exit__(self, exc_typ, exc_val, exc_tb):
+        values = self.values
+        self.values = []
+        if not values:
+            return
+        n = len(values)
+        with lltype.scoped_alloc(support.EMJS_HANDLE_ARRAY, n) as handles:
+            count = 0
+            for value in values:
+                if not value.released:
+                    value.released = True
+                    handles[count] = value.handle
+                    count += 1
+            support.emjs_free_many(handles, count)
+
+
+def _unwrap_value(space, w_value, arena=None):
+    """Get a W_Value for an app-level object, converting it if necessary.
+
+    If an arena is given, any newly-converted value is added to it.
+    """
+    try:
+        # XXX TODO: how to check this without using try-except?
+        return space.interp_w(W_Value, w_value)
+    except OperationError, e:
+        if not e.match(space, space.w_TypeError):
+            raise
+        value = _convert(space, w_value)
+        if arena is not None:
+            arena.add(value)
+        return value
 
 
 def _convert(space, w_value):
@@ -865,11 +1090,14 @@ def _convert(space, w_value):
         # This works because W_Bool is a subclass of W_Int.
         return W_Boolean(support.emjs_make_bool(space.int_w(w_value)))
     if space.isinstance_w(w_value, space.w_int):
-        return W_Number(support.emjs_make_int32(space.int_w(w_value)))
+        value = space.int_w(w_value)
+        return W_Number(support.emjs_make_int32(value), _int32(value), True)
     if space.isinstance_w(w_value, space.w_long):
-        return W_Number(support.emjs_make_int32(space.int_w(w_value)))
+        value = space.int_w(w_value)
+        return W_Number(support.emjs_make_int32(value), _int32(value), True)
     if space.isinstance_w(w_value, space.w_float):
-        return W_Number(support.emjs_make_double(space.float_w(w_value)))
+        value = space.float_w(w_value)
+        return W_Number(support.emjs_make_double(value), value, True)
     if space.isinstance_w(w_value, space.w_str):
         value = space.str_w(w_value)
         return W_String(support.emjs_make_strn(value, len(value)))
@@ -887,7 +1115,9 @@ def _convert(space, w_value):
                 w_tup = space.next(w_iter)
                 w_key = space.getitem(w_tup, space.newint(0))
                 w_value = space.getitem(w_tup, space.newint(1))
-                space.setattr(obj, w_key, w_value)
+                # Not setattr(): these are data keys rather than attribute
+                # names, and shouldn't fill up the attribute name cache.
+                obj.descr__setitem__(space, w_key, w_value)
             except OperationError as e:
                 if not e.match(space, space.w_StopIteration):
                     raise
@@ -895,20 +1125,9 @@ def _convert(space, w_value):
                     break
         return obj
     if space.isinstance_w(w_value, space.w_list):
-        lst = W_Array(support.emjs_make_array(space.int_w(space.len(w_value))))
-        w_iter = space.iter(w_value)
-        i = 0
-        while True:
-            try:
-                w_item = space.next(w_iter)
-                space.setitem(lst, space.newint(i), w_item)
-                i += 1
-            except OperationError as e:
-                if not e.match(space, space.w_StopIteration):
-                    raise
-                else:
-                    break
-        return lst
+        h_lst = _make_array_from_iterable(space, w_value)
+        _check_error(space, h_lst)
+        return W_Array(h_lst)
     # XXX TODO: is this typecheck safe and accurate?
     if isinstance(w_value, pypy.interpreter.function.Function):
         args = pypy.interpreter.function.Arguments(space, [])
@@ -922,6 +1141,53 @@ def _convert(space, w_value):
     raise OperationError(space.w_TypeError, space.wrap(errmsg))
 
 
+def _int32(value):
+    """Get the float value of an int, after js-style truncation to 32 bits."""
+    return float(rffi.cast(lltype.Signed, rffi.cast(rffi.INT, value)))
+
+
+def _numeric_operands(space, w_self, w_other):
+    """Get the operand values for a numeric fast path, if possible.
+
+    If w_self is a js.Number and w_other is either a js.Number or a python
+    int or float, the operator can be evaluated directly in python with the
+    same result that js would give.  This returns a tuple (ok, lhs, rhs)
+    where ok indicates whether that's the case.
+    """
+    if not isinstance(w_self, W_Number):
+        return False, 0.0, 0.0
+    if isinstance(w_other, W_Number):
+        return True, w_self.read_double(), w_other.read_double()
+    # Note that bools are excluded here, since e.g. 1 !== true in js.
+    w_type = space.type(w_other)
+    if space.is_w(w_type, space.w_int):
+        return True, w_self.read_double(), _int32(space.int_w(w_other))
+    if space.is_w(w_type, space.w_float):
+        return True, w_self.read_double(), space.float_w(w_other)
+    return False, 0.0, 0.0
+
+
+def _make_number(space, value):
+    h_res = support.emjs_make_double(value)
+    _check_error(space, h_res)
+    return space.wrap(W_Number(h_res, value, True))
+
+
+@jit.look_inside_iff(lambda space, name: jit.isconstant(name))
+def _attr_name_handle(space, name):
+    """Get a cached handle to a js string for the given attribute name.
+
+    This returns EMJS_ERROR if the name is not cached, in which case the
+    caller should fall back to passing the name as a string.
+
+    The lookup is folded away in traces where the name is a constant, and
+    left as a residual call otherwise; promoting varying names would make
+    a guard and a bridge for each of them.
+    """
+    state = jit.promote(getstate(space))
+    return state.get_attr_name_handle(name)
+
+
 def convert(space, w_value):
     """Convert a python value into a matching Value instance.
 
@@ -929,13 +1195,7 @@ def convert(space, w_value):
     and strings) into matching javascript Value objects.  It raises TypeError
     for objects that cannot be converted.
     """
-    try:
-        # XXX TODO: how to check this without using try-except?
-        return space.wrap(space.interp_w(W_Value, w_value))
-    except OperationError, e:
-        if not e.match(space, space.w_TypeError):
-            raise
-        return space.wrap(_convert(space, w_value))
+    return space.wrap(_unwrap_value(space, w_value))
 
 
 def globals(space):
@@ -962,12 +1222,8 @@ def bind(space, w_fn, w_ctx):
 
 def new(space, w_fn, args_w):
     with _unwrap_handle(space, w_fn) as h_fn:
-        h_args = support.emjs_make_array(len(args_w))
+        h_args = _make_array(space, args_w)
         _check_error(space, h_args)
-        for i in xrange(len(args_w)):
-            with _unwrap_handle(space, args_w[i]) as h_arg:
-                res = support.emjs_prop_set_int(h_args, i, h_arg)
-            _check_error(space, res)
         h_res = support.emjs_new(h_fn, h_args)
     return _wrap_handle(space, h_res)
 
@@ -1008,6 +1264,230 @@ def uint32(space, w_value):
     return space.wrap(res)
 
 
+def _read_items(space, h_obj):
+    """Read the items of a js array-like into a list of wrapped values.
+
+    This fetches a handle and type for every item in a single bulk call,
+    rather than a get/typeof pair of calls per item.
+    """
+    length = support.emjs_length(h_obj)
+    _check_error(space, length)
+    if length <= 0:
+        return []
+    with lltype.scoped_alloc(support.EMJS_HANDLE_ARRAY, length) as handles:
+        with lltype.scoped_alloc(support.EMJS_TYPE_ARRAY, length) as types:
+            n = support.emjs_read_items(h_obj, handles, types, length)
+            if n < 0:
+                _raise_error(space)
+            return _wrap_items(space, handles, types, n)
+
+
+def _read_props(space, h_obj):
+    """Read the own properties of a js object as lists of keys and values."""
+    h_keys = support.emjs_own_keys(h_obj)
+    _check_error(space, h_keys)
+    try:
+        length = support.emjs_length(h_keys)
+        _check_error(space, length)
+        if length <= 0:
+            return [], []
+        keys = _read_strs(space, h_keys, length)
+        with lltype.scoped_alloc(support.EMJS_HANDLE_ARRAY, length) as handles:
+            with lltype.scoped_alloc(support.EMJS_TYPE_ARRAY, length) as types:
+                n = support.emjs_read_props(h_obj, h_keys, handles, types,
+                                            length)
+                if n < 0:
+                    _raise_error(space)
+                values_w = _wrap_items(space, handles, types, n)
+    finally:
+        support.emjs_free(h_keys)
+    return keys[:n], values_w
+
+
+def _read_strs(space, h_arr, length):
+    """Read a js array of strings into a list of utf8-encoded strings."""
+    with lltype.scoped_alloc(rffi.CArray(rffi.INT), length) as lengths:
+        # Guess at a buffer size, and retry once if it's not big enough.
+        bufsize = length * 16
+        while True:
+            with rffi.scoped_alloc_buffer(bufsize) as buf:
+                total = support.emjs_read_strs(h_arr, buf.raw, bufsize,
+                                               lengths, length)
+                if total < 0:
+                    _raise_error(space)
+                if total <= bufsize:
+                    data = buf.str(total)
+                    break
+            bufsize = total
+        strs = [None] * length
+        pos = 0
+        for i in xrange(length):
+            end = pos + rffi.cast(lltype.Signed, lengths[i])
+            assert end >= pos
+            strs[i] = data[pos:end]
+            pos = end
+    return strs
+
+
+def _wrap_items(space, handles, types, n):
+    items_w = [None] * n
+    for i in xrange(n):
+        handle = rffi.cast(lltype.Signed, handles[i])
+        typ = rffi.cast(lltype.Signed, types[i])
+        items_w[i] = _wrap_typed_handle(space, handle, typ)
+    return items_w
+
+
+def _read_bytes(space, h_obj):
+    """Copy the contents of a js typed array or ArrayBuffer into a string."""
+    size = support.emjs_byte_length(h_obj)
+    if size < 0:
+        _raise_error(space)
+    with rffi.scoped_alloc_buffer(size) as buf:
+        n = support.emjs_read_bytes(h_obj, buf.raw, size)
+        if n < 0:
+            _raise_error(space)
+        return buf.str(n)
+
+
+def _make_array(space, items_w):
+    """Create a js array from a list of app-level values, in a single call."""
+    n = len(items_w)
+    with _handle_arena(space) as arena:
+        with lltype.scoped_alloc(support.EMJS_HANDLE_ARRAY, n) as handles:
+            for i in xrange(n):
+                handles[i] = _unwrap_value(space, items_w[i], arena).handle
+            h_res = support.emjs_make_array_handles(handles, n)
+    return h_res
+
+
+def _make_array_from_iterable(space, w_items):
+    """Create a js array holding the items of an app-level iterable.
+
+    Homogeneous lists of ints or floats are passed over as a single buffer
+    of doubles, avoiding the creation of a transient handle for each item.
+    """
+    ints = space.listview_int(w_items)
+    if ints is not None:
+        with lltype.scoped_alloc(rffi.DOUBLEP.TO, len(ints)) as values:
+            for i in xrange(len(ints)):
+                values[i] = float(ints[i])
+            return support.emjs_make_array_doubles(values, len(ints))
+    floats = space.listview_float(w_items)
+    if floats is not None:
+        with lltype.scoped_alloc(rffi.DOUBLEP.TO, len(floats)) as values:
+            for i in xrange(len(floats)):
+                values[i] = floats[i]
+            return support.emjs_make_array_doubles(values, len(floats))
+    return _make_array(space, space.listview(w_items))
+
+
+class HeapBuffer(Buffer):
+    """Buffer exposing a region of raw memory in the emscripten heap.
+
+    It keeps alive the js view it was created from, and thus the python
+    object (if any) that owns the memory.
+    """
+    __slots__ = ['raw', 'size', 'w_owner']
+    _immutable_ = True
+
+    def __init__(self, raw, size, w_owner):
+        self.raw = raw
+        self.size = size
+        self.w_owner = w_owner
+        self.readonly = False
+
+    def getlength(self):
+        return self.size
+
+    def getitem(self, index):
+        return self.raw[index]
+
+    def setitem(self, index, char):
+        self.raw[index] = char
+
+    def getslice(self, start, stop, step, size):
+        if step == 1:
+            return rffi.charpsize2str(rffi.ptradd(self.raw, start), size)
+        return Buffer.getslice(self, start, stop, step, size)
+
+    def get_raw_address(self):
+        return self.raw
+
+
+@unwrap_spec(typecode=str)
+def heapview(space, w_obj, typecode=""):
+    """Create a js typed array sharing memory with a python buffer object.
+
+    This works for objects whose contents live in raw memory, such as
+    array.array instances and numpy arrays.  The typed array uses the
+    element type of the given array module typecode, defaulting to that of
+    the object itself if it has one, or to "B" otherwise.
+
+    No data is copied.  Writes through either object are visible in the
+    other.  An array.array can't be resized while the view is alive, since
+    that could move its data.
+    """
+    buf = space.buffer_w(w_obj, space.BUF_SIMPLE)
+    try:
+        ptr = buf.get_raw_address()
+    except ValueError:
+        raise oefmt(space.w_TypeError,
+                    "'%T' object does not keep its data in raw memory, "
+                    "so it cannot be shared with javascript", w_obj)
+    if not typecode:
+        w_typecode = space.findattr(w_obj, space.wrap("typecode"))
+        if w_typecode is not None:
+            typecode = space.str_w(w_typecode)
+        else:
+            typecode = "B"
+    if len(typecode) != 1:
+        raise oefmt(space.w_ValueError, "typecode must be a single character")
+    h_view = support.emjs_make_heap_view(ord(typecode[0]),
+                                         rffi.cast(rffi.VOIDP, ptr),
+                                         buf.getlength())
+    _check_error(space, h_view)
+    view = W_Object(h_view)
+    view.w_base = w_obj
+    if isinstance(w_obj, W_ArrayBase):
+        w_obj.lock_resize()
+    return space.wrap(view)
+
+
+def heapbuffer(space, w_view):
+    """Get a memoryview onto the heap memory behind a typed array.
+
+    The typed array must be a view onto the emscripten heap, such as one
+    created by heapview().  No data is copied.
+    """
+    view = space.interp_w(W_Value, w_view)
+    offset = support.emjs_heap_offset(view.handle)
+    if offset < 0:
+        _raise_error(space)
+    size = support.emjs_byte_length(view.handle)
+    if size < 0:
+        _raise_error(space)
+    raw = rffi.cast(rffi.CCHARP, offset)
+    return space.wrap(W_MemoryView(HeapBuffer(raw, size, view)))
+
+
+def handle_stats(space):
+    """Get statistics about the table of live js value handles.
+
+    This returns a dict with the number of currently live handles, the peak
+    number of live handles, the number of attempts to free an already-freed
+    handle, and the current size of the handle table.
+    """
+    w_stats = space.newdict()
+    for name, which in [("live", support.EMJS_STAT_LIVE_HANDLES),
+                        ("peak", support.EMJS_STAT_PEAK_HANDLES),
+                        ("stale_frees", support.EMJS_STAT_STALE_FREES),
+                        ("table_size", support.EMJS_STAT_TABLE_SIZE)]:
+        value = support.emjs_handle_stat(which)
+        space.setitem(w_stats, space.wrap(name), space.wrap(value))
+    return w_stats
+
+
 def _make_callback(space, w_callback, wants_this, args):
     callback = Callback(space, w_callback, wants_this, args)
     dataptr = rffi.cast(rffi.VOIDP, callback.id)
@@ -1059,8 +1539,8 @@ def dispatch_callback(dataptr, h_args):
     args_w, kw_w = callback.__args__.unpack()
     if kw_w:
         raise RuntimeError("callback function kw args not implemented yet")
-    h_args_len = support.emjs_length(h_args)
-    all_args_len = len(args_w) + h_args_len
+    h_args_w = _read_items(space, h_args)
+    all_args_len = len(args_w) + len(h_args_w)
     if callback.wants_this:
         all_args_len += 1
     all_args_w = [None] * all_args_len
@@ -1073,8 +1553,7 @@ def dispatch_callback(dataptr, h_args):
     for w_arg in args_w:
         all_args_w[i] = w_arg
         i += 1
-    for j in xrange(h_args_len):
-        w_arg = _wrap_handle(space, support.emjs_prop_get_int(h_args, j))
+    for w_arg in h_args_w:
         all_args_w[i] = w_arg
         i += 1
     # Do the call, propagating return value or error as appropriate.
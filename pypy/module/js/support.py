@@ -2,6 +2,7 @@
 from __future__ import with_statement
 
 import os
+import re
 
 from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.rtyper.tool import rffi_platform
@@ -26,7 +27,8 @@ CONSTANTS = [
     'EMJS_ERROR', 'EMJS_OK', 'EMJS_UNDEFINED', 'EMJS_NULL', 'EMJS_FALSE',
     'EMJS_TRUE', 'EMJS_TYPE_ERROR', 'EMJS_TYPE_UNDEFINED', 'EMJS_TYPE_BOOLEAN',
     'EMJS_TYPE_NUMBER', 'EMJS_TYPE_STRING', 'EMJS_TYPE_OBJECT',
-    'EMJS_TYPE_FUNCTION',
+    'EMJS_TYPE_FUNCTION', 'EMJS_MAX_STATIC_HANDLE', 'EMJS_STAT_LIVE_HANDLES',
+    'EMJS_STAT_PEAK_HANDLES', 'EMJS_STAT_STALE_FREES', 'EMJS_STAT_TABLE_SIZE',
 ]
 
 
@@ -57,6 +59,10 @@ EMJS_HANDLE_TP = cConfig.emjs_handle
 EMJS_TYPE_TP = cConfig.emjs_type
 CALLBACK_TP = rffi.CCallback([rffi.VOIDP, EMJS_HANDLE_TP], EMJS_HANDLE_TP)
 CALLBACK_V_TP = rffi.CCallback([rffi.VOIDP, EMJS_HANDLE_TP], lltype.Void)
+EMJS_HANDLE_ARRAY = rffi.CArray(EMJS_HANDLE_TP)
+EMJS_HANDLE_ARRAYP = lltype.Ptr(EMJS_HANDLE_ARRAY)
+EMJS_TYPE_ARRAY = rffi.CArray(EMJS_TYPE_TP)
+EMJS_TYPE_ARRAYP = lltype.Ptr(EMJS_TYPE_ARRAY)
 
 
 # This will on-demand load the javascript library for the implementation
@@ -66,6 +72,25 @@ ctx = None
 _strings = {}
 _string_id = 1
 
+# When running untranslated, we keep a count of calls made into the
+# javascript library.  This makes it easy to check how many boundary
+# crossings a particular operation needs.
+
+call_counts = {}
+
+def get_call_count():
+    return sum(call_counts.values())
+
+def reset_call_counts():
+    call_counts.clear()
+
+_SIZEOF = {'i8': 1, 'i32': 4, 'float': 4, 'double': 8}
+
+def _is_buffer_type(TP):
+    if not isinstance(TP, lltype.Ptr) or TP == rffi.VOIDP:
+        return False
+    return isinstance(TP.TO, lltype.Array)
+
 def load_javascript_ctx():
     global ctx
     if ctx is not None:
@@ -102,6 +127,26 @@ def load_javascript_ctx():
             string = _strings[ptr]
             string[idx] = chr(char)
 
+        def doSetValue(ptr, pos, value, type):
+            array = _strings[ptr]
+            if type == 'i8':
+                array[pos] = chr(value & 0xFF)
+            else:
+                array[pos // _SIZEOF[type]] = value
+
+        def doGetValue(ptr, pos, type):
+            array = _strings[ptr]
+            if type == 'i8':
+                return ord(array[pos])
+            return array[pos // _SIZEOF[type]]
+
+        class HEAPU8:
+
+            def set(self, bytes, ptr):
+                array = _strings[ptr]
+                for i in xrange(bytes.length):
+                    array[i] = chr(bytes[i])
+
         def mergeInto(dst, src):
             pass
 
@@ -119,6 +164,9 @@ def load_javascript_ctx():
         ctx.locals.Pointer_stringify = Pointer_stringify
         ctx.locals.intArrayFromString = intArrayFromString
         ctx.locals.doSetChar = doSetChar
+        ctx.locals.doSetValue = doSetValue
+        ctx.locals.doGetValue = doGetValue
+        ctx.locals.HEAPU8 = HEAPU8()
         ctx.locals.mergeInto = mergeInto
         ctx.locals.Runtime = Runtime()
         ctx.locals.debug = debug
@@ -133,6 +181,10 @@ def load_javascript_ctx():
             src = f.read()
             src = src.replace("makeSetValue('bufptr', 'i', 'chr', 'i8')",
                               "doSetChar(bufptr, i, chr)")
+            src = re.sub(r"makeSetValue\('(\w+)', '([^']*)', '(\w+)', "
+                         r"'(\w+)'\)", r"doSetValue(\1, \2, \3, '\4')", src)
+            src = re.sub(r"{{{ makeGetValue\('(\w+)', '([^']*)', '(\w+)'\) }}}",
+                         r"doGetValue(\1, \2, '\3')", src)
             ctx.eval(src)
 
         # Apply emscripten name-mangling rules.
@@ -165,8 +217,11 @@ def jsexternal(args_t, result_t, **kwds):
             ctx = load_javascript_ctx()
             args = list(args)
             my_strings = []
+            call_counts[func.__name__] = call_counts.get(func.__name__, 0) + 1
             for i, arg in enumerate(args):
-                if args_t[i] == rffi.CCHARP:
+                # Raw buffers of any type are passed by registered id,
+                # just like strings.  The opaque user-data pointers are not.
+                if _is_buffer_type(args_t[i]):
                     _strings[_string_id] = arg
                     args[i] = _string_id
                     my_strings.append(_string_id)
@@ -186,6 +241,16 @@ def emjs_free(h):
     raise NotImplementedError
 
 
+@jsexternal([EMJS_HANDLE_ARRAYP, lltype.Signed], lltype.Void)
+def emjs_free_many(handles, count):
+    raise NotImplementedError
+
+
+@jsexternal([lltype.Signed], lltype.Signed)
+def emjs_handle_stat(which):
+    raise NotImplementedError
+
+
 @jsexternal([EMJS_HANDLE_TP], EMJS_HANDLE_TP)
 def emjs_dup(h):
     raise NotImplementedError
@@ -535,3 +600,61 @@ def emjs_read_str(h, buf):
 @jsexternal([EMJS_HANDLE_TP, rffi.CCHARP, lltype.Signed], lltype.Signed)
 def emjs_read_strn(h, buf, maxlen):
     raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP, EMJS_HANDLE_ARRAYP, EMJS_TYPE_ARRAYP,
+             lltype.Signed], lltype.Signed)
+def emjs_read_items(h, handles, types, maxlen):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP], EMJS_HANDLE_TP)
+def emjs_own_keys(h):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP, EMJS_HANDLE_TP, EMJS_HANDLE_ARRAYP,
+             EMJS_TYPE_ARRAYP, lltype.Signed], lltype.Signed)
+def emjs_read_props(h, h_keys, handles, types, maxlen):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP, rffi.CCHARP, lltype.Signed, rffi.INTP,
+             lltype.Signed], lltype.Signed)
+def emjs_read_strs(h, buf, buflen, lengths, maxlen):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_ARRAYP, lltype.Signed], EMJS_HANDLE_TP)
+def emjs_make_array_handles(handles, size):
+    raise NotImplementedError
+
+
+@jsexternal([rffi.DOUBLEP, lltype.Signed], EMJS_HANDLE_TP)
+def emjs_make_array_doubles(values, size):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP], lltype.Signed)
+def emjs_byte_length(h):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP, rffi.CCHARP, lltype.Signed], lltype.Signed)
+def emjs_read_bytes(h, buf, maxlen):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP], lltype.Signed)
+def emjs_array_typecode(h):
+    raise NotImplementedError
+
+
+@jsexternal([lltype.Signed, rffi.VOIDP, lltype.Signed], EMJS_HANDLE_TP)
+def emjs_make_heap_view(typecode, ptr, size):
+    raise NotImplementedError
+
+
+@jsexternal([EMJS_HANDLE_TP], lltype.Signed)
+def emjs_heap_offset(h):
+    raise NotImplementedError
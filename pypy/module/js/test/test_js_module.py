@@ -14,9 +14,20 @@ from pypy.interpreter.gateway import unwrap_spec, interp2app
 class AppTestJS(object):
 
     spaceconfig = {
-        "usemodules": ["js"]
+        "usemodules": ["js", "array"]
     }
 
+    def setup_class(cls):
+        from pypy.module.js import support
+        def call_count(space):
+            return space.wrap(support.get_call_count())
+        cls.w_call_count = cls.space.wrap(interp2app(call_count))
+        def calls_made(space):
+            names = sorted(support.call_counts)
+            support.reset_call_counts()
+            return space.newlist([space.wrap(name) for name in names])
+        cls.w_calls_made = cls.space.wrap(interp2app(calls_made))
+
     def test_py_to_js_conversion(self):
         import js
         assert isinstance(js.convert("hello"), js.String)
@@ -43,6 +54,15 @@ class AppTestJS(object):
         jsobj = js.convert({u'foo': 'bar'})
         assert isinstance(jsobj, js.Object)
         assert jsobj.foo == 'bar'
+        jsobj = js.convert({1: 'one'})
+        assert jsobj[1] == 'one'
+        # Keys are set as strings, not through the attribute name cache.
+        self.calls_made()
+        jsobj = js.convert(dict(('key%d' % i, i) for i in range(10)))
+        assert jsobj.key7 == 7
+        calls = self.calls_made()
+        assert "emjs_prop_set_str" in calls
+        assert "emjs_prop_set" not in calls
 
     def test_py_to_js_list_conversion(self):
         import js
@@ -122,3 +142,203 @@ class AppTestJS(object):
         import js
         js.eval("var x = 12")
         assert js.globals.x == 12
+
+    def test_js_array_to_list(self):
+        import js
+        a = js.eval("[1, 'two', null, [3], {four: 4}]")
+        items = a.to_list()
+        assert isinstance(items, list)
+        assert len(items) == 5
+        assert items[0] == 1
+        assert isinstance(items[1], js.String)
+        assert str(items[1]) == "two"
+        assert items[2] is js.null
+        assert isinstance(items[3], js.Array)
+        assert items[3][0] == 3
+        assert isinstance(items[4], js.Object)
+        assert items[4].four == 4
+        assert js.Array([], 0).to_list() == []
+
+    def test_js_object_to_dict(self):
+        import js
+        proto = js.Object()
+        proto["z"] = 9
+        obj = js.Object()
+        obj["a"] = 1
+        obj["b"] = "bee"
+        obj["__proto__"] = proto
+        d = obj.to_dict()
+        assert sorted(d.keys()) == ["a", "b"]
+        assert d["a"] == 1
+        assert str(d["b"]) == "bee"
+        assert js.Object().to_dict() == {}
+
+    def test_js_typed_array_copies(self):
+        import js
+        import array
+        ta = js.eval("new Uint8Array([1, 2, 250])")
+        assert ta.to_bytearray() == bytearray([1, 2, 250])
+        assert ta.to_array() == array.array("B", [1, 2, 250])
+        ta = js.eval("new Float64Array([1.5, -2.25])")
+        assert ta.to_array() == array.array("d", [1.5, -2.25])
+        ta = js.eval("new Int32Array([7, -7]).subarray(1)")
+        assert ta.to_array() == array.array("i", [-7])
+        assert len(ta.to_bytearray()) == 4
+        raises(js.Error, js.Object().to_bytearray)
+        raises(TypeError, js.Object().to_array)
+
+    def test_js_array_from_list(self):
+        import js
+        a = js.Array([1, 2, 3], 0)
+        assert a.to_list() == [1, 2, 3]
+        a = js.Array([1.5, 2.5], 4)
+        assert len(a) == 4
+        assert a[1] == 2.5
+        a = js.Array(["x", None, True, js.Object()], 0)
+        assert len(a) == 4
+        assert str(a[0]) == "x"
+        assert a[1] is js.null
+        assert a[2] is js.true
+
+    def test_bulk_operations_cross_once(self):
+        import js
+        n = 100
+        a = js.convert(range(n))
+        # Indexing the array element-by-element costs several calls
+        # into javascript per item...
+        start = self.call_count()
+        for i in range(n):
+            a[i]
+        per_item = (self.call_count() - start) / float(n)
+        assert per_item >= 2
+        # ...while the bulk version needs only a fixed number of calls.
+        start = self.call_count()
+        items = a.to_list()
+        assert self.call_count() - start <= 3
+        assert items == range(n)
+        start = self.call_count()
+        js.Array(range(n), 0)
+        assert self.call_count() - start <= 3
+        ta = js.eval("new Float64Array(100)")
+        start = self.call_count()
+        ta.to_array()
+        assert self.call_count() - start <= 3
+        print "crossings per item: indexing %.2f, to_list %.2f" % (
+            per_item, 3.0 / n)
+
+    def test_heapview_needs_raw_memory(self):
+        import js
+        raises(TypeError, js.heapview, bytearray(8))
+        raises(TypeError, js.heapview, 42)
+
+    def test_heapview_locks_array_size(self):
+        import js, array, gc
+        a = array.array('i', [1, 2, 3, 4])
+        view = js.heapview(a)
+        raises(BufferError, a.append, 5)
+        raises(BufferError, a.extend, [5, 6])
+        raises(BufferError, a.pop)
+        raises(BufferError, a.__delitem__, 0)
+        a[1] = 42
+        assert view[1] == 42
+        buf = js.heapbuffer(view)
+        del view
+        gc.collect()
+        # the memoryview keeps the js view, and so the lock, alive
+        raises(BufferError, a.append, 5)
+        assert len(buf) == 4 * a.itemsize
+        del buf
+        gc.collect()
+        a.append(5)
+        assert a.tolist() == [1, 42, 3, 4, 5]
+
+    def test_heapbuffer_needs_heap_view(self):
+        import js
+        raises(js.Error, js.heapbuffer, js.eval("new Uint8Array(4)"))
+        raises(js.Error, js.heapbuffer, js.Object())
+
+    def test_handle_stats(self):
+        import js
+        stats = js.handle_stats()
+        assert sorted(stats) == ["live", "peak", "stale_frees", "table_size"]
+        assert stats["peak"] >= stats["live"] > 0
+        assert stats["table_size"] > stats["live"]
+
+    def test_transient_handles_are_freed(self):
+        import js
+        a = js.Array([], 0)
+        before = js.handle_stats()["live"]
+        for i in range(50):
+            a.push(i, "x", 1.5)
+        assert len(a) == 150
+        assert js.handle_stats()["live"] <= before + 5
+
+    def test_js_number_fast_paths(self):
+        import js
+        x = js.Number(7.5)
+        start = self.call_count()
+        assert x < 10
+        assert x >= 7.5
+        assert x == 7.5
+        assert x != 7
+        assert float(x) == 7.5
+        assert self.call_count() == start
+        y = x + 1
+        assert isinstance(y, js.Number)
+        assert y == 8.5
+        assert self.call_count() - start == 1
+        assert x - js.Number(0.5) == 7
+        assert x * 2 == 15
+        assert x / 2 == 3.75
+        assert -x == -7.5
+        assert js.Number(-7) % 3 == -1
+        # Bools aren't numbers as far as js equality is concerned.
+        assert js.Number(1) != True
+        # Division by zero follows js semantics rather than raising.
+        assert str(x / 0) == "Infinity"
+        assert str(x % 0) == "NaN"
+        # Numbers from js have their value read once, when first needed.
+        z = js.eval("40")
+        assert z + 2 == 42
+
+    def test_attribute_names_are_cached(self):
+        import js
+        obj = js.Object()
+        obj.foo = 1
+        assert obj.foo == 1
+        self.calls_made()
+        obj.foo = 2
+        assert obj.foo == 2
+        del obj.foo
+        raises(AttributeError, getattr, obj, "foo")
+        # No string conversions are needed for an already-seen name.
+        calls = self.calls_made()
+        assert "emjs_prop_get" in calls
+        assert "emjs_prop_get_str" not in calls
+        assert "emjs_prop_set_str" not in calls
+        assert "emjs_prop_delete_str" not in calls
+
+
+class TestState(object):
+
+    def make_state(self):
+        from pypy.module.js.interp_js import State
+        class FakeSpace(object):
+            def new_exception_class(self, name):
+                return None
+            def wrap(self, w_obj):
+                return w_obj
+        return State(FakeSpace())
+
+    def test_attr_name_handle_errors_are_not_cached(self, monkeypatch):
+        from pypy.module.js import support
+        results = [support.EMJS_ERROR, 42]
+        monkeypatch.setattr(support, "emjs_make_strn",
+                            lambda name, size: results.pop(0))
+        monkeypatch.setattr(support, "emjs_clear_error", lambda: None)
+        state = self.make_state()
+        assert state.get_attr_name_handle("foo") == support.EMJS_ERROR
+        assert state.attr_name_handles == {}
+        assert state.get_attr_name_handle("foo") == 42
+        assert state.get_attr_name_handle("foo") == 42
+        assert state.attr_name_handles == {"foo": 42}
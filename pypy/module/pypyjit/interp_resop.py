@@ -363,10 +363,12 @@ W_JitLoopInfo.acceptable_as_base_class = False
 
 
 class W_JitInfoSnapshot(W_Root):
-    def __init__(self, space, w_times, w_counters, w_counter_times):
+    def __init__(self, space, w_times, w_counters, w_counter_times,
+                 w_func_stats):
         self.w_loop_run_times = w_times
         self.w_counters = w_counters
         self.w_counter_times = w_counter_times
+        self.w_func_stats = w_func_stats
 
 W_JitInfoSnapshot.typedef = TypeDef(
     "JitInfoSnapshot",
@@ -377,7 +379,12 @@ W_JitInfoSnapshot.typedef = TypeDef(
                                        doc="various JIT counters"),
     counter_times = interp_attrproperty_w("w_counter_times",
                                             cls=W_JitInfoSnapshot,
-                                            doc="various JIT timers")
+                                            doc="various JIT timers"),
+    func_stats = interp_attrproperty_w("w_func_stats",
+                                         cls=W_JitInfoSnapshot,
+                                         doc="code generation statistics "
+                                             "for each compiled function, "
+                                             "on backends that have them")
 )
 W_JitInfoSnapshot.acceptable_as_base_class = False
 
@@ -402,8 +409,23 @@ def get_stats_snapshot(space):
     space.setitem_str(w_counter_times, 'TRACING', space.wrap(tr_time))
     b_time = jit_hooks.stats_get_times_value(None, Counters.BACKEND)
     space.setitem_str(w_counter_times, 'BACKEND', space.wrap(b_time))
+    ll_func_stats = jit_hooks.stats_get_func_stats(None)
+    func_stats_w = []
+    for i in range(len(ll_func_stats)):
+        s = ll_func_stats[i]
+        w_stats = space.newdict()
+        space.setitem_str(w_stats, 'funcid', space.wrap(s.funcid))
+        space.setitem_str(w_stats, 'source_bytes', space.wrap(s.source_bytes))
+        space.setitem_str(w_stats, 'num_blocks', space.wrap(s.num_blocks))
+        space.setitem_str(w_stats, 'num_reassemblies',
+                          space.wrap(s.num_reassemblies))
+        space.setitem_str(w_stats, 'num_merges', space.wrap(s.num_merges))
+        space.setitem_str(w_stats, 'generate_ms', space.wrap(s.generate_ms))
+        space.setitem_str(w_stats, 'compile_ms', space.wrap(s.compile_ms))
+        func_stats_w.append(w_stats)
+    w_func_stats = space.newlist(func_stats_w)
     return space.wrap(W_JitInfoSnapshot(space, w_times, w_counters,
-                                        w_counter_times))
+                                        w_counter_times, w_func_stats))
 
 def enable_debug(space):
     """ Set the jit debugging - completely necessary for some stats to work,
@@ -145,6 +145,43 @@ def compute_stdlib_path_maybe(state, prefix):
         return None
 
 
+def _relocate(path, old_prefix, new_prefix):
+    if path == old_prefix or path.startswith(old_prefix + os.sep):
+        return new_prefix + path[len(old_prefix):]
+    return path
+
+
+def relocate_preimported_modules(state, prefix):
+    """
+    Make the ``__file__`` and ``__path__`` of the modules imported at
+    translation time point inside the stdlib rooted at ``prefix``, instead
+    of inside the source tree they were imported from.  This matters for
+    packages, whose submodules are still imported lazily from ``__path__``
+    (e.g. the codecs of ``encodings``).
+    """
+    old_prefix = state.preimport_prefix
+    if old_prefix is None or old_prefix == prefix:
+        return
+    space = state.space
+    for w_module in state.preimported_modules:
+        w_dict = w_module.getdict(space)
+        if w_dict is None:
+            continue
+        w_file = space.finditem_str(w_dict, '__file__')
+        if w_file is not None and space.isinstance_w(w_file, space.w_str):
+            filename = _relocate(space.str_w(w_file), old_prefix, prefix)
+            space.setitem_str(w_dict, '__file__', space.wrap(filename))
+        w_path = space.finditem_str(w_dict, '__path__')
+        if w_path is not None and space.isinstance_w(w_path, space.w_list):
+            paths_w = space.listview(w_path)
+            for i in range(len(paths_w)):
+                w_item = paths_w[i]
+                if space.isinstance_w(w_item, space.w_str):
+                    path = _relocate(space.str_w(w_item), old_prefix, prefix)
+                    space.setitem(w_path, space.wrap(i), space.wrap(path))
+    state.preimport_prefix = prefix
+
+
 @unwrap_spec(executable='str0')
 def pypy_find_executable(space, executable):
     return space.wrap(find_executable(executable))
@@ -157,9 +194,11 @@ def pypy_resolvedirof(space, filename):
 
 @unwrap_spec(executable='str0')
 def pypy_find_stdlib(space, executable):
-    path, prefix = find_stdlib(get_state(space), executable)
+    state = get_state(space)
+    path, prefix = find_stdlib(state, executable)
     if path is None:
         return space.w_None
+    relocate_preimported_modules(state, prefix)
     w_prefix = space.wrap(prefix)
     space.setitem(space.sys.w_dict, space.wrap('prefix'), w_prefix)
     space.setitem(space.sys.w_dict, space.wrap('exec_prefix'), w_prefix)
@@ -15,6 +15,11 @@ class State:
         self.w_warnoptions = space.newlist([])
         self.w_argv = space.newlist([])
 
+        # modules imported at translation time (see --preimport), and the
+        # prefix of the stdlib they were imported from
+        self.preimported_modules = []
+        self.preimport_prefix = None
+
         self.setinitialpath(space)
 
     def setinitialpath(self, space):
@@ -45,8 +45,30 @@ def bench_simple_dict(SIZE = 10000):
     count_operation("Existing key access", lambda : rand_keys(lookup_keys))
     return test_d
 
+def bench_float_dict(SIZE = 100000):
+    # float keys stay unboxed with FloatDictStrategy; int lookups of
+    # float keys don't force a switch to the object strategy
+    keys = [i * 0.25 for i in xrange(SIZE)]
+
+    def fill():
+        d = {}
+        for key in keys:
+            d[key] = d.get(key, 0) + 1
+        return d
+
+    test_d = count_operation("Float key histogram", fill)
+
+    def int_lookups():
+        for i in xrange(SIZE):
+            test_d.get(i)
+
+    count_operation("Int lookups in float dict", int_lookups)
+    return test_d
+
 if __name__ == '__main__':
     test_d = bench_simple_dict()
     import __pypy__
     print __pypy__.internal_repr(test_d)
     print __pypy__.internal_repr(test_d.iterkeys())
+    test_d = bench_float_dict()
+    print __pypy__.internal_repr(test_d)
@@ -0,0 +1,63 @@
+""" construct ORM-style model objects from keyword arguments
+
+Run with pypy-c, once as is and once with --objspace-std-withmapdictkwargs,
+to compare kwargs dicts stored as plain key/value lists against map dicts
+sharing their keys with the instances they are copied into.
+"""
+
+import sys, time
+
+class Model(object):
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+class User(Model):
+    def __init__(self, **kwargs):
+        kwargs.setdefault('active', True)
+        Model.__init__(self, **kwargs)
+
+def count_operation(name, function):
+    t0 = time.time()
+    retval = function()
+    tk = time.time()
+    print "%-10s takes: %f" % (name, tk - t0)
+    return retval
+
+def construct(size):
+    result = None
+    for i in xrange(size):
+        result = Model(id=i, name='x', email='x@example.com', score=i * 2)
+    return result
+
+def construct_forwarded(size):
+    result = None
+    for i in xrange(size):
+        result = User(id=i, name='x', email='x@example.com', score=i * 2)
+    return result
+
+def read_back(size):
+    obj = construct(1)
+    total = 0
+    for i in xrange(size):
+        total += obj.__dict__['score'] + len(obj.__dict__)
+    return total
+
+def strategy(d):
+    try:
+        import __pypy__
+    except ImportError:
+        return "n/a"
+    return __pypy__.strategy(d)
+
+def kwargs_strategy(**kwargs):
+    return strategy(kwargs)
+
+if __name__ == '__main__':
+    size = 1000000
+    if len(sys.argv) > 1:
+        size = int(sys.argv[1])
+    count_operation("Construct", lambda: construct(size))
+    count_operation("Forwarded", lambda: construct_forwarded(size))
+    count_operation("Read", lambda: read_back(size))
+    print "kwargs strategy:", kwargs_strategy(a=1)
+    print "instance dict strategy:", strategy(construct(1).__dict__)
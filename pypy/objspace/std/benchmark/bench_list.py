@@ -0,0 +1,70 @@
+
+""" compare lists of ints mixed with floats against homogeneous lists
+
+Run with pypy-c, once as is and once with
+--objspace-std-nowithliststrategies, to compare against lists of boxed
+objects.
+"""
+
+import gc, sys, time
+
+def count_operation(name, function):
+    t0 = time.time()
+    retval = function()
+    tk = time.time()
+    print "%-10s takes: %f" % (name, tk - t0)
+    return retval
+
+def make_mixed(size):
+    return [i if i % 3 else i + 0.5 for i in xrange(size)]
+
+def make_floats(size):
+    return [i + 0.5 for i in xrange(size)]
+
+def get_memory():
+    # resident set size in kB, only available on Linux
+    gc.collect()
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('VmRSS:'):
+                    return int(line.split()[1])
+    except IOError:
+        pass
+    return 0
+
+def bench_list(name, make, SIZE=1000000, REPEAT=10):
+    print name
+    mem_before = get_memory()
+    l = count_operation("Creation", lambda: make(SIZE))
+    mem_after = get_memory()
+    if mem_after:
+        print "%-10s %d kB" % ("Memory", mem_after - mem_before)
+
+    def index():
+        total = 0
+        for j in xrange(REPEAT):
+            for i in xrange(SIZE):
+                total += l[i]
+        return total
+
+    count_operation("Indexing", index)
+    count_operation("Sum", lambda: [sum(l) for j in xrange(REPEAT)])
+    count_operation("Sorted", lambda: [sorted(l, reverse=True)
+                                       for j in xrange(REPEAT)])
+    print "strategy:", strategy(l)
+    print
+
+def strategy(l):
+    try:
+        import __pypy__
+    except ImportError:
+        return "n/a"
+    return __pypy__.strategy(l)
+
+if __name__ == '__main__':
+    size = 1000000
+    if len(sys.argv) > 1:
+        size = int(sys.argv[1])
+    bench_list("floats", make_floats, size)
+    bench_list("ints and floats", make_mixed, size)
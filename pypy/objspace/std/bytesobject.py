@@ -674,8 +674,8 @@ class W_BytesObject(W_AbstractBytesObject):
         if space.isinstance_w(w_prefix, space.w_unicode):
             self_as_unicode = unicode_from_encoded_object(space, self, None,
                                                           None)
-            return self_as_unicode._startswith(space, self_as_unicode._value,
-                                               w_prefix, start, end)
+            return self_as_unicode._startswith(
+                space, self_as_unicode._get_value(), w_prefix, start, end)
         return self._StringMethods__startswith(space, value, w_prefix, start,
                                                end)
 
@@ -684,8 +684,8 @@ class W_BytesObject(W_AbstractBytesObject):
         if space.isinstance_w(w_suffix, space.w_unicode):
             self_as_unicode = unicode_from_encoded_object(space, self, None,
                                                           None)
-            return self_as_unicode._endswith(space, self_as_unicode._value,
-                                             w_suffix, start, end)
+            return self_as_unicode._endswith(
+                space, self_as_unicode._get_value(), w_suffix, start, end)
         return self._StringMethods__endswith(space, value, w_suffix, start,
                                              end)
 
@@ -697,7 +697,7 @@ class W_BytesObject(W_AbstractBytesObject):
             self_as_unicode = unicode_from_encoded_object(space, self, None,
                                                           None)
             return space.newbool(
-                self_as_unicode._value.find(w_sub._value) >= 0)
+                self_as_unicode._get_value().find(w_sub._get_value()) >= 0)
         return self._StringMethods_descr_contains(space, w_sub)
 
     _StringMethods_descr_replace = descr_replace
@@ -3,12 +3,12 @@ maps keys to objects. If a specific key is changed a lot, a level of
 indirection is introduced to make the version tag change less often.
 """
 
-from rpython.rlib import jit, rerased
+from rpython.rlib import jit, rerased, objectmodel
 
 from pypy.interpreter.baseobjspace import W_Root
 from pypy.objspace.std.dictmultiobject import (
-    DictStrategy, ObjectDictStrategy, _never_equal_to_string,
-    create_iterator_classes)
+    DictStrategy, ObjectDictStrategy, W_DictMultiObject,
+    _never_equal_to_string, create_iterator_classes)
 from pypy.objspace.std.typeobject import (
     MutableCell, IntMutableCell, ObjectMutableCell, write_cell)
 
@@ -151,6 +151,7 @@ class ModuleDictStrategy(DictStrategy):
         d = self.unerase(w_dict.dstorage)
         strategy = space.fromcache(ObjectDictStrategy)
         d_new = strategy.unerase(strategy.get_empty_storage())
+        objectmodel.prepare_dict_update(d_new, len(d), exact=True)
         for key, cell in d.iteritems():
             d_new[_wrapkey(space, key)] = unwrap_cell(self.space, cell)
         w_dict.strategy = strategy
@@ -172,3 +173,99 @@ class ModuleDictStrategy(DictStrategy):
 
 
 create_iterator_classes(ModuleDictStrategy)
+
+
+# ____________________________________________________________
+# Magic caching of LOAD_GLOBAL
+
+class GlobalCacheEntry(object):
+    globals_strategy = None
+    globals_version = None
+    builtin_strategy = None     # None if the name was found in the globals
+    builtin_version = None
+    w_cell = None
+    success_counter = 0
+    failure_counter = 0
+
+    def is_valid_for_frame(self, f):
+        globals_strategy = self.globals_strategy
+        if globals_strategy is None:
+            return False
+        if (_get_module_strategy(f.w_globals) is not globals_strategy or
+                globals_strategy.version is not self.globals_version):
+            return False
+        builtin_strategy = self.builtin_strategy
+        if builtin_strategy is not None:
+            w_builtin_dict = f.get_builtin().w_dict
+            if (_get_module_strategy(w_builtin_dict) is not builtin_strategy or
+                    builtin_strategy.version is not self.builtin_version):
+                return False
+        if f.space.config.objspace.std.withmethodcachecounter:
+            self.success_counter += 1
+        return True
+
+INVALID_GLOBAL_CACHE_ENTRY = GlobalCacheEntry()
+
+def _get_module_strategy(w_dict):
+    if isinstance(w_dict, W_DictMultiObject):
+        strategy = w_dict.strategy
+        if isinstance(strategy, ModuleDictStrategy):
+            return strategy
+    return None
+
+def init_global_cache(pycode):
+    num_entries = len(pycode.co_names_w)
+    pycode._globals_caches = [INVALID_GLOBAL_CACHE_ENTRY] * num_entries
+
+def _fill_global_cache(pycode, nameindex, globals_strategy, builtin_strategy,
+                       w_cell):
+    entry = pycode._globals_caches[nameindex]
+    if entry is INVALID_GLOBAL_CACHE_ENTRY:
+        entry = GlobalCacheEntry()
+        pycode._globals_caches[nameindex] = entry
+    entry.globals_strategy = globals_strategy
+    entry.globals_version = globals_strategy.version
+    entry.builtin_strategy = builtin_strategy
+    if builtin_strategy is not None:
+        entry.builtin_version = builtin_strategy.version
+    else:
+        entry.builtin_version = None
+    entry.w_cell = w_cell
+    if pycode.space.config.objspace.std.withmethodcachecounter:
+        entry.failure_counter += 1
+
+def LOAD_GLOBAL_caching(f, nameindex):
+    # like LOAD_ATTR_caching in mapdict.py, this only makes the interpreter
+    # faster; it's not used if we_are_jitted().  The entry stays valid as
+    # long as neither the globals nor (if the name was found there) the
+    # builtins get a key added or removed, which changes their version.
+    entry = f.getcode()._globals_caches[nameindex]
+    if entry.is_valid_for_frame(f):
+        return unwrap_cell(f.space, entry.w_cell)
+    return LOAD_GLOBAL_slowpath(f, nameindex)
+LOAD_GLOBAL_caching._always_inline_ = True
+
+def LOAD_GLOBAL_slowpath(f, nameindex):
+    space = f.space
+    pycode = f.getcode()
+    name = f.getname_u(nameindex)
+    # this raises NameError if needed, and forces lazily-loaded builtins
+    w_value = f._load_global(name)
+    globals_strategy = _get_module_strategy(f.w_globals)
+    if globals_strategy is not None:
+        w_cell = globals_strategy.getdictvalue_no_unwrapping(f.w_globals, name)
+        builtin_strategy = None
+        if w_cell is None:
+            w_builtin_dict = f.get_builtin().w_dict
+            builtin_strategy = _get_module_strategy(w_builtin_dict)
+            if builtin_strategy is not None:
+                w_cell = builtin_strategy.getdictvalue_no_unwrapping(
+                    w_builtin_dict, name)
+        if w_cell is not None:
+            _fill_global_cache(pycode, nameindex, globals_strategy,
+                               builtin_strategy, w_cell)
+            return w_value
+    if space.config.objspace.std.withmethodcachecounter:
+        INVALID_GLOBAL_CACHE_ENTRY.failure_counter += 1
+    return w_value
+LOAD_GLOBAL_slowpath._dont_inline_ = True
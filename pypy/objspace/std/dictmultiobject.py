@@ -2,7 +2,9 @@
 
 from rpython.rlib import jit, rerased, objectmodel
 from rpython.rlib.debug import mark_dict_non_null
-from rpython.rlib.objectmodel import newlist_hint, r_dict, specialize
+from rpython.rlib.longlong2float import float2longlong
+from rpython.rlib.objectmodel import (
+    compute_hash, newlist_hint, r_dict, specialize)
 from rpython.tool.sourcetools import func_renamer, func_with_new_name
 
 from pypy.interpreter.baseobjspace import W_Root
@@ -55,6 +57,10 @@ class W_DictMultiObject(W_Root):
         elif space.config.objspace.std.withmapdict and instance:
             from pypy.objspace.std.mapdict import MapDictStrategy
             strategy = space.fromcache(MapDictStrategy)
+        elif space.config.objspace.std.withmapdictkwargs and kwargs:
+            assert w_type is None
+            from pypy.objspace.std.mapdict import MapDictKwargsStrategy
+            strategy = space.fromcache(MapDictKwargsStrategy)
         elif instance or strdict or module:
             assert w_type is None
             strategy = space.fromcache(BytesDictStrategy)
@@ -548,6 +554,8 @@ class EmptyDictStrategy(DictStrategy):
         w_type = self.space.type(w_key)
         if self.space.is_w(w_type, self.space.w_int):
             self.switch_to_int_strategy(w_dict)
+        elif self.space.is_w(w_type, self.space.w_float):
+            self.switch_to_float_strategy(w_dict)
         elif withidentitydict and w_type.compares_by_identity():
             self.switch_to_identity_strategy(w_dict)
         else:
@@ -571,6 +579,12 @@ class EmptyDictStrategy(DictStrategy):
         w_dict.strategy = strategy
         w_dict.dstorage = storage
 
+    def switch_to_float_strategy(self, w_dict):
+        strategy = self.space.fromcache(FloatDictStrategy)
+        storage = strategy.get_empty_storage()
+        w_dict.strategy = strategy
+        w_dict.dstorage = storage
+
     def switch_to_identity_strategy(self, w_dict):
         from pypy.objspace.std.identitydict import IdentityDictStrategy
         strategy = self.space.fromcache(IdentityDictStrategy)
@@ -950,6 +964,7 @@ class AbstractTypedStrategy(object):
         d = self.unerase(w_dict.dstorage)
         strategy = self.space.fromcache(ObjectDictStrategy)
         d_new = strategy.unerase(strategy.get_empty_storage())
+        objectmodel.prepare_dict_update(d_new, len(d), exact=True)
         for key, value in d.iteritems():
             d_new[self.wrap(key)] = value
         w_dict.strategy = strategy
@@ -1179,6 +1194,76 @@ class IntDictStrategy(AbstractTypedStrategy, DictStrategy):
 create_iterator_classes(IntDictStrategy)
 
 
+# Ints converting to floats of smaller absolute value than this are exactly
+# representable as floats, so they can be looked up in a FloatDictStrategy.
+MAX_EXACT_INT_IN_FLOAT = 2.0 ** 53
+
+def _float_key_eq(x, y):
+    # Like space.eq_w() on the boxed keys: floats are equal if they compare
+    # equal (so that 0.0 and -0.0 are the same key), or if they are the
+    # same object, which for floats means the same bits (e.g. the same NaN).
+    return x == y or float2longlong(x) == float2longlong(y)
+
+def _float_key_hash(x):
+    return compute_hash(x)
+
+
+class FloatDictStrategy(AbstractTypedStrategy, DictStrategy):
+    erase, unerase = rerased.new_erasing_pair("float")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def wrap(self, unwrapped):
+        return self.space.wrap(unwrapped)
+
+    def unwrap(self, wrapped):
+        return self.space.float_w(wrapped)
+
+    def get_empty_storage(self):
+        return self.erase(r_dict(_float_key_eq, _float_key_hash))
+
+    def is_correct_type(self, w_obj):
+        space = self.space
+        return space.is_w(space.type(w_obj), space.w_float)
+
+    def _never_equal_to(self, w_lookup_type):
+        space = self.space
+        # XXX there are many more types
+        return (space.is_w(w_lookup_type, space.w_NoneType) or
+                space.is_w(w_lookup_type, space.w_str) or
+                space.is_w(w_lookup_type, space.w_unicode)
+                )
+
+    def _is_int_equal_to_float(self, w_key):
+        """Check if the key is an int that converts exactly to a float."""
+        space = self.space
+        w_type = space.type(w_key)
+        if space.is_w(w_type, space.w_int) or space.is_w(w_type, space.w_bool):
+            floatval = float(space.int_w(w_key))
+            return -MAX_EXACT_INT_IN_FLOAT < floatval < MAX_EXACT_INT_IN_FLOAT
+        return False
+
+    def getitem(self, w_dict, w_key):
+        # Ints are looked up by their equal float, without boxing the
+        # keys and switching to the object strategy.
+        if self._is_int_equal_to_float(w_key):
+            floatval = float(self.space.int_w(w_key))
+            return self.unerase(w_dict.dstorage).get(floatval, None)
+        return AbstractTypedStrategy.getitem(self, w_dict, w_key)
+
+    def delitem(self, w_dict, w_key):
+        if self._is_int_equal_to_float(w_key):
+            floatval = float(self.space.int_w(w_key))
+            del self.unerase(w_dict.dstorage)[floatval]
+            return
+        AbstractTypedStrategy.delitem(self, w_dict, w_key)
+
+    def wrapkey(space, key):
+        return space.wrap(key)
+
+create_iterator_classes(FloatDictStrategy)
+
+
 def update1(space, w_dict, w_data):
     if isinstance(w_data, W_DictMultiObject):    # optimization case only
         update1_dict_dict(space, w_dict, w_data)
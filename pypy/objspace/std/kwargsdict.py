@@ -3,7 +3,7 @@
 Based on two lists containing unwrapped key value pairs.
 """
 
-from rpython.rlib import jit, rerased
+from rpython.rlib import jit, rerased, objectmodel
 
 from pypy.objspace.std.dictmultiobject import (
     BytesDictStrategy, DictStrategy, EmptyDictStrategy, ObjectDictStrategy,
@@ -140,6 +140,7 @@ class KwargsDictStrategy(DictStrategy):
         strategy = self.space.fromcache(ObjectDictStrategy)
         keys, values_w = self.unerase(w_dict.dstorage)
         d_new = strategy.unerase(strategy.get_empty_storage())
+        objectmodel.prepare_dict_update(d_new, len(keys), exact=True)
         for i in range(len(keys)):
             d_new[self.wrap(keys[i])] = values_w[i]
         w_dict.strategy = strategy
@@ -150,6 +151,7 @@ class KwargsDictStrategy(DictStrategy):
         keys, values_w = self.unerase(w_dict.dstorage)
         storage = strategy.get_empty_storage()
         d_new = strategy.unerase(storage)
+        objectmodel.prepare_dict_update(d_new, len(keys), exact=True)
         for i in range(len(keys)):
             d_new[keys[i]] = values_w[i]
         w_dict.strategy = strategy
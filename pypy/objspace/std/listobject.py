@@ -10,10 +10,11 @@ http://morepypy.blogspot.com/2011/10/more-compact-lists-with-list-strategies.htm
 import operator
 import sys
 
-from rpython.rlib import debug, jit, rerased
+from rpython.rlib import debug, jit, longlong2float, rerased
 from rpython.rlib.listsort import make_timsort_class
 from rpython.rlib.objectmodel import (
     import_from_mixin, instantiate, newlist_hint, resizelist_hint, specialize)
+from rpython.rlib.rarithmetic import r_int64
 from rpython.tool.sourcetools import func_with_new_name
 
 from pypy.interpreter.baseobjspace import W_Root
@@ -101,6 +102,14 @@ def get_strategy_from_list_objects(space, list_w, sizehint):
     else:
         return space.fromcache(FloatListStrategy)
 
+    # check for ints and floats mixed together
+    strategy = space.fromcache(IntOrFloatListStrategy)
+    for w_obj in list_w:
+        if not strategy.is_correct_type(w_obj):
+            break
+    else:
+        return strategy
+
     return space.fromcache(ObjectListStrategy)
 
 
@@ -781,6 +790,11 @@ class ListStrategy(object):
     def append(self, w_list, w_item):
         raise NotImplementedError
 
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        """Switch w_list to a strategy that can hold its current items and
+        also w_sample_item, which this strategy cannot store."""
+        w_list.switch_to_object_strategy()
+
     def mul(self, w_list, times):
         w_newlist = w_list.clone()
         w_newlist.inplace_mul(times)
@@ -1386,7 +1400,7 @@ class AbstractUnwrappedStrategy(object):
             self.unerase(w_list.lstorage).append(self.unwrap(w_item))
             return
 
-        w_list.switch_to_object_strategy()
+        self.switch_to_next_strategy(w_list, w_item)
         w_list.append(w_item)
 
     def insert(self, w_list, index, w_item):
@@ -1396,7 +1410,7 @@ class AbstractUnwrappedStrategy(object):
             l.insert(index, self.unwrap(w_item))
             return
 
-        w_list.switch_to_object_strategy()
+        self.switch_to_next_strategy(w_list, w_item)
         w_list.insert(index, w_item)
 
     def _extend_from_list(self, w_list, w_other):
@@ -1420,7 +1434,7 @@ class AbstractUnwrappedStrategy(object):
             except IndexError:
                 raise
         else:
-            w_list.switch_to_object_strategy()
+            self.switch_to_next_strategy(w_list, w_item)
             w_list.setitem(index, w_item)
 
     def setslice(self, w_list, start, step, slicelength, w_other):
@@ -1617,6 +1631,24 @@ class IntegerListStrategy(ListStrategy):
     def getitems_int(self, w_list):
         return self.unerase(w_list.lstorage)
 
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        if type(w_sample_item) is W_FloatObject:
+            if self.switch_to_int_or_float_strategy(w_list):
+                return
+        w_list.switch_to_object_strategy()
+
+    def switch_to_int_or_float_strategy(self, w_list):
+        l = self.unerase(w_list.lstorage)
+        for intval in l:
+            if not longlong2float.can_encode_int32(intval):
+                return False
+        generalized_list = [longlong2float.encode_int32_into_longlong_nan(
+                                intval) for intval in l]
+        strategy = self.space.fromcache(IntOrFloatListStrategy)
+        w_list.strategy = strategy
+        w_list.lstorage = strategy.erase(generalized_list)
+        return True
+
 
     _base_extend_from_list = _extend_from_list
 
@@ -1627,6 +1659,12 @@ class IntegerListStrategy(ListStrategy):
             assert other is not None
             l += other
             return
+        if (w_other.strategy is self.space.fromcache(FloatListStrategy) or
+                w_other.strategy is self.space.fromcache(
+                    IntOrFloatListStrategy)):
+            if self.switch_to_int_or_float_strategy(w_list):
+                w_list.extend(w_other)
+                return
         return self._base_extend_from_list(w_list, w_other)
 
 
@@ -1670,6 +1708,38 @@ class FloatListStrategy(ListStrategy):
     def getitems_float(self, w_list):
         return self.unerase(w_list.lstorage)
 
+    def switch_to_next_strategy(self, w_list, w_sample_item):
+        if type(w_sample_item) is W_IntObject:
+            sample_intval = self.space.int_w(w_sample_item)
+            if longlong2float.can_encode_int32(sample_intval):
+                if self.switch_to_int_or_float_strategy(w_list):
+                    return
+        w_list.switch_to_object_strategy()
+
+    def switch_to_int_or_float_strategy(self, w_list):
+        l = self.unerase(w_list.lstorage)
+        for floatval in l:
+            if not longlong2float.can_encode_float(floatval):
+                return False
+        generalized_list = [longlong2float.float2longlong(floatval)
+                            for floatval in l]
+        strategy = self.space.fromcache(IntOrFloatListStrategy)
+        w_list.strategy = strategy
+        w_list.lstorage = strategy.erase(generalized_list)
+        return True
+
+    _base_extend_from_list = _extend_from_list
+
+    def _extend_from_list(self, w_list, w_other):
+        if (w_other.strategy is self.space.fromcache(IntegerListStrategy) or
+                w_other.strategy is self.space.fromcache(
+                    IntOrFloatListStrategy) or
+                isinstance(w_other.strategy, BaseRangeListStrategy)):
+            if self.switch_to_int_or_float_strategy(w_list):
+                w_list.extend(w_other)
+                return
+        return self._base_extend_from_list(w_list, w_other)
+
     def _safe_find(self, w_list, obj, start, stop):
         from rpython.rlib.rfloat import isnan
         from rpython.rlib.longlong2float import float2longlong
@@ -1690,6 +1760,108 @@ class FloatListStrategy(ListStrategy):
         raise ValueError
 
 
+class IntOrFloatListStrategy(ListStrategy):
+    """Strategy for lists holding a mix of ints and floats.
+
+    The items are stored unboxed as 64-bit values: floats as their bit
+    pattern, and ints as a 32-bit payload inside a NaN that floats don't
+    use, see rpython.rlib.longlong2float.  Ints that need more than 32
+    bits, and floats that are exactly that NaN, don't fit and switch the
+    list to the ObjectListStrategy.
+    """
+    import_from_mixin(AbstractUnwrappedStrategy)
+
+    _none_value = r_int64(0)
+
+    def wrap(self, llval):
+        if longlong2float.is_int32_from_longlong_nan(llval):
+            intval = longlong2float.decode_int32_from_longlong_nan(llval)
+            return self.space.wrap(intval)
+        else:
+            floatval = longlong2float.longlong2float(llval)
+            return self.space.wrap(floatval)
+
+    def unwrap(self, w_int_or_float):
+        if type(w_int_or_float) is W_IntObject:
+            intval = self.space.int_w(w_int_or_float)
+            return longlong2float.encode_int32_into_longlong_nan(intval)
+        else:
+            floatval = self.space.float_w(w_int_or_float)
+            return longlong2float.float2longlong(floatval)
+
+    erase, unerase = rerased.new_erasing_pair("longlong")
+    erase = staticmethod(erase)
+    unerase = staticmethod(unerase)
+
+    def is_correct_type(self, w_obj):
+        if type(w_obj) is W_IntObject:
+            intval = self.space.int_w(w_obj)
+            return longlong2float.can_encode_int32(intval)
+        elif type(w_obj) is W_FloatObject:
+            floatval = self.space.float_w(w_obj)
+            return longlong2float.can_encode_float(floatval)
+        else:
+            return False
+
+    def list_is_correct_type(self, w_list):
+        return w_list.strategy is self.space.fromcache(IntOrFloatListStrategy)
+
+    def sort(self, w_list, reverse):
+        l = self.unerase(w_list.lstorage)
+        sorter = IntOrFloatSort(l, len(l))
+        sorter.sort()
+        if reverse:
+            l.reverse()
+
+    _base_extend_from_list = _extend_from_list
+
+    def _extend_from_list(self, w_list, w_other):
+        other = self._encode_numeric_items(w_other)
+        if other is not None:
+            l = self.unerase(w_list.lstorage)
+            l += other
+            return
+        return self._base_extend_from_list(w_list, w_other)
+
+    def _encode_numeric_items(self, w_other):
+        """Return the items of an int, range or float list encoded for
+        this strategy, or None if that's not possible."""
+        intitems = w_other.getitems_int()
+        if intitems is not None:
+            for intval in intitems:
+                if not longlong2float.can_encode_int32(intval):
+                    return None
+            return [longlong2float.encode_int32_into_longlong_nan(intval)
+                    for intval in intitems]
+        floatitems = w_other.getitems_float()
+        if floatitems is not None:
+            for floatval in floatitems:
+                if not longlong2float.can_encode_float(floatval):
+                    return None
+            return [longlong2float.float2longlong(floatval)
+                    for floatval in floatitems]
+        return None
+
+    def _safe_find(self, w_list, obj, start, stop):
+        from rpython.rlib.rfloat import isnan
+        #
+        # 1 == 1.0, so compare the numeric values rather than the bits,
+        # except for NaNs which are only found by identity
+        l = self.unerase(w_list.lstorage)
+        stop = min(stop, len(l))
+        search = longlong2float.maybe_decode_longlong_as_float(obj)
+        if not isnan(search):
+            for i in range(start, stop):
+                val = longlong2float.maybe_decode_longlong_as_float(l[i])
+                if val == search:
+                    return i
+        else:
+            for i in range(start, stop):
+                if l[i] == obj:
+                    return i
+        raise ValueError
+
+
 class BytesListStrategy(ListStrategy):
     import_from_mixin(AbstractUnwrappedStrategy)
 
@@ -1785,6 +1957,7 @@ listrepr = app.interphook("listrepr")
 TimSort = make_timsort_class()
 IntBaseTimSort = make_timsort_class()
 FloatBaseTimSort = make_timsort_class()
+IntOrFloatBaseTimSort = make_timsort_class()
 StringBaseTimSort = make_timsort_class()
 UnicodeBaseTimSort = make_timsort_class()
 
@@ -1815,6 +1988,13 @@ class FloatSort(FloatBaseTimSort):
         return a < b
 
 
+class IntOrFloatSort(IntOrFloatBaseTimSort):
+    def lt(self, a, b):
+        fa = longlong2float.maybe_decode_longlong_as_float(a)
+        fb = longlong2float.maybe_decode_longlong_as_float(b)
+        return fa < fb
+
+
 class StringSort(StringBaseTimSort):
     def lt(self, a, b):
         return a < b
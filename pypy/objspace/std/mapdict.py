@@ -723,6 +723,28 @@ class MapDictStrategy(DictStrategy):
 
     # XXX could implement a more efficient w_keys based on space.newlist_bytes
 
+    @jit.look_inside_iff(lambda self, w_dict:
+                         jit.isconstant(self.unerase(w_dict.dstorage)
+                                        ._get_mapdict_map()))
+    def view_as_kwargs(self, w_dict):
+        # the keys are read off the map, so a dict used as **kwargs can be
+        # forwarded without going through the generic unpacking path
+        w_obj = self.unerase(w_dict.dstorage)
+        keys = _dict_keys_in_order(w_obj._get_mapdict_map())
+        values_w = [w_obj.getdictvalue(self.space, key) for key in keys]
+        return keys, values_w
+
+    def rev_update1_dict_dict(self, w_dict, w_updatedict):
+        # copy the entries in the order in which they were added, and
+        # without wrapping the keys: if w_updatedict is itself a map dict,
+        # e.g. in self.__dict__.update(kwargs), it then follows the same
+        # map transitions as the equivalent sequence of setattr()s
+        w_obj = self.unerase(w_dict.dstorage)
+        keys = _dict_keys_in_order(w_obj._get_mapdict_map())
+        for key in keys:
+            w_value = w_obj.getdictvalue(self.space, key)
+            w_updatedict.setitem_str(key, w_value)
+
     def iterkeys(self, w_dict):
         return MapDictIteratorKeys(self.space, self, w_dict)
     def itervalues(self, w_dict):
@@ -731,6 +753,72 @@ class MapDictStrategy(DictStrategy):
         return MapDictIteratorItems(self.space, self, w_dict)
 
 
+# Maps of **kwargs dicts all start from the same terminator, so unlike the
+# maps of instances they are not bounded by the attributes used in a class.
+# Past these limits, new keys make the dict switch to KwargsDictStrategy.
+KWARGS_MAP_MAX_DEPTH = 16
+KWARGS_MAP_MAX_COUNT = 1000
+
+class KwargsDictTerminator(DictTerminator):
+    def __init__(self, space):
+        DictTerminator.__init__(self, space, None)
+        self.num_maps = 0
+
+    @jit.elidable
+    def can_add_key(self, map, key):
+        # the answer can't change from True to False, because the new map
+        # is created right away, nor from False to True, because num_maps
+        # only grows
+        if map.cache_attrs is not None and (key, DICT) in map.cache_attrs:
+            return True
+        if (map.length() >= KWARGS_MAP_MAX_DEPTH or
+                self.num_maps >= KWARGS_MAP_MAX_COUNT):
+            return False
+        self.num_maps += 1
+        map._get_new_attr(key, DICT)
+        return True
+
+def get_terminator_for_kwargs(space):
+    return KwargsDictTerminator(space)
+
+class MapDictKwargsStrategy(MapDictStrategy):
+    """Map dicts for **kwargs, see the withmapdictkwargs option."""
+
+    def get_empty_storage(self):
+        w_result = Object()
+        terminator = self.space.fromcache(get_terminator_for_kwargs)
+        w_result._init_empty(terminator)
+        return self.erase(w_result)
+
+    def setitem_str(self, w_dict, key, w_value):
+        w_obj = self.unerase(w_dict.dstorage)
+        map = w_obj._get_mapdict_map()
+        terminator = map.terminator
+        assert isinstance(terminator, KwargsDictTerminator)
+        if (map.find_map_attr((key, DICT)) is None and
+                not terminator.can_add_key(map, key)):
+            self.switch_to_kwargs_strategy(w_dict)
+            w_dict.setitem_str(key, w_value)
+            return
+        MapDictStrategy.setitem_str(self, w_dict, key, w_value)
+
+    def switch_to_kwargs_strategy(self, w_dict):
+        from pypy.objspace.std.kwargsdict import KwargsDictStrategy
+        keys, values_w = self.view_as_kwargs(w_dict)
+        strategy = self.space.fromcache(KwargsDictStrategy)
+        w_dict.strategy = strategy
+        w_dict.dstorage = strategy.erase((keys, values_w))
+
+
+def _dict_keys_in_order(map):
+    keys = []
+    curr = map.search(DICT)
+    while curr is not None:
+        keys.append(curr.selector[0])
+        curr = curr.back.search(DICT)
+    keys.reverse()
+    return keys
+
 def materialize_r_dict(space, obj, dict_w):
     map = obj._get_mapdict_map()
     new_obj = map.materialize_r_dict(space, obj, dict_w)
@@ -837,6 +925,7 @@ INVALID_CACHE_ENTRY.map_wref = weakref.ref(_invalid_cache_entry_map)
 def init_mapdict_cache(pycode):
     num_entries = len(pycode.co_names_w)
     pycode._mapdict_caches = [INVALID_CACHE_ENTRY] * num_entries
+    pycode._mapdict_store_caches = [INVALID_CACHE_ENTRY] * num_entries
 
 @jit.dont_look_inside
 def _fill_cache(pycode, nameindex, map, version_tag, storageindex, w_method=None):
@@ -939,6 +1028,76 @@ def LOOKUP_METHOD_mapdict_fill_cache_method(space, pycode, name, nameindex,
         return
     _fill_cache(pycode, nameindex, map, version_tag, -1, w_method)
 
+@jit.dont_look_inside
+def _fill_store_cache(pycode, nameindex, map, version_tag, storageindex):
+    entry = pycode._mapdict_store_caches[nameindex]
+    if entry is INVALID_CACHE_ENTRY:
+        entry = CacheEntry()
+        pycode._mapdict_store_caches[nameindex] = entry
+    entry.map_wref = weakref.ref(map)
+    entry.version_tag = version_tag
+    entry.storageindex = storageindex
+    if pycode.space.config.objspace.std.withmethodcachecounter:
+        entry.failure_counter += 1
+
+def STORE_ATTR_caching(pycode, w_obj, nameindex, w_value):
+    # the same as LOAD_ATTR_caching, for writes to an attribute that the
+    # object already has.  The entries are kept apart from the LOAD_ATTR
+    # ones, because they are only valid if the class doesn't override
+    # __setattr__.
+    entry = pycode._mapdict_store_caches[nameindex]
+    map = w_obj._get_mapdict_map()
+    if entry.is_valid_for_map(map):
+        w_obj._mapdict_write_storage(entry.storageindex, w_value)
+        return
+    STORE_ATTR_slowpath(pycode, w_obj, nameindex, map, w_value)
+STORE_ATTR_caching._always_inline_ = True
+
+def STORE_ATTR_slowpath(pycode, w_obj, nameindex, map, w_value):
+    from pypy.objspace.descroperation import object_setattr
+    space = pycode.space
+    w_name = pycode.co_names_w[nameindex]
+    if map is not None:
+        w_type = map.terminator.w_cls
+        version_tag = w_type.version_tag()
+        if (version_tag is not None and
+                w_type.lookup('__setattr__') is object_setattr(space)):
+            name = space.str_w(w_name)
+            _, w_descr = w_type._pure_lookup_where_possibly_with_method_cache(
+                name, version_tag)
+            selector = ("", INVALID)
+            if w_descr is None:
+                selector = (name, DICT)
+            elif isinstance(w_descr, MutableCell):
+                pass
+            elif space.is_data_descr(w_descr):
+                from pypy.interpreter.typedef import Member
+                if isinstance(w_descr, Member):
+                    selector = ("slot", SLOTS_STARTING_FROM + w_descr.index)
+            else:
+                selector = (name, DICT)
+            #
+            if selector[1] != INVALID:
+                attr = map.find_map_attr(selector)
+                if attr is not None:
+                    # the cached writes don't go through map.write(), so
+                    # mark the attribute as mutated once and for all here
+                    if not attr.ever_mutated:
+                        attr.ever_mutated = True
+                    _fill_store_cache(pycode, nameindex, map, version_tag,
+                                      attr.storageindex)
+                    w_obj._mapdict_write_storage(attr.storageindex, w_value)
+                    return
+                if selector[1] == DICT:
+                    # a new attribute: this is what object.__setattr__
+                    # would do, without going through the descriptor call
+                    if w_obj.setdictvalue(space, name, w_value):
+                        return
+    if space.config.objspace.std.withmethodcachecounter:
+        INVALID_CACHE_ENTRY.failure_counter += 1
+    space.setattr(w_obj, w_name, w_value)
+STORE_ATTR_slowpath._dont_inline_ = True
+
 # XXX fix me: if a function contains a loop with both LOAD_ATTR and
 # XXX LOOKUP_METHOD on the same attribute name, it keeps trashing and
 # XXX rebuilding the cache
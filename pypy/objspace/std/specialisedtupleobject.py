@@ -1,6 +1,9 @@
 from pypy.interpreter.error import OperationError
-from pypy.objspace.std.tupleobject import W_AbstractTupleObject
+from pypy.objspace.std.tupleobject import (W_AbstractTupleObject,
+    UNROLL_CUTOFF, _unroll_condition)
 from pypy.objspace.std.util import negate
+from rpython.rlib import jit
+from rpython.rlib.debug import make_sure_not_resized
 from rpython.rlib.objectmodel import compute_hash
 from rpython.rlib.rarithmetic import intmask
 from rpython.rlib.unroll import unrolling_iterable
@@ -125,12 +128,132 @@ def make_specialised_class(typetuple):
     _specialisations.append(cls)
     return cls
 
+def make_unboxed_class(val_type):
+    """Make a class for tuples of any length whose items are all ints, or
+    all floats, stored unboxed in a single fixed-size list."""
+    assert val_type in (int, float)
+
+    class cls(W_AbstractTupleObject):
+        _immutable_fields_ = ['values[*]']
+
+        def __init__(self, space, values):
+            self.space = space
+            make_sure_not_resized(values)
+            self.values = values
+
+        def length(self):
+            return len(self.values)
+
+        def tolist(self):
+            values = self.values
+            list_w = [None] * len(values)
+            for i in range(len(values)):
+                list_w[i] = self.space.wrap(values[i])
+            return list_w
+
+        def getitems_copy(self):
+            return [self.space.wrap(value) for value in self.values]
+
+        @jit.look_inside_iff(lambda self, _1: _unroll_condition(self))
+        def descr_hash(self, space):
+            # same algorithm as W_TupleObject.descr_hash()
+            mult = 1000003
+            x = 0x345678
+            z = len(self.values)
+            for value in self.values:
+                if val_type == float:
+                    from pypy.objspace.std.floatobject import _hash_float
+                    y = _hash_float(space, value)
+                else:
+                    y = compute_hash(value)
+                x = (x ^ y) * mult
+                z -= 1
+                mult += 82520 + z + z
+            x += 97531
+            return space.wrap(intmask(x))
+
+        def descr_eq(self, space, w_other):
+            if not isinstance(w_other, W_AbstractTupleObject):
+                return space.w_NotImplemented
+            if not isinstance(w_other, cls):
+                return self._descr_eq_generic(space, w_other)
+            return self._descr_eq_unboxed(space, w_other)
+
+        @jit.look_inside_iff(lambda self, _1, _2: _unroll_condition(self))
+        def _descr_eq_generic(self, space, w_other):
+            values = self.values
+            if len(values) != w_other.length():
+                return space.w_False
+            for i in range(len(values)):
+                w_item = space.wrap(values[i])
+                if not space.eq_w(w_item, w_other.getitem(space, i)):
+                    return space.w_False
+            return space.w_True
+
+        @jit.look_inside_iff(lambda self, _1, _2: _unroll_condition(self))
+        def _descr_eq_unboxed(self, space, w_other):
+            values1 = self.values
+            values2 = w_other.values
+            if len(values1) != len(values2):
+                return space.w_False
+            for i in range(len(values1)):
+                myval = values1[i]
+                otherval = values2[i]
+                if myval != otherval:
+                    if val_type == float:
+                        # issue with NaNs, which should be equal here
+                        if float2longlong(myval) == float2longlong(otherval):
+                            continue
+                    return space.w_False
+            return space.w_True
+
+        descr_ne = negate(descr_eq)
+
+        def getitem(self, space, index):
+            try:
+                value = self.values[index]
+            except IndexError:
+                raise OperationError(space.w_IndexError,
+                                     space.wrap("tuple index out of range"))
+            return space.wrap(value)
+
+    cls.__name__ = 'W_SpecialisedTupleObject_%ss' % (val_type.__name__,)
+    _specialisations.append(cls)
+    return cls
+
 # ---------- current specialized versions ----------
 
 _specialisations = []
 Cls_ii = make_specialised_class((int, int))
 Cls_oo = make_specialised_class((object, object))
 Cls_ff = make_specialised_class((float, float))
+Cls_ints = make_unboxed_class(int)
+Cls_floats = make_unboxed_class(float)
+
+@jit.look_inside_iff(lambda space, list_w:
+        jit.loop_unrolling_heuristic(list_w, len(list_w), UNROLL_CUTOFF))
+def _makeunboxedtuple(space, list_w):
+    from pypy.objspace.std.intobject import W_IntObject
+    from pypy.objspace.std.floatobject import W_FloatObject
+    w_first = list_w[0]
+    if type(w_first) is W_IntObject:
+        for w_item in list_w:
+            if type(w_item) is not W_IntObject:
+                raise NotSpecialised
+        intvalues = [0] * len(list_w)
+        for i in range(len(list_w)):
+            intvalues[i] = space.int_w(list_w[i])
+        return Cls_ints(space, intvalues)
+    elif type(w_first) is W_FloatObject:
+        for w_item in list_w:
+            if type(w_item) is not W_FloatObject:
+                raise NotSpecialised
+        floatvalues = [0.0] * len(list_w)
+        for i in range(len(list_w)):
+            floatvalues[i] = space.float_w(list_w[i])
+        return Cls_floats(space, floatvalues)
+    else:
+        raise NotSpecialised
 
 def makespecialisedtuple(space, list_w):
     from pypy.objspace.std.intobject import W_IntObject
@@ -144,5 +267,7 @@ def makespecialisedtuple(space, list_w):
             if type(w_arg2) is W_FloatObject:
                 return Cls_ff(space, w_arg1, w_arg2)
         return Cls_oo(space, w_arg1, w_arg2)
+    elif len(list_w) > 0:
+        return _makeunboxedtuple(space, list_w)
     else:
         raise NotSpecialised
@@ -105,6 +105,91 @@ class AppTestModuleDict(object):
         assert "s" not in d
         assert F() not in d
 
+    def test_load_global_cache(self):
+        m = type(__builtins__)("abc")
+        exec '''if 1:
+            x = 1
+            def f():
+                return x, len
+        ''' in m.__dict__
+        f = m.f
+        assert f() == (1, len)
+        m.x = 2
+        assert f() == (2, len)
+        m.x = 3
+        assert f() == (3, len)
+        m.len = 5
+        assert f() == (3, 5)
+        del m.len
+        assert f() == (3, len)
+        del m.x
+        raises(NameError, f)
+        m.x = 4
+        assert f() == (4, len)
+        m.__dict__[object()] = 5
+        assert f() == (4, len)
+        m.x = 6
+        assert f() == (6, len)
+
+    def test_load_global_cache_shadowing_builtin(self):
+        import __builtin__
+        m = type(__builtins__)("abc")
+        exec '''if 1:
+            def f():
+                return some_builtin_name
+        ''' in m.__dict__
+        raises(NameError, m.f)
+        __builtin__.some_builtin_name = 1
+        try:
+            assert m.f() == 1
+            __builtin__.some_builtin_name = 2
+            assert m.f() == 2
+            m.some_builtin_name = 3
+            assert m.f() == 3
+        finally:
+            del __builtin__.some_builtin_name
+        assert m.f() == 3
+        del m.some_builtin_name
+        raises(NameError, m.f)
+
+    def test_load_global_cache_other_globals(self):
+        import types
+        m = type(__builtins__)("abc")
+        exec '''if 1:
+            x = 1
+            def f():
+                return x
+        ''' in m.__dict__
+        g = types.FunctionType(m.f.func_code, {'x': 2})
+        h = types.FunctionType(m.f.func_code, {'x': 3})
+        for i in range(3):
+            assert m.f() == 1
+            assert g() == 2
+            assert h() == 3
+
+
+class AppTestLoadGlobalCounters(object):
+    spaceconfig = {"objspace.std.withcelldict": True,
+                   "objspace.std.withmethodcachecounter": True}
+
+    def test_counters(self):
+        import __pypy__
+        m = type(__builtins__)("abc")
+        exec '''if 1:
+            x = 1
+            def f():
+                for i in range(10):
+                    x
+        ''' in m.__dict__
+        m.f()
+        counters = __pypy__.code_cache_counters(m.f.func_code)
+        assert ('x', 'global', 9, 1) in counters
+        assert ('range', 'global', 0, 1) in counters
+        m.f()
+        counters = __pypy__.code_cache_counters(m.f.func_code)
+        assert ('x', 'global', 19, 1) in counters
+        assert ('range', 'global', 1, 1) in counters
+
 
 class TestModuleDictImplementation(BaseTestRDictImplementation):
     StrategyClass = ModuleDictStrategy
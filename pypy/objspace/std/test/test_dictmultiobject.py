@@ -986,6 +986,43 @@ class AppTestStrategies(object):
         assert "IntDictStrategy" in self.get_strategy(d)
         assert d[1L] == "hi"
 
+    def test_empty_to_float(self):
+        d = {}
+        d[1.5] = "hi"
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[1.5] == "hi"
+        d[2.0] = "ho"
+        assert sorted(d.keys()) == [1.5, 2.0]
+        assert type(d.keys()[0]) is float
+        assert "FloatDictStrategy" in self.get_strategy(d)
+
+    def test_float_dict_int_keys(self):
+        d = {1.0: "a", 2.5: "b"}
+        assert d[1] == "a"
+        assert d[True] == "a"
+        assert 2 not in d
+        assert d.get(3) is None
+        del d[1]
+        assert d == {2.5: "b"}
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        d[3] = "c"
+        assert "ObjectDictStrategy" in self.get_strategy(d)
+        assert d == {2.5: "b", 3: "c"}
+        assert type([k for k in d if k == 3][0]) is int
+
+    def test_float_dict_zero_and_nan(self):
+        nan = float("nan")
+        d = {0.0: "zero", nan: "nan"}
+        assert "FloatDictStrategy" in self.get_strategy(d)
+        assert d[-0.0] == "zero"
+        d[-0.0] = "negzero"
+        assert len(d) == 2
+        assert str(d.keys()[d.values().index("negzero")]) == "0.0"
+        # the same nan (by identity, i.e. its bits) is found
+        assert d[nan] == "nan"
+        assert d.pop(nan) == "nan"
+        assert len(d) == 1
+
     def test_iter_dict_length_change(self):
         d = {1: 2, 3: 4, 5: 6}
         it = d.iteritems()
@@ -1118,6 +1155,7 @@ class Config:
             withmethodcache = False
             withidentitydict = False
             withmapdict = False
+            withmapdictkwargs = False
 
 FakeSpace.config = Config()
 
@@ -672,6 +672,20 @@ class AppTestListObject(object):
         l.sort()
         assert l == [3, 6, 9]
 
+    def test_int_and_float_list(self):
+        l = [3, 1.5, -2, 2.0, 2]
+        l.sort()
+        assert l == [-2, 1.5, 2.0, 2, 3]
+        assert [type(x) for x in l] == [int, float, float, int, int]
+        l.sort(reverse=True)
+        assert l == [3, 2, 2.0, 1.5, -2]
+        assert sum(l) == 6.5
+        assert l.index(2.0) == 1
+        assert 1.5 in l and -2.0 in l and 7 not in l
+        l.append("x")
+        assert l[-1] == "x"
+        assert l[:5] == [3, 2, 2.0, 1.5, -2]
+
     def test_getitem(self):
         l = [1, 2, 3, 4, 5, 6, 9]
         assert l[0] == 1
@@ -2,7 +2,8 @@ import sys
 from pypy.objspace.std.listobject import (
     W_ListObject, EmptyListStrategy, ObjectListStrategy, IntegerListStrategy,
     FloatListStrategy, BytesListStrategy, RangeListStrategy,
-    SimpleRangeListStrategy, make_range_list, UnicodeListStrategy)
+    SimpleRangeListStrategy, make_range_list, UnicodeListStrategy,
+    IntOrFloatListStrategy)
 from pypy.objspace.std import listobject
 from pypy.objspace.std.test.test_listobject import TestW_ListObject
 
@@ -318,7 +319,7 @@ class TestW_ListStrategies(TestW_ListObject):
         l = W_ListObject(space, [w(1.1), w(2.2), w(3.3)])
         assert isinstance(l.strategy, FloatListStrategy)
         l.extend(W_ListObject(space, [w(4), w(5), w(6)]))
-        assert isinstance(l.strategy, ObjectListStrategy)
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
 
     def test_empty_extend_with_any(self):
         space = self.space
@@ -733,6 +734,93 @@ class TestW_ListStrategies(TestW_ListObject):
         list_copy[0] = 42
         assert list_orig == [1, 2, 3]
 
+    def test_int_or_float_from_mixed_list(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2.5), w(-3)])
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.is_w(space.type(l.getitem(0)), space.w_int)
+        assert space.is_w(space.type(l.getitem(1)), space.w_float)
+        assert space.int_w(l.getitem(2)) == -3
+        assert space.float_w(l.getitem(1)) == 2.5
+
+    def test_int_or_float_too_big(self):
+        space = self.space
+        w = space.wrap
+        if sys.maxint > 2 ** 31:
+            l = W_ListObject(space, [w(2 ** 40), w(2.5)])
+            assert isinstance(l.strategy, ObjectListStrategy)
+        l = W_ListObject(space, [w(2 ** 31 - 1), w(-2 ** 31), w(2.5)])
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        l = W_ListObject(space, [w(True), w(2.5)])
+        assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_int_or_float_from_int_and_float_lists(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2)])
+        l.append(w(3.5))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.eq_w(l.getitem(2), w(3.5))
+
+        l = W_ListObject(space, [w(1.5), w(2.5)])
+        l.insert(0, w(7))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.int_w(l.getitem(0)) == 7
+
+        l = W_ListObject(space, [w(1.5), w(2.5)])
+        l.setitem(1, w(7))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+
+        l = W_ListObject(space, [w(1), w(2)])
+        l.extend(W_ListObject(space, [w(1.5), w(2.5)]))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert l.length() == 4
+
+        l = W_ListObject(space, [w(1.5), w(2)])
+        l.extend(make_range_list(space, 1, 1, 3))
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.int_w(l.getitem(4)) == 3
+
+        if sys.maxint > 2 ** 31:
+            l = W_ListObject(space, [w(2 ** 40), w(2)])
+            l.append(w(1.5))
+            assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_int_or_float_to_object(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(1), w(2.5)])
+        l.append(w('a'))
+        assert isinstance(l.strategy, ObjectListStrategy)
+        assert space.int_w(l.getitem(0)) == 1
+
+        l = W_ListObject(space, [w(1), w(2.5)])
+        l.append(w(2 ** 31))
+        if sys.maxint > 2 ** 31:
+            assert isinstance(l.strategy, ObjectListStrategy)
+
+    def test_int_or_float_find(self):
+        space = self.space
+        w = space.wrap
+        nan = float('nan')
+        l = W_ListObject(space, [w(1), w(2.0), w(-0.0), w(nan)])
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert l.find(w(1.0)) == 0
+        assert l.find(w(2)) == 1
+        assert l.find(w(0)) == 2
+        assert l.find(w(nan)) == 3
+        raises(ValueError, l.find, w(3))
+
+    def test_int_or_float_sort(self):
+        space = self.space
+        w = space.wrap
+        l = W_ListObject(space, [w(3), w(1.5), w(-2), w(2.0), w(2)])
+        l.sort(False)
+        assert isinstance(l.strategy, IntOrFloatListStrategy)
+        assert space.unwrap(l) == [-2, 1.5, 2.0, 2, 3]
+        assert space.is_w(space.type(l.getitem(3)), space.w_int)
+
 
 class TestW_ListStrategiesDisabled:
     spaceconfig = {"objspace.std.withliststrategies": False}
@@ -708,6 +708,151 @@ class AppTestWithMapDict(object):
         d = x.__dict__
         assert list(__pypy__.reversed_dict(d)) == d.keys()[::-1]
 
+    def test_store_attr(self):
+        class A(object):
+            pass
+        class B(object):
+            def __setattr__(self, name, value):
+                object.__setattr__(self, name, value * 2)
+        class C(object):
+            __slots__ = ['x']
+        class D(object):
+            def _set(self, value):
+                self._x = value
+            x = property(lambda self: self._x, _set)
+        def f(obj, value):
+            obj.x = value
+        for cls, factor in [(A, 1), (B, 2), (C, 1), (D, 1)]:
+            obj = cls()
+            for i in range(5):
+                f(obj, i)
+                assert obj.x == i * factor
+        a = A()
+        f(a, 1)
+        f(a, 2)
+        A.__setattr__ = lambda self, name, value: object.__setattr__(
+            self, name, value + 10)
+        f(a, 3)
+        assert a.x == 13
+        del A.__setattr__
+        f(a, 4)
+        assert a.x == 4
+        A.x = property(lambda self: 42)
+        raises(AttributeError, f, a, 5)
+        assert a.x == 42
+        del A.x
+        assert a.x == 4
+        class E(object):
+            __slots__ = ['y']
+        raises(AttributeError, f, E(), 1)
+
+    def test_store_attr_after_class_change(self):
+        class A(object):
+            pass
+        class B(object):
+            def __setattr__(self, name, value):
+                object.__setattr__(self, name, -value)
+        def f(obj, value):
+            obj.x = value
+        a = A()
+        f(a, 1)
+        f(a, 2)
+        a.__class__ = B
+        f(a, 3)
+        assert a.x == -3
+
+    def test_update_from_instance_dict(self):
+        from __pypy__ import strategy
+        class A(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = 2
+        b = A()
+        b.__dict__.update(a.__dict__)
+        assert b.__dict__ == {"x": 1, "y": 2}
+        assert strategy(b.__dict__) == "MapDictStrategy"
+        d = {}
+        d.update(a.__dict__)
+        assert d == {"x": 1, "y": 2}
+        b.__dict__.update(b.__dict__)
+        assert b.__dict__ == {"x": 1, "y": 2}
+
+    def test_instance_dict_as_kwargs(self):
+        class A(object):
+            pass
+        a = A()
+        a.x = 1
+        a.y = 2
+        def f(x, y):
+            return x, y
+        assert f(**a.__dict__) == (1, 2)
+        def g(**kwargs):
+            return kwargs
+        assert g(**a.__dict__) == {"x": 1, "y": 2}
+        raises(TypeError, "g(x=5, **a.__dict__)")
+
+
+class AppTestWithMapDictKwargs(object):
+    spaceconfig = {"objspace.std.withmapdict": True,
+                   "objspace.std.withmapdictkwargs": True}
+
+    def test_kwargs_strategy(self):
+        from __pypy__ import strategy
+        def f(**kwargs):
+            return kwargs
+        d = f(a=1, b=2)
+        assert strategy(d) == "MapDictKwargsStrategy"
+        assert d == {"a": 1, "b": 2}
+        assert f() == {}
+        d[1] = 2
+        assert strategy(d) == "ObjectDictStrategy"
+        assert d == {"a": 1, "b": 2, 1: 2}
+
+    def test_kwargs_map_depth_limit(self):
+        from __pypy__ import strategy
+        def f(**kwargs):
+            return kwargs
+        d = f(**dict.fromkeys("abcdefghijklmnopqrstuvwxyz", 1))
+        assert strategy(d) != "MapDictKwargsStrategy"
+        assert d == dict.fromkeys("abcdefghijklmnopqrstuvwxyz", 1)
+
+    def test_kwargs_map_count_limit(self):
+        from __pypy__ import strategy
+        def f(**kwargs):
+            return kwargs
+        for i in range(1100):
+            d = f(**{"key%d" % i: i})
+        # no new maps are created past the limit...
+        assert strategy(d) == "KwargsDictStrategy"
+        assert d == {"key1099": 1099}
+        # ...but the existing ones are still used
+        d = f(key0=0)
+        assert strategy(d) == "MapDictKwargsStrategy"
+        d["key1"] = 1
+        assert strategy(d) == "KwargsDictStrategy"
+        assert d == {"key0": 0, "key1": 1}
+
+    def test_forward_kwargs(self):
+        def f(**kwargs):
+            return g(**kwargs)
+        def g(a, b=5, **rest):
+            return a, b, rest
+        assert f(a=1) == (1, 5, {})
+        assert f(b=2, a=1, c=3) == (1, 2, {"c": 3})
+        raises(TypeError, f, b=2)
+
+    def test_update_instance_dict(self):
+        from __pypy__ import strategy
+        class Model(object):
+            def __init__(self, **kwargs):
+                self.__dict__.update(kwargs)
+        m = Model(name="x", value=3)
+        assert m.name == "x"
+        assert m.value == 3
+        assert strategy(m.__dict__) == "MapDictStrategy"
+        assert m.__dict__.keys() == Model(name="y", value=4).__dict__.keys()
+
 
 class AppTestWithMapDictAndCounters(object):
     spaceconfig = {"objspace.std.withmapdict": True,
@@ -775,6 +920,22 @@ class AppTestWithMapDictAndCounters(object):
         res = self.check(f, 'x')
         assert res == (0, 1, 0)
 
+    def test_store_attr_counters(self):
+        import __pypy__
+        class A(object):
+            def __init__(self):
+                self.x = 0
+        def f(a):
+            for i in range(10):
+                a.x = i
+        a = A()
+        f(a)
+        assert a.x == 9
+        counters = __pypy__.code_cache_counters(f.func_code)
+        assert ('x', 'store', 9, 1) in counters
+        counters = __pypy__.code_cache_counters(A.__init__.im_func.func_code)
+        assert [c for c in counters if c[1] == 'store'] == []
+
     def test_property(self):
         class A(object):
             x = property(lambda self: 42)
@@ -45,7 +45,25 @@ class TestW_SpecialisedTupleObject():
         hash_test([1, (1, 2)])
         hash_test([1, ('a', 2)])
         hash_test([1, ()])
-        hash_test([1, 2, 3], must_be_specialized=False)
+        hash_test([1, 2, 3])
+        hash_test([1.5, -0.0, 2.0, 1e300])
+        hash_test([-1] * 8)
+        hash_test([1, 2.5, 3], must_be_specialized=False)
+
+    def test_unboxed_tuples(self):
+        space = self.space
+        w_tuple = space.newtuple([space.wrap(i) for i in range(5)])
+        assert isinstance(w_tuple, W_SpecialisedTupleObject_ints)
+        assert w_tuple.values == [0, 1, 2, 3, 4]
+        w_tuple = space.newtuple([space.wrap(1.5)])
+        assert isinstance(w_tuple, W_SpecialisedTupleObject_floats)
+        assert w_tuple.values == [1.5]
+        w_tuple = space.newtuple([space.wrap(1), space.wrap(2.5),
+                                  space.wrap(3)])
+        assert isinstance(w_tuple, W_TupleObject)
+        w_tuple = space.newtuple([space.w_True, space.w_False,
+                                  space.w_True])
+        assert isinstance(w_tuple, W_TupleObject)
 
 
 class AppTestW_SpecialisedTupleObject:
@@ -83,8 +101,27 @@ class AppTestW_SpecialisedTupleObject:
         assert len(t) == 2
 
     def test_notspecialisedtuple(self):
-        assert not self.isspecialised((42, 43, 44, 45))
-        assert not self.isspecialised((1.5,))
+        assert not self.isspecialised((42, 43.5, 44, 45))
+        assert not self.isspecialised(('a', 'b', 'c'))
+
+    def test_unboxedtuple(self):
+        assert self.isspecialised((42, 43, 44, 45), '_ints')
+        assert self.isspecialised((1.5,), '_floats')
+        t = (1.5, 2.5, float('nan'), -0.0)
+        assert self.isspecialised(t, '_floats')
+        assert t[-4] == 1.5
+        assert t[3] == 0.0
+        raises(IndexError, "t[4]")
+        raises(IndexError, "t[-5]")
+        assert t == t[:2] + t[2:]
+        assert t == (1.5, 2.5, float('nan'), 0.0)
+        assert t != (1.5, 2.5, 3.0, -0.0)
+        assert (1, 2, 3) == (1.0, 2L, 3.0)
+        assert (1, 2, 3) != (1, 2, 4)
+        assert (1, 2, 3) != (1, 2)
+        assert hash((1, 2, 3)) == hash((1.0, 2L, 3.0))
+        assert (1, 2, 3) < (1, 2, 4)
+        assert list((4, 5, 6)) == [4, 5, 6]
 
     def test_slicing_to_specialised(self):
         t = (1, 2, 3)
@@ -204,7 +241,7 @@ class AppTestW_SpecialisedTupleObject:
         assert a == (2.2,) + b
         assert not a != (2.2,) + b
         #
-        if not self.isspecialised((1, 2, 3)):
+        if not self.isspecialised((1, 2, 3), '_ooo'):
             skip("don't have specialization for 3-tuples")
         a = (1, 2.2, '333')
         assert self.isspecialised(a)
@@ -0,0 +1,59 @@
+from pypy.objspace.std.test import test_unicodeobject
+
+class AppTestUnicodeBuffer(test_unicodeobject.AppTestUnicodeString):
+    spaceconfig = {"objspace.std.withunicodebuf": True,
+                   "usemodules": ("unicodedata",)}
+
+    def test_basic(self):
+        import __pypy__
+        s = u"Hello, ".__add__(u"World!")
+        assert type(s) is unicode
+        assert 'builder' in __pypy__.internal_repr(s)
+        assert s == u"Hello, World!"
+
+    def test_add_twice(self):
+        x = u"a".__add__(u"b")
+        y = x + u"c"
+        c = x + u"d"
+        assert y == u"abc"
+        assert c == u"abd"
+        assert x == u"ab"
+
+    def test_add(self):
+        import __pypy__
+        all = u""
+        for i in range(20):
+            all += unicode(i)
+            all += u"\u1234"
+        assert 'builder' in __pypy__.internal_repr(all)
+        assert all == u"\u1234".join([unicode(i) for i in range(20)]) + u"\u1234"
+
+    def test_add_after_force(self):
+        s = u"a".__add__(u"b")
+        assert s.upper() == u"AB"
+        s += u"c"
+        assert s.upper() == u"ABC"
+        s += "d"
+        assert s == u"abcd"
+
+    def test_hash_and_len(self):
+        def join(s): return s[:len(s) // 2] + s[len(s) // 2:]
+        t = u'a' * 101
+        s = join(t)
+        assert len(s) == 101
+        assert hash(s) == hash(t)
+        assert {t: 5}[s] == 5
+
+    def test_mixed_types(self):
+        s = u"a".__add__(u"b")
+        assert s + "c" == u"abc"
+        assert "c" + s == u"cab"
+        raises(TypeError, "s + 1")
+        assert u"".join([s, s]) == u"abab"
+        assert u"%s-%s" % (s, s) == u"ab-ab"
+
+    def test_format_chain(self):
+        out = u""
+        for i in range(5):
+            out += u"<li>%s</li>" % (i,)
+        assert out == u"".join([u"<li>%d</li>" % i for i in range(5)])
@@ -32,6 +32,33 @@ class TestUnicodeObject:
                 space.w_unicode, "__new__", space.w_unicode, w_uni)
         assert w_new is w_uni
 
+    def test_ascii_storage(self):
+        space = self.space
+        w_uni = space.call_method(space.wrap('abcd'), 'decode',
+                                  space.wrap('utf-8'))
+        assert w_uni._ascii == 'abcd' and w_uni._value is None
+        w_slice = space.getitem(w_uni, space.newslice(
+            space.wrap(1), space.wrap(3), space.w_None))
+        assert w_slice._ascii == 'bc'
+        w_sum = space.add(w_uni, w_slice)
+        assert w_sum._ascii == 'abcdbc'
+        assert space.int_w(space.len(w_sum)) == 6
+        assert space.eq_w(space.hash(w_uni), space.hash(space.wrap('abcd')))
+        assert space.eq_w(w_uni, space.wrap(u'abcd'))
+        w_str = space.call_method(w_uni, 'encode', space.wrap('utf-8'))
+        assert space.str_w(w_str) == 'abcd'
+        assert w_uni._ascii == 'abcd'
+        # anything else switches to the wide storage
+        assert space.unicode_w(space.call_method(w_uni, 'upper')) == u'ABCD'
+        assert w_uni._ascii is None and w_uni._value == u'abcd'
+
+    def test_ascii_storage_only_for_ascii(self):
+        space = self.space
+        w_uni = space.call_method(space.wrap('ab\xc3\xa9'), 'decode',
+                                  space.wrap('utf-8'))
+        assert w_uni._ascii is None
+        assert space.unicode_w(w_uni) == u'ab\xe9'
+
 
 class AppTestUnicodeStringStdOnly:
     def test_compares(self):
@@ -63,6 +90,27 @@ class AppTestUnicodeString:
         check(u'a' + 'b', u'ab')
         check('a' + u'b', u'ab')
 
+    def test_decoded_ascii(self):
+        u = 'hello world'.decode('utf-8')
+        assert u == u'hello world' and u'hello world' == u
+        assert u != u'hello' and not u != u'hello world'
+        assert hash(u) == hash('hello world') == hash(u'hello world')
+        assert {u'hello world': 1}[u] == 1
+        assert u[0] == u'h' and u[-1] == u'd'
+        raises(IndexError, "u[11]")
+        assert u[1:5] == u'ello' and u[::2] == u'hlowrd' and u[5:5] == u''
+        assert type(u[1:5]) is unicode
+        assert u + u'!' == u'hello world!'
+        assert u + u'\u1234' == u'hello world\u1234'
+        assert u.encode('ascii') == u.encode('utf-8') == 'hello world'
+        assert str(u) == 'hello world'
+        assert u.upper() == u'HELLO WORLD'
+        assert len(u) == 11
+        assert unicode('abc') == u'abc'
+        class U(unicode):
+            pass
+        assert U(u) == u'hello world' and type(U(u)) is U
+
     def test_join(self):
         def check(a, b):
             assert a == b
@@ -1,7 +1,8 @@
 """The builtin unicode implementation"""
 
+from rpython.rlib import jit
 from rpython.rlib.objectmodel import (
-    compute_hash, compute_unique_id, import_from_mixin)
+    compute_hash, compute_unique_id, import_from_mixin, instantiate)
 from rpython.rlib.buffer import StringBuffer
 from rpython.rlib.rstring import StringBuilder, UnicodeBuilder
 from rpython.rlib.runicode import (
@@ -17,6 +18,7 @@ from pypy.module.unicodedata import unicodedb
 from pypy.objspace.std import newformat
 from pypy.objspace.std.basestringtype import basestring_typedef
 from pypy.objspace.std.formatting import mod_format
+from pypy.objspace.std.sliceobject import W_SliceObject
 from pypy.objspace.std.stringmethods import StringMethods
 
 __all__ = ['W_UnicodeObject', 'wrapunicode', 'plain_str2unicode',
@@ -25,25 +27,90 @@ __all__ = ['W_UnicodeObject', 'wrapunicode', 'plain_str2unicode',
 
 
 class W_UnicodeObject(W_Root):
+    """A unicode string.
+
+    Pure-ASCII strings made from bytes (by decoding, or by coercing a str)
+    are stored as that byte string in '_ascii', one byte per character.
+
+    With the withunicodebuf option, the result of an addition is the first
+    '_length' characters of the UnicodeBuilder '_addbuilder', so that adding
+    to it again appends to the same builder, as W_StringBufferObject does
+    for bytes.
+
+    In both cases '_value' is None until an operation needs the RPython
+    unicode string, at which point it is computed and '_ascii' dropped.
+    """
     import_from_mixin(StringMethods)
-    _immutable_fields_ = ['_value']
+    _immutable_fields_ = ['_value?', '_ascii?', '_addbuilder', '_length']
 
     def __init__(w_self, unistr):
         assert isinstance(unistr, unicode)
         w_self._value = unistr
+        w_self._ascii = None
+        w_self._addbuilder = None
+        w_self._length = 0
+
+    @staticmethod
+    def from_ascii(s):
+        """Make a unicode object from 's', which must only contain ASCII
+        characters."""
+        w_self = instantiate(W_UnicodeObject)
+        w_self._value = None
+        w_self._ascii = s
+        w_self._addbuilder = None
+        w_self._length = 0
+        return w_self
+
+    @staticmethod
+    def from_builder(builder):
+        """Make a unicode object from the current content of 'builder'."""
+        w_self = instantiate(W_UnicodeObject)
+        w_self._value = None
+        w_self._ascii = None
+        w_self._addbuilder = builder
+        w_self._length = builder.getlength()
+        return w_self
 
     def __repr__(w_self):
         """representation for debugging purposes"""
+        if w_self._ascii is not None:
+            return "%s(%r, ascii)" % (w_self.__class__.__name__,
+                                      w_self._ascii)
+        if w_self._addbuilder is not None:
+            return "%s(%r[:%d], builder)" % (
+                w_self.__class__.__name__, w_self._addbuilder, w_self._length)
         return "%s(%r)" % (w_self.__class__.__name__, w_self._value)
 
     def unwrap(w_self, space):
         # for testing
-        return w_self._value
+        return w_self._get_value()
 
     def create_if_subclassed(w_self):
         if type(w_self) is W_UnicodeObject:
             return w_self
-        return W_UnicodeObject(w_self._value)
+        if w_self._ascii is not None:
+            return W_UnicodeObject.from_ascii(w_self._ascii)
+        return W_UnicodeObject(w_self._get_value())
+
+    def _get_value(self):
+        value = self._value
+        if value is None:
+            value = self._force()
+        return value
+
+    @jit.dont_look_inside
+    def _force(self):
+        s = self._ascii
+        if s is not None:
+            value = unicode(s)
+            self._ascii = None
+        else:
+            # keep the builder: adding to self can still append to it
+            value = self._addbuilder.build()
+            if self._length < len(value):
+                value = value[:self._length]
+        self._value = value
+        return value
 
     def is_w(self, space, w_other):
         if not isinstance(w_other, W_UnicodeObject):
@@ -52,6 +119,9 @@ class W_UnicodeObject(W_Root):
             return True
         if self.user_overridden_class or w_other.user_overridden_class:
             return False
+        if self._ascii is not None or w_other._ascii is not None:
+            # each of them gets its own unicode string when widened
+            return False
         return space.unicode_w(self) is space.unicode_w(w_other)
 
     def immutable_unique_id(self, space):
@@ -63,12 +133,13 @@ class W_UnicodeObject(W_Root):
         return space.str_w(space.str(self))
 
     def unicode_w(self, space):
-        return self._value
+        return self._get_value()
 
     def readbuf_w(self, space):
         from rpython.rlib.rstruct.unichar import pack_unichar, UNICODE_SIZE
-        builder = StringBuilder(len(self._value) * UNICODE_SIZE)
-        for unich in self._value:
+        value = self._get_value()
+        builder = StringBuilder(len(value) * UNICODE_SIZE)
+        for unich in value:
             pack_unichar(unich, builder)
         return StringBuffer(builder.build())
 
@@ -79,14 +150,14 @@ class W_UnicodeObject(W_Root):
     charbuf_w = str_w
 
     def listview_unicode(w_self):
-        return _create_list_from_unicode(w_self._value)
+        return _create_list_from_unicode(w_self._get_value())
 
     def ord(self, space):
-        if len(self._value) != 1:
+        if self._len() != 1:
             raise oefmt(space.w_TypeError,
                          "ord() expected a character, but string of length %d "
-                         "found", len(self._value))
-        return space.wrap(ord(self._value[0]))
+                         "found", self._len())
+        return space.wrap(ord(self._get_value()[0]))
 
     def _new(self, value):
         return W_UnicodeObject(value)
@@ -98,6 +169,11 @@ class W_UnicodeObject(W_Root):
         return W_UnicodeObject.EMPTY
 
     def _len(self):
+        if self._addbuilder is not None:
+            return self._length
+        s = self._ascii
+        if s is not None:
+            return len(s)
         return len(self._value)
 
     _val = unicode_w
@@ -111,11 +187,11 @@ class W_UnicodeObject(W_Root):
     @staticmethod
     def _op_val(space, w_other):
         if isinstance(w_other, W_UnicodeObject):
-            return w_other._value
+            return w_other._get_value()
         if space.isinstance_w(w_other, space.w_str):
-            return unicode_from_string(space, w_other)._value
+            return unicode_from_string(space, w_other)._get_value()
         return unicode_from_encoded_object(
-            space, w_other, None, "strict")._value
+            space, w_other, None, "strict")._get_value()
 
     def _chr(self, char):
         assert len(char) == 1
@@ -202,11 +278,11 @@ class W_UnicodeObject(W_Root):
 
         assert isinstance(w_value, W_UnicodeObject)
         w_newobj = space.allocate_instance(W_UnicodeObject, w_unicodetype)
-        W_UnicodeObject.__init__(w_newobj, w_value._value)
+        W_UnicodeObject.__init__(w_newobj, w_value._get_value())
         return w_newobj
 
     def descr_repr(self, space):
-        chars = self._value
+        chars = self._get_value()
         size = len(chars)
         s = _repr_function(chars, size, "strict")
         return space.wrap(s)
@@ -215,10 +291,38 @@ class W_UnicodeObject(W_Root):
         return encode_object(space, self, None, None)
 
     def descr_hash(self, space):
-        x = compute_hash(self._value)
+        # str and unicode strings with the same characters hash the same
+        s = self._ascii
+        if s is not None:
+            x = compute_hash(s)
+        else:
+            x = compute_hash(self._get_value())
         return space.wrap(x)
 
+    def _either_ascii(self, w_other):
+        return (isinstance(w_other, W_UnicodeObject) and
+                (self._ascii is not None or w_other._ascii is not None))
+
+    def _ascii_eq(self, w_other):
+        """Compare with the unicode object w_other, at least one of which
+        uses the ASCII storage, without widening either of them."""
+        s = self._ascii
+        if s is None:
+            return w_other._ascii_eq(self)
+        other = w_other._ascii
+        if other is not None:
+            return s == other
+        value = w_other._get_value()
+        if len(value) != len(s):
+            return False
+        for i in range(len(s)):
+            if ord(value[i]) != ord(s[i]):
+                return False
+        return True
+
     def descr_eq(self, space, w_other):
+        if self._either_ascii(w_other):
+            return space.newbool(self._ascii_eq(w_other))
         try:
             res = self._val(space) == self._op_val(space, w_other)
         except OperationError as e:
@@ -235,6 +339,8 @@ class W_UnicodeObject(W_Root):
         return space.newbool(res)
 
     def descr_ne(self, space, w_other):
+        if self._either_ascii(w_other):
+            return space.newbool(not self._ascii_eq(w_other))
         try:
             res = self._val(space) != self._op_val(space, w_other)
         except OperationError as e:
@@ -286,6 +392,52 @@ class W_UnicodeObject(W_Root):
             raise
         return space.newbool(res)
 
+    _StringMethods_descr_add = descr_add
+    def descr_add(self, space, w_other):
+        if space.config.objspace.std.withunicodebuf:
+            return self._add_to_builder(space, w_other)
+        s = self._ascii
+        if s is not None and isinstance(w_other, W_UnicodeObject):
+            other = w_other._ascii
+            if other is not None:
+                return W_UnicodeObject.from_ascii(s + other)
+        return self._StringMethods_descr_add(space, w_other)
+
+    def _add_to_builder(self, space, w_other):
+        try:
+            other = self._op_val(space, w_other)
+        except OperationError as e:
+            if e.match(space, space.w_TypeError):
+                return space.w_NotImplemented
+            raise
+        builder = self._addbuilder
+        if builder is None or builder.getlength() != self._length:
+            # someone else already appended to our builder
+            builder = UnicodeBuilder()
+            builder.append(self._get_value())
+        builder.append(other)
+        return W_UnicodeObject.from_builder(builder)
+
+    _StringMethods_descr_getitem = descr_getitem
+    def descr_getitem(self, space, w_index):
+        s = self._ascii
+        if s is None:
+            return self._StringMethods_descr_getitem(space, w_index)
+        if isinstance(w_index, W_SliceObject):
+            start, stop, step, sl = w_index.indices4(space, len(s))
+            if sl == 0:
+                return self._empty()
+            elif step == 1:
+                assert start >= 0 and stop >= 0
+                return W_UnicodeObject.from_ascii(s[start:stop])
+            return self._StringMethods_descr_getitem(space, w_index)
+        index = space.getindex_w(w_index, space.w_IndexError, "string index")
+        try:
+            character = s[index]
+        except IndexError:
+            raise oefmt(space.w_IndexError, "string index out of range")
+        return W_UnicodeObject(unichr(ord(character)))
+
     def descr_format(self, space, __args__):
         return newformat.format_method(space, self, __args__, is_unicode=True)
 
@@ -296,13 +448,13 @@ class W_UnicodeObject(W_Root):
         formatter = newformat.unicode_formatter(space, spec)
         self2 = unicode_from_object(space, self)
         assert isinstance(self2, W_UnicodeObject)
-        return formatter.format_string(self2._value)
+        return formatter.format_string(self2._get_value())
 
     def descr_mod(self, space, w_values):
         return mod_format(space, self, w_values, do_unicode=True)
 
     def descr_translate(self, space, w_table):
-        selfvalue = self._value
+        selfvalue = self._get_value()
         w_sys = space.getbuiltinmodule('sys')
         maxunicode = space.int_w(space.getattr(w_sys,
                                                space.wrap("maxunicode")))
@@ -374,7 +526,7 @@ class W_UnicodeObject(W_Root):
 
     def descr_islower(self, space):
         cased = False
-        for uchar in self._value:
+        for uchar in self._get_value():
             if (unicodedb.isupper(ord(uchar)) or
                 unicodedb.istitle(ord(uchar))):
                 return space.w_False
@@ -384,7 +536,7 @@ class W_UnicodeObject(W_Root):
 
     def descr_isupper(self, space):
         cased = False
-        for uchar in self._value:
+        for uchar in self._get_value():
             if (unicodedb.islower(ord(uchar)) or
                 unicodedb.istitle(ord(uchar))):
                 return space.w_False
@@ -430,6 +582,16 @@ def _get_encoding_and_errors(space, w_encoding, w_errors):
 
 
 def encode_object(space, w_object, encoding, errors):
+    if isinstance(w_object, W_UnicodeObject):
+        s = w_object._ascii
+        if s is not None:
+            fast_encoding = encoding
+            if fast_encoding is None:
+                fast_encoding = getdefaultencoding(space)
+            # the ASCII bytes are already their own encoding in these
+            if (fast_encoding == 'ascii' or fast_encoding == 'utf-8' or
+                    fast_encoding == 'latin-1'):
+                return space.wrap(s)
     if encoding is None:
         # Get the encoder functions as a wrapped object.
         # This lookup is cached.
@@ -478,11 +640,15 @@ def decode_object(space, w_obj, encoding, errors):
         if encoding == 'ascii':
             # XXX error handling
             s = space.charbuf_w(w_obj)
+            if _is_ascii(s):
+                return W_UnicodeObject.from_ascii(s)
             eh = unicodehelper.decode_error_handler(space)
             return space.wrap(str_decode_ascii(
                     s, len(s), None, final=True, errorhandler=eh)[0])
         if encoding == 'utf-8':
             s = space.charbuf_w(w_obj)
+            if _is_ascii(s):
+                return W_UnicodeObject.from_ascii(s)
             eh = unicodehelper.decode_error_handler(space)
             return space.wrap(str_decode_utf_8(
                     s, len(s), None, final=True, errorhandler=eh,
@@ -540,11 +706,18 @@ def unicode_from_string(space, w_str):
     if encoding != 'ascii':
         return unicode_from_encoded_object(space, w_str, encoding, "strict")
     s = space.str_w(w_str)
-    try:
-        return W_UnicodeObject(s.decode("ascii"))
-    except UnicodeDecodeError:
-        # raising UnicodeDecodeError is messy, "please crash for me"
-        return unicode_from_encoded_object(space, w_str, "ascii", "strict")
+    if _is_ascii(s):
+        return W_UnicodeObject.from_ascii(s)
+    # raising UnicodeDecodeError is messy, "please crash for me"
+    return unicode_from_encoded_object(space, w_str, "ascii", "strict")
+
+
+@jit.elidable
+def _is_ascii(s):
+    for c in s:
+        if ord(c) >= 0x80:
+            return False
+    return True
 
 
 class UnicodeDocstrings:
@@ -1093,7 +1266,7 @@ W_UnicodeObject.EMPTY = W_UnicodeObject(u'')
 def unicode_to_decimal_w(space, w_unistr):
     if not isinstance(w_unistr, W_UnicodeObject):
         raise oefmt(space.w_TypeError, "expected unicode, got '%T'", w_unistr)
-    unistr = w_unistr._value
+    unistr = w_unistr._get_value()
     result = ['\0'] * len(unistr)
     digits = ['0', '1', '2', '3', '4',
               '5', '6', '7', '8', '9']
@@ -402,8 +402,8 @@ class __extend__(SomeDict):
             return SomeImpossibleValue()
         dct1.dictdef.union(dct2.dictdef)
 
-    def method__prepare_dict_update(dct, num):
-        pass
+    def method__prepare_dict_update(dct, num, s_exact):
+        assert s_exact.is_constant()
 
     def method_keys(self):
         return getbookkeeper().newlist(self.dictdef.read_key())
@@ -7,3 +7,9 @@ FRAME_FIXED_SIZE = 0
 JITFRAME_FIXED_SIZE = 0
 
 SANITYCHECK = True
+
+# Once a compiled function has absorbed this many bridges, any further
+# bridges are compiled into a separate function and linked in at runtime,
+# rather than re-assembling the (ever-growing) original function.
+# A negative value means there is no limit.
+BRIDGE_REASSEMBLY_THRESHOLD = 8
@@ -5,6 +5,9 @@ import time
 from rpython.rlib import rgc
 from rpython.rlib.rarithmetic import r_uint, intmask
 from rpython.rlib.objectmodel import we_are_translated
+from rpython.rlib.debug import (debug_print, debug_start, debug_stop,
+                                have_debug_prints)
+from rpython.rlib.jit import AsmInfo
 from rpython.jit.backend.llsupport import symbolic, jitframe, rewrite, llerrno
 from rpython.jit.backend.llsupport.regalloc import compute_vars_longevity
 from rpython.jit.backend.llsupport.descr import (unpack_fielddescr,
@@ -25,7 +28,8 @@ from rpython.jit.metainterp.history import (AbstractFailDescr, ConstInt,
 
 from rpython.jit.backend.asmjs import support
 from rpython.jit.backend.asmjs import jsvalue as js
-from rpython.jit.backend.asmjs.arch import WORD, SANITYCHECK
+from rpython.jit.backend.asmjs.arch import (WORD, SANITYCHECK,
+                                            BRIDGE_REASSEMBLY_THRESHOLD)
 from rpython.jit.backend.asmjs.jsbuilder import ASMJSBuilder
 
 
@@ -55,12 +59,55 @@ INVALIDATION = lltype.Struct(
 )
 INVALIDATION_PTR = lltype.Ptr(INVALIDATION)
 
+# A small record per guard.  The first two words are a slot into which we
+# can write the funcid and entry label of a bridge that was compiled into a
+# separate function.  Guards in a full function check this at runtime, so
+# that attaching such a bridge does not require re-assembling the function
+# that contains the guard.  The last two words hold the faildescr and gcmap
+# to write into the frame when the guard fails, so that the generated code
+# for each guard need only pass the address of its record to the shared
+# guard-exit stub for its layout, rather than embedding them as constants.
+GUARDRECORDS = rffi.CArray(lltype.Signed)
+GUARDRECORDS_PTR = lltype.Ptr(GUARDRECORDS)
+GUARDRECORD_WORDS = 4
+GUARDRECORD_DESCR = 2 * WORD
+GUARDRECORD_GCMAP = 3 * WORD
+
 
 class AssemblerASMJS(object):
     """Class for assembling a Trace into a compiled ASMJS function."""
 
     def __init__(self, cpu):
         self.cpu = cpu
+        self.bridge_reassembly_threshold = BRIDGE_REASSEMBLY_THRESHOLD
+        self.next_entryid = 0
+        # All live functions, by funcid, for reporting statistics.
+        self.compiled_funcs = {}
+        # Small ids for each distinct guard-exit layout, used to name
+        # the shared guard-exit stub for that layout.
+        self.guard_exit_layouts = {}
+
+    def get_guard_exit_name(self, failkinds, faillocs, hasexc):
+        """Get the name of the shared guard-exit stub for a layout.
+
+        Guards that spill the same kinds of value to the same frame
+        locations, and that agree on whether an exception needs to be
+        preserved, can all exit via the same stub.
+        """
+        key = []
+        for i in xrange(len(failkinds)):
+            if failkinds[i] == HOLE:
+                continue
+            key.append("%s%d" % (failkinds[i], faillocs[i]))
+        if hasexc:
+            key.append("x")
+        layout = ",".join(key)
+        try:
+            layoutid = self.guard_exit_layouts[layout]
+        except KeyError:
+            layoutid = len(self.guard_exit_layouts)
+            self.guard_exit_layouts[layout] = layoutid
+        return "guard_exit_%d" % (layoutid,)
 
     def set_debug(self, v):
         return False
@@ -111,43 +158,67 @@ class AssemblerASMJS(object):
         self.teardown()
         # If it jumps to an existing loop, merge with that func.
         # If not, compile it afresh.
-        final_op = operations[-1]
-        if final_op.getopnum() != rop.JUMP:
-            func.reassemble()
-        else:
-            descr = final_op.getdescr()
-            assert isinstance(descr, TargetToken)
-            target_block = descr._asmjs_block
-            if target_block.clt.func is func:
-                func.reassemble()
-            else:
-                target_block.clt.func.merge_with(func)
+        self._link_and_reassemble(func, operations[-1])
         #os.write(2, "ASSEMBLE LOOP END %f\n" % (time.time(),))
+        return clt.func.get_asminfo()
 
     def assemble_bridge(self, faildescr, inputargs, operations,
                         original_loop_token, log):
         """Assemble, compile and link a new bridge from the given trace."""
         #os.write(2, "ASSEMBLE BRIDGE START %f\n" % (time.time(),))
         assert isinstance(faildescr, AbstractFailDescr)
-        # Merge the new operations into the existing loop.
+        # Merge the new operations into the function containing the guard,
+        # unless it already holds too many bridges.  In that case we compile
+        # them into a separate function and link it in at runtime, to avoid
+        # the cost of repeatedly re-assembling a very large function.
         self.setup(original_loop_token)
         clt = original_loop_token.compiled_loop_token
-        clt.add_code_to_loop(operations, inputargs, faildescr)
+        guard_func = faildescr._asmjs_owner.func
+        if guard_func.is_full():
+            func = clt.get_bridge_func()
+        else:
+            func = guard_func
+        bridge_block = clt.add_code_to_loop(operations, inputargs,
+                                            faildescr, func)
+        func.num_bridges += 1
         self.teardown()
         # If it jumps to a loop in a different func, merge with that func.
         # If not, recompile just the modified func.
-        final_op = operations[-1]
-        if final_op.getopnum() != rop.JUMP:
-            clt.func.reassemble()
+        if func is guard_func:
+            self._link_and_reassemble(func, operations[-1])
         else:
-            descr = final_op.getdescr()
-            assert isinstance(descr, TargetToken)
-            target_block = descr._asmjs_block
-            if target_block.clt.func is clt.func:
-                clt.func.reassemble()
-            else:
-                target_block.clt.func.merge_with(clt.func)
+            func.add_entry_block(bridge_block)
+            self._link_and_reassemble(func, operations[-1])
+            # Point the guard at the separately-compiled bridge.
+            faildescr._asmjs_owner.set_bridge_slot(faildescr, bridge_block)
         #os.write(2, "ASSEMBLE BRIDGE END %f\n" % (time.time(),))
+        return bridge_block.func.get_asminfo()
+
+    def _link_and_reassemble(self, func, final_op):
+        """Re-compile the given func, linking it to the target of final_op.
+
+        If the final op jumps into a different function, then the two will
+        usually be merged together.  Functions holding overflow bridges are
+        never merged; they jump into other functions via a trampoline.
+        Returns the function into which the new code was compiled.
+        """
+        if final_op.getopnum() != rop.JUMP:
+            func.reassemble()
+            return func
+        descr = final_op.getdescr()
+        assert isinstance(descr, TargetToken)
+        target_block = descr._asmjs_block
+        target_func = target_block.func
+        if target_func is func:
+            func.reassemble()
+            return func
+        if func.is_bridge_func or target_func.is_bridge_func:
+            func.ensure_frame_depth(target_block.inputsize)
+            if target_func.add_entry_block(target_block):
+                target_func.reassemble()
+            func.reassemble()
+            return func
+        return target_func.merge_with(func)
 
     def redirect_call_assembler(self, oldlooptoken, newlooptoken):
         #os.write(2, "ASSEMBLE REDIRECT START %f\n" % (time.time(),))
@@ -169,6 +240,12 @@ class AssemblerASMJS(object):
     def invalidate_loop(self, looptoken):
         looptoken.compiled_loop_token.invalidate_loop()
 
+    def get_all_funcs(self):
+        """Get a list of all live functions, ordered by funcid."""
+        funcids = self.compiled_funcs.keys()
+        funcids.sort()
+        return [self.compiled_funcs[funcid] for funcid in funcids]
+
 
 class CompiledFuncASMJS(object):
     """A top-level compiled function for the asmjs backend.
@@ -178,17 +255,31 @@ class CompiledFuncASMJS(object):
     Combining all local jumps into a single function reduces the overhead
     of dispatching between loops, at the cost of increased jit-compilation
     overhead.
+
+    To bound that overhead, a function that has absorbed too many bridges
+    stops accepting new ones.  They are compiled into a separate "bridge
+    function" instead, which is entered from the guard via a trampoline
+    and which can itself jump back into other functions the same way.
     """
 
-    def __init__(self, assembler):
+    def __init__(self, assembler, is_bridge_func=False):
         self.assembler = assembler
         self.cpu = assembler.cpu
         self.compiled_funcid = support.jitReserve()
         self.compiled_loops = []
         self.compiled_blocks = []
+        self.entry_blocks = []
+        self.is_bridge_func = is_bridge_func
+        self.num_bridges = 0
         self.num_removed_loops = 0
         self.merged_from = None
         self.merged_into = None
+        # Statistics about the cost of generating and compiling this function.
+        self.source_bytes = 0
+        self.num_reassemblies = 0
+        self.num_merges = 0
+        self.generate_ms = 0.0
+        assembler.compiled_funcs[self.compiled_funcid] = self
         frame_info = lltype.malloc(jitframe.JITFRAMEINFO, flavor="raw")
         self.frame_info = rffi.cast(jitframe.JITFRAMEINFOPTR, frame_info)
         self.frame_info.clear()
@@ -197,6 +288,62 @@ class CompiledFuncASMJS(object):
     def free(self):
         lltype.free(self.frame_info, flavor="raw")
         support.jitFree(self.compiled_funcid)
+        self.assembler.compiled_funcs.pop(self.compiled_funcid, None)
+
+    def get_num_blocks(self):
+        num_blocks = 0
+        for block in self.compiled_blocks:
+            if block is not None and block.func is self:
+                num_blocks += 1
+        return num_blocks
+
+    def get_compile_ms(self):
+        """Get the total time spent compiling this function on the host."""
+        return support.jitCompileTime(self.compiled_funcid)
+
+    def get_asminfo(self):
+        """Describe this function as an AsmInfo, for the jit hooks.
+
+        There is no machine code to point at, so the "address" is the
+        funcid and the "length" is the size of the generated source.
+        """
+        return AsmInfo({}, self.compiled_funcid, self.source_bytes)
+
+    def is_full(self):
+        """Check whether new bridges should go into a separate function."""
+        threshold = self.assembler.bridge_reassembly_threshold
+        return threshold >= 0 and self.num_bridges >= threshold
+
+    def add_entry_block(self, block):
+        """Allow the given block to be entered directly from other functions.
+
+        Such entries are requested by invoking the function with a negative
+        label, calculated from a unique and stable "entryid" for the block.
+        Returns True if the block was not previously an entry block, in
+        which case the function must be re-assembled to make it enterable.
+        """
+        if SANITYCHECK:
+            assert block.func is self
+        if block.entryid < 0:
+            block.entryid = self.assembler.next_entryid
+            self.assembler.next_entryid += 1
+        for entry_block in self.entry_blocks:
+            if entry_block is block:
+                return False
+        self.entry_blocks.append(block)
+        return True
+
+    def _get_entry_blocks(self):
+        entry_blocks = []
+        for block in self.entry_blocks:
+            if block.func is not self:
+                continue
+            if self.compiled_blocks[block.compiled_blockid] is not block:
+                continue
+            if block.clt.redirected_to is not None:
+                continue
+            entry_blocks.append(block)
+        return entry_blocks
 
     def merge_with(self, other):
         """Merge loops from two functions into a single unified function.
@@ -210,6 +357,8 @@ class CompiledFuncASMJS(object):
             assert self.merged_into is None
             assert other.merged_into is None
             assert other is not self
+            assert not self.is_bridge_func
+            assert not other.is_bridge_func
         # Merge into the one with the lowest funcid, as it's more likely
         # to have compiled jumps in it that we won't have to redirect.
         if self.compiled_funcid > other.compiled_funcid:
@@ -229,8 +378,14 @@ class CompiledFuncASMJS(object):
             clt.frame_info = res_func.frame_info
             res_func.compiled_loops.append(clt)
         for block in src_func.compiled_blocks:
-            block.compiled_blockid = len(res_func.compiled_blocks)
+            if block is not None:
+                block.func = res_func
+                block.compiled_blockid = len(res_func.compiled_blocks)
             res_func.compiled_blocks.append(block)
+        for block in src_func.entry_blocks:
+            res_func.entry_blocks.append(block)
+        res_func.num_bridges += src_func.num_bridges
+        res_func.num_merges += src_func.num_merges + 1
         res_func.reassemble()
         # Mark the source function as being merged.
         src_func.merged_into = res_func
@@ -241,12 +396,17 @@ class CompiledFuncASMJS(object):
         if SANITYCHECK:
             assert self.compiled_loops[clt.compiled_loopid] is clt
             for block in clt.compiled_blocks:
-                assert self.compiled_blocks[block.compiled_blockid] is block
+                func = block.func
+                assert func.compiled_blocks[block.compiled_blockid] is block
         self.compiled_loops[clt.compiled_loopid] = None
         clt.func = None
         for block in clt.compiled_blocks:
-            self.compiled_blocks[block.compiled_blockid] = None
+            block.func.compiled_blocks[block.compiled_blockid] = None
             block.free()
+        # Any separate bridge functions held only bridges from this loop.
+        for bridge_func in clt.bridge_funcs:
+            bridge_func.free()
+        clt.bridge_funcs = []
         self.num_removed_loops += 1
         if self.num_removed_loops < len(self.compiled_loops):
             self.reassemble()
@@ -268,12 +428,25 @@ class CompiledFuncASMJS(object):
         The generated code consists of a short header to load input arguments
         and sanity-check a few things, followed by the relooped code for
         all the contained blocks.
+
+        Loops are entered by invoking the function with their loopid as
+        label, while entry blocks are entered with a negative label derived
+        from their entryid.  Only the relooping and the glue code between
+        blocks is regenerated here; the code for each block's operations is
+        generated once, when the block is created.
         """
+        start = time.time()
         bldr = ASMJSBuilder(self.cpu)
         if self.merged_into is not None:
             # This function has been merged into some other function.
-            # Dispatch each loop to its new location via a simple switch.
+            # Dispatch each loop to its new location via a simple switch,
+            # and forward direct block entries to it via the trampoline.
             bldr.emit_comment("DISPATCH TO MERGED FUNCTION")
+            merged_funcid = js.ConstInt(self.merged_into.compiled_funcid)
+            with bldr.emit_if_block(js.LessThan(js.label, js.zero)):
+                call = js.CallFunc("jitTrampoline", [merged_funcid, js.label])
+                bldr.emit_expr(call)
+                bldr.emit_exit()
             if len(self.compiled_loops) == 1:
                 clt = self.compiled_loops[0]
                 assert clt is not None
@@ -296,6 +469,7 @@ class CompiledFuncASMJS(object):
                                 bldr.emit_assignment(js.frame, call)
                                 bldr.emit_exit()
         else:
+            entry_blocks = self._get_entry_blocks()
             # We check the depth of the frame at entry to the function.
             # If it's too small then we rellocate it via a helper.
             req_depth = js.ConstInt(self.frame_info.jfi_frame_depth)
@@ -307,9 +481,13 @@ class CompiledFuncASMJS(object):
                 # The layout of input args depends on the target loop.
                 with bldr.emit_switch_block(js.label):
                     for clt in self.compiled_loops:
-                        loopid = js.ConstInt(clt.compiled_loopid)
-                        with bldr.emit_case_block(loopid):
-                            clt.emit_store_initial_gcmap(bldr)
+                        if clt is not None:
+                            loopid = js.ConstInt(clt.compiled_loopid)
+                            with bldr.emit_case_block(loopid):
+                                clt.emit_store_initial_gcmap(bldr)
+                    for block in entry_blocks:
+                        with bldr.emit_case_block(block.get_entry_label()):
+                            block.emit_store_initial_gcmap(bldr)
                 # Now we can call the helper function.
                 # There might be an exception active, which must be preserved.
                 reallocfn = js.ConstInt(self.cpu.realloc_frame)
@@ -320,7 +498,7 @@ class CompiledFuncASMJS(object):
             # Load input args for the loop being entered,
             # and convert from loopid to blockid
             bldr.emit_comment("LOAD INPUT ARGS")
-            if len(self.compiled_loops) == 1:
+            if len(self.compiled_loops) == 1 and not entry_blocks:
                 clt = self.compiled_loops[0]
                 assert clt is not None
                 clt.emit_load_arguments(bldr)
@@ -333,6 +511,11 @@ class CompiledFuncASMJS(object):
                             with bldr.emit_case_block(loopid):
                                 clt.emit_load_arguments(bldr)
                                 clt.emit_set_initial_blockid(bldr)
+                    for block in entry_blocks:
+                        with bldr.emit_case_block(block.get_entry_label()):
+                            block.emit_load_arguments(bldr)
+                            blockid = js.ConstInt(block.compiled_blockid)
+                            bldr.emit_assignment(js.label, blockid)
             # Generate the relooped body from all loop blocks.
             # XXX TODO: find a way to avoid re-doing all this work
             # each time we add a new block.
@@ -342,8 +525,12 @@ class CompiledFuncASMJS(object):
             for clt in self.compiled_loops:
                 if clt is not None and clt.redirected_to is None:
                     entries.append(clt.compiled_blocks[0].compiled_blockid)
-                    for block in clt.compiled_blocks:
-                        blocks[block.compiled_blockid] = block
+            for block in entry_blocks:
+                if block.compiled_blockid not in entries:
+                    entries.append(block.compiled_blockid)
+            for block in self.compiled_blocks:
+                if block is not None and block.clt.redirected_to is None:
+                    blocks[block.compiled_blockid] = block
             self.reloop_state = []
             self.emit_relooped_blocks(bldr, entries, blocks)
             self.reloop_state = None
@@ -353,12 +540,28 @@ class CompiledFuncASMJS(object):
 
         # Compile the replacement source code for our function.
         jssrc = bldr.finish()
+        self.generate_ms += (time.time() - start) * 1000
+        self.source_bytes = len(jssrc)
+        self.num_reassemblies += 1
         #os.write(2, "=-=-=-= COMPILED\n")
         #os.write(2, jssrc)
         #os.write(2, "\n=-=-=-=-=-=-=-=-\n")
         #os.write(2, "ASSEMBLER COMPILE START %f\n" % (time.time(),))
         support.jitRecompile(self.compiled_funcid, jssrc)
         #os.write(2, "ASSEMBLER COMPILE END %f\n" % (time.time(),))
+        self._log_stats()
+
+    def _log_stats(self):
+        debug_start("jit-backend-asmjs-func")
+        # Don't call out to the host for the compile time unless logging.
+        if have_debug_prints():
+            debug_print("func %d: %d bytes, %d blocks, %d reassemblies, "
+                        "%d merges, %f ms generating, %f ms compiling" % (
+                            self.compiled_funcid, self.source_bytes,
+                            self.get_num_blocks(), self.num_reassemblies,
+                            self.num_merges, self.generate_ms,
+                            self.get_compile_ms()))
+        debug_stop("jit-backend-asmjs-func")
 
     def emit_relooped_blocks(self, bldr, entries, blocks):
         if not entries:
@@ -521,14 +724,18 @@ class CompiledFuncASMJS(object):
         return False
 
     def _block_successors(self, block):
+        # Jumps into other functions leave the relooped code entirely,
+        # so they don't count as successors for our purposes.
         outtoken = block.outtoken
         if outtoken is not None:
             assert isinstance(outtoken, TargetToken)
-            if outtoken._asmjs_block is not None:
-                yield outtoken._asmjs_block
+            succ = outtoken._asmjs_block
+            if succ is not None and succ.func is self:
+                yield succ
         for guardtoken in block.guardtokens:
-            if guardtoken._asmjs_block is not None:
-                yield guardtoken._asmjs_block
+            succ = guardtoken._asmjs_block
+            if succ is not None and succ.func is self:
+                yield succ
 
 
 class CompiledLoopTokenASMJS(CompiledLoopToken):
@@ -544,6 +751,8 @@ class CompiledLoopTokenASMJS(CompiledLoopToken):
         func.compiled_loops.append(self)
         self.redirected_to = None
         self.compiled_blocks = []
+        self.bridge_func = None
+        self.bridge_funcs = []
         self.inlined_gcrefs = []
         invalidationptr = lltype.malloc(INVALIDATION, flavor="raw")
         self.invalidation = rffi.cast(INVALIDATION_PTR, invalidationptr)
@@ -553,7 +762,38 @@ class CompiledLoopTokenASMJS(CompiledLoopToken):
         CompiledLoopToken.__del__(self)
         lltype.free(self.invalidation, flavor="raw")
 
-    def add_code_to_loop(self, operations, inputargs, intoken=None):
+    def is_ready(self):
+        """Check whether the latest code for this loop has been compiled.
+
+        With asynchronous compilation enabled on the host, the loop is not
+        ready until the host event loop gets around to compiling it.  Until
+        then the metainterp doesn't enter it, but keeps interpreting.
+        """
+        return support.jitIsReady(self.func.compiled_funcid) != 0
+
+    def get_bridge_func(self):
+        """Get a separate function into which to compile new bridges.
+
+        This is used when the function containing the failing guard is
+        already full.  Bridges from a single loop accumulate into a shared
+        bridge function until it too becomes full, then we start another.
+        """
+        func = self.bridge_func
+        if func is None or func.is_full():
+            func = CompiledFuncASMJS(self.assembler, is_bridge_func=True)
+            self.bridge_func = func
+            self.bridge_funcs.append(func)
+        return func
+
+    def add_code_to_loop(self, operations, inputargs, intoken=None,
+                         func=None):
+        """Add the given operations as new blocks in the given function.
+
+        The func defaults to the one containing this loop.  Returns the
+        first of the newly-created blocks.
+        """
+        if func is None:
+            func = self.func
         # Re-write to use lower-level GC operations,
         # and record any inlined GC refs to the CLT.
         gcrefs = self.inlined_gcrefs
@@ -580,12 +820,12 @@ class CompiledLoopTokenASMJS(CompiledLoopToken):
                 # NB: if the first op is a label, this makes an empty block.
                 # That's OK for now; it might do some arg shuffling etc.
                 new_block = CompiledBlockASMJS(
-                    self, len(self.func.compiled_blocks),
+                    self, func, len(func.compiled_blocks),
                     operations[start_op:i], intoken, inputargs,
                     guardtokens, labeldescr, op.getarglist(),
                 )
                 self.compiled_blocks.append(new_block)
-                self.func.compiled_blocks.append(new_block)
+                func.compiled_blocks.append(new_block)
                 # Start a new block from this label.
                 start_op = i
                 intoken = labeldescr
@@ -600,14 +840,15 @@ class CompiledLoopTokenASMJS(CompiledLoopToken):
                 outtoken = None
                 outputargs = []
             new_block = CompiledBlockASMJS(
-                self, len(self.func.compiled_blocks), operations[start_op:],
+                self, func, len(func.compiled_blocks), operations[start_op:],
                 intoken, inputargs, guardtokens, outtoken, outputargs
             )
             self.compiled_blocks.append(new_block)
-            self.func.compiled_blocks.append(new_block)
+            func.compiled_blocks.append(new_block)
         # Generate the new code.
         for i in xrange(first_new_block, len(self.compiled_blocks)):
             self.compiled_blocks[i].generate_code()
+        return self.compiled_blocks[first_new_block]
 
     def invalidate_loop(self):
         self.invalidation.counter += 1
@@ -619,10 +860,7 @@ class CompiledLoopTokenASMJS(CompiledLoopToken):
         #    self.func.compiled_blocks[block.compiled_blockid] = None
 
     def emit_store_initial_gcmap(self, bldr):
-        gcmap = self.compiled_blocks[0].initial_gcmap
-        gcmapref = js.ConstInt(self.cpu.cast_ptr_to_int(gcmap))
-        gcmapaddr = js.FrameGCMapAddr()
-        bldr.emit_store(gcmapref, gcmapaddr, js.Int32)
+        self.compiled_blocks[0].emit_store_initial_gcmap(bldr)
 
     def emit_load_arguments(self, bldr):
         block = self.compiled_blocks[0]
@@ -639,11 +877,13 @@ class CompiledLoopTokenASMJS(CompiledLoopToken):
 
 class CompiledBlockASMJS(object):
 
-    def __init__(self, clt, compiled_blockid, operations,
+    def __init__(self, clt, func, compiled_blockid, operations,
                  intoken, inputargs, guardtokens, outtoken, outputargs):
         self.clt = clt
+        self.func = func
         self.cpu = clt.cpu
         self.compiled_blockid = compiled_blockid
+        self.entryid = -1
         self.intoken = intoken
         self.guardtokens = guardtokens
         self.outtoken = outtoken
@@ -656,6 +896,19 @@ class CompiledBlockASMJS(object):
             elif isinstance(intoken, TargetToken):
                 intoken._asmjs_block = self
 
+        # Tell our guards about their owning block, and allocate a record
+        # for each to hold its exit info and any separately-compiled bridge.
+        for i in xrange(len(guardtokens)):
+            guardtokens[i]._asmjs_owner = self
+        if len(guardtokens) == 0:
+            self.guard_records = lltype.nullptr(GUARDRECORDS)
+        else:
+            num_words = GUARDRECORD_WORDS * len(guardtokens)
+            self.guard_records = lltype.malloc(GUARDRECORDS, num_words,
+                                               flavor="raw")
+            for i in xrange(num_words):
+                self.guard_records[i] = 0
+
         # Remember value of invalidation counter when this block was created.
         # If it goes above this value, then GUARD_NOT_INVALIDATED fails.
         self.initial_invalidation_counter = clt.invalidation.counter
@@ -664,8 +917,18 @@ class CompiledBlockASMJS(object):
         # on the frame.  In the process, count how many variables of
         # each type we will need when loading them.  Also track which
         # are refs so that we can build a gcmap.
+        # A bridge finds its input args wherever the guard spilled them,
+        # so that it can be entered directly when compiled separately.
         self.inputlocs = [-1] * len(inputargs)
         self.inputkinds = [HOLE] * len(inputargs)
+        faillocs = None
+        if isinstance(intoken, AbstractFailDescr):
+            faillocs = []
+            for loc in intoken._asmjs_faillocs:
+                if loc >= 0:
+                    faillocs.append(loc)
+            if SANITYCHECK:
+                assert len(faillocs) == len(inputargs)
         reflocs = []
         offset = 0
         baseofs = self.cpu.get_baseofs_of_frame_field()
@@ -673,16 +936,22 @@ class CompiledBlockASMJS(object):
         for i in xrange(len(inputargs)):
             box = inputargs[i]
             typ = js.HeapType.from_box(box)
-            alignment = offset % typ.size
-            if alignment:
-                offset += typ.size - alignment
-            self.inputlocs[i] = offset
+            if faillocs is not None:
+                loc = faillocs[i]
+            else:
+                loc = offset
+                alignment = loc % typ.size
+                if alignment:
+                    loc += typ.size - alignment
+            self.inputlocs[i] = loc
             if box:
                 self.inputkinds[i] = box.type
                 if box.type == REF:
-                    reflocs.append(offset)
-            offset += typ.size
-        self.clt.func.ensure_frame_depth(offset)
+                    reflocs.append(loc)
+            if loc + typ.size > offset:
+                offset = loc + typ.size
+        self.inputsize = offset
+        self.func.ensure_frame_depth(offset)
 
         # Calculate a gcmap corresponding to the initial layout of the frame.
         # This will be needed if we ever need to enlarge the frame.
@@ -728,10 +997,48 @@ class CompiledBlockASMJS(object):
         self.box_expressions = {}
         self.box_expression_graveyard = {}
         self.box_variable_refcounts = {}
+        self.jump_arg_positions = self._get_jump_arg_positions(operations[-1])
 
     def free(self):
         for gcmap in self.allocated_gcmaps:
             lltype.free(gcmap, flavor="raw")
+        if self.guard_records:
+            lltype.free(self.guard_records, flavor="raw")
+            self.guard_records = lltype.nullptr(GUARDRECORDS)
+
+    def get_entry_label(self):
+        """Get the label with which to enter this block from elsewhere."""
+        if SANITYCHECK:
+            assert self.entryid >= 0
+        return js.ConstInt(-1 - self.entryid)
+
+    def _get_guard_record_index(self, faildescr):
+        for i in xrange(len(self.guardtokens)):
+            if self.guardtokens[i] is faildescr:
+                return GUARDRECORD_WORDS * i
+        raise AssertionError("guard does not belong to this block")
+
+    def _get_guard_record_addr(self, faildescr):
+        idx = self._get_guard_record_index(faildescr)
+        return rffi.cast(lltype.Signed, self.guard_records) + (idx * WORD)
+
+    def _set_guard_record_exit(self, faildescr):
+        """Record the faildescr and gcmap to write when the guard fails."""
+        idx = self._get_guard_record_index(faildescr)
+        descr = rffi.cast(lltype.Signed, cast_instance_to_gcref(faildescr))
+        gcmap = self.cpu.cast_ptr_to_int(faildescr._asmjs_gcmap)
+        self.guard_records[idx + 2] = descr
+        self.guard_records[idx + 3] = gcmap
+
+    def set_bridge_slot(self, faildescr, bridge_block):
+        """Link one of our guards to a bridge in some other function."""
+        idx = self._get_guard_record_index(faildescr)
+        self.guard_records[idx] = bridge_block.func.compiled_funcid
+        self.guard_records[idx + 1] = -1 - bridge_block.entryid
+
+    def emit_store_initial_gcmap(self, bldr):
+        gcmapref = js.ConstInt(self.cpu.cast_ptr_to_int(self.initial_gcmap))
+        bldr.emit_store(gcmapref, js.FrameGCMapAddr(), js.Int32)
 
     def allocate_gcmap(self, offset):
         length = offset // WORD
@@ -795,11 +1102,30 @@ class CompiledBlockASMJS(object):
         bldr.emit_fragment(self.compiled_fragments[-1])
 
     def emit_jump_body(self, bldr, descr):
-        assert descr._asmjs_block.clt.func is self.clt.func
-        self.clt.func.emit_jump(bldr, descr._asmjs_block.compiled_blockid)
+        target_block = descr._asmjs_block
+        if target_block.func is self.func:
+            self.func.emit_jump(bldr, target_block.compiled_blockid)
+        else:
+            # The target is in some other function.  Pass the arguments
+            # via the frame and ask jitInvoke to transfer control there.
+            bldr.emit_comment("JUMP TO OTHER FUNCTION")
+            inputkinds = target_block.inputkinds
+            inputvars = self._get_inputvars_from_kinds(inputkinds, bldr)
+            for i in xrange(len(inputkinds)):
+                kind = inputkinds[i]
+                if kind == HOLE:
+                    continue
+                typ = js.HeapType.from_kind(kind)
+                addr = js.FrameSlotAddr(target_block.inputlocs[i])
+                bldr.emit_store(inputvars[i], addr, typ)
+            funcid = js.ConstInt(target_block.func.compiled_funcid)
+            self._emit_trampoline(bldr, funcid, target_block.get_entry_label())
+
+    def _emit_trampoline(self, bldr, funcid, label):
+        bldr.emit_expr(js.CallFunc("jitTrampoline", [funcid, label]))
+        bldr.emit_exit()
 
     def emit_guard_body(self, bldr, faildescr):
-        faillocs = faildescr._asmjs_faillocs
         failkinds = faildescr._asmjs_failkinds
         failvars = [None] * len(faildescr._asmjs_failvars)
         inputvars = self._get_inputvars_from_kinds(failkinds, bldr)
@@ -819,74 +1145,109 @@ class CompiledBlockASMJS(object):
         # If the guard has been compiled into a bridge, emit a local
         # jump to the appropriate label.  Otherwise, spill to frame.
         target_block = faildescr._asmjs_block
-        if target_block is not None:
+        if target_block is not None and target_block.func is self.func:
             # XXX TODO: we know that the guard code will just be inserted
             # inline here.  There's no need for a jump, and we can have it
             # read directly from the failvars rather than inputvars.
             bldr.emit_comment("JUMP TO BRIDGED GUARD")
             self._emit_swap_vars(bldr, failvars, inputvars, failkinds)
-            self.clt.func.emit_jump(bldr, target_block.compiled_blockid)
+            self.func.emit_jump(bldr, target_block.compiled_blockid)
+        elif target_block is not None:
+            # The bridge was compiled into a separate function.
+            # It reads its input args from where the guard spills them.
+            bldr.emit_comment("JUMP TO SEPARATELY BRIDGED GUARD")
+            self._emit_call_guard_exit(bldr, faildescr, failvars, inputvars)
+            funcid = js.ConstInt(target_block.func.compiled_funcid)
+            self._emit_trampoline(bldr, funcid, target_block.get_entry_label())
         else:
-            # If there might be an exception, capture it to the frame.
-            if faildescr._asmjs_hasexc:
-                bldr.emit_comment("PRESERVE EXCEPTION INFO")
-                pos_exctyp = js.ConstInt(self.cpu.pos_exception())
-                pos_excval = js.ConstInt(self.cpu.pos_exc_value())
-                exctyp = js.HeapData(js.Int32, pos_exctyp)
-                excval = js.HeapData(js.Int32, pos_excval)
-                with bldr.emit_if_block(exctyp):
-                    addr = js.FrameGuardExcAddr()
-                    bldr.emit_store(excval, addr, js.Int32)
-                    bldr.emit_store(js.zero, pos_exctyp, js.Int32)
-                    bldr.emit_store(js.zero, pos_excval, js.Int32)
-            # Call guard failure helper, creating code for it if necessary.
-            # The code is uniquely identified by failkinds.
-            # XXX TODO: this whole "helper func" thing needs a good refactor.
-            # XXX TODO: currently, helper funcs will never be freed.
-            helper_argtypes = ["i", "i"]
-            helper_args = [
-                js.ConstPtr(cast_instance_to_gcref(faildescr)),
-                js.ConstInt(self.cpu.cast_ptr_to_int(faildescr._asmjs_gcmap))
-            ]
-            for i in xrange(len(failkinds)):
-                # XXX TODO: are we sure that faillocs[i] is a deterministic
-                # function of the failkinds list?
-                kind = failkinds[i]
-                if kind == HOLE:
-                    continue
-                helper_args.append(failvars[i])
-                if kind == FLOAT:
-                    helper_argtypes.append("d")
-                else:
-                    helper_argtypes.append("i")
-            helper_name = "guard_failure_" + "".join(helper_argtypes)
-            if not bldr.has_helper_func(helper_name):
-                with bldr.make_helper_func(helper_name, helper_argtypes) as hb:
-                    # Store the failargs into the frame.
-                    hb.emit_comment("SPILL %d FAILARGS" % (len(faillocs),))
-                    for i in xrange(len(failkinds)):
-                        kind = failkinds[i]
-                        if kind == HOLE:
-                            continue
-                        typ = js.HeapType.from_kind(kind)
-                        myvar = inputvars[i]
-                        assert isinstance(myvar, js.Variable)
-                        if kind == FLOAT:
-                            var = myvar
-                        else:
-                            # +2 for descr and gcmap input args
-                            var = hb.allocate_intvar(int(myvar.varname[1:])+2)
-                        pos = faillocs[i]
-                        hb.emit_store(var, js.FrameSlotAddr(pos), typ)
-                    # Write the gcmap from second input arg.
-                    self.emit_store_gcmapref(hb, hb.allocate_intvar(1))
-                    # Write the faildescr from first input arg.
-                    hb.emit_comment("STORE FAILDESCR")
-                    descr_var = hb.allocate_intvar(0)
-                    hb.emit_store(descr_var, js.FrameDescrAddr(), js.Int32)
-            bldr.emit_call_helper_func(helper_name, helper_args)
+            # If this function is full, any bridge for the guard will be
+            # compiled separately and linked in via its guard record.
+            record = js.ConstInt(self._get_guard_record_addr(faildescr))
+            if self.func.is_full():
+                bldr.emit_comment("CHECK FOR SEPARATELY BRIDGED GUARD")
+                funcid = js.HeapData(js.Int32, record)
+                with bldr.emit_if_block(funcid):
+                    self._emit_call_guard_exit(bldr, faildescr,
+                                               failvars, inputvars)
+                    label = js.HeapData(js.Int32, js.Plus(record, js.word))
+                    self._emit_trampoline(bldr, funcid, label)
             # Bail back to the interpreter to deal with the failure.
-            bldr.emit_exit()
+            # The shared stub does all the work, including preserving
+            # any pending exception, so this is a single statement.
+            self._emit_call_guard_exit(bldr, faildescr, failvars, inputvars,
+                                       faildescr._asmjs_hasexc, True)
+
+    def _emit_call_guard_exit(self, bldr, faildescr, failvars, inputvars,
+                              hasexc=False, tailcall=False):
+        """Call the shared guard-exit stub for the guard's fail-arg layout.
+
+        The stub spills the failargs into the frame and writes the faildescr
+        and gcmap from the guard's record, which is all the generated code
+        for each individual guard has to pass it apart from the failargs.
+        If `tailcall` is true then the current function returns the result
+        of the stub, leaving the guard to the interpreter.
+        """
+        faillocs = faildescr._asmjs_faillocs
+        failkinds = faildescr._asmjs_failkinds
+        record = self._get_guard_record_addr(faildescr)
+        # Call the stub, creating code for it if necessary.
+        # XXX TODO: currently, helper funcs will never be freed.
+        stub_argtypes = ["i"]
+        stub_args = [js.ConstInt(record)]
+        for i in xrange(len(failkinds)):
+            kind = failkinds[i]
+            if kind == HOLE:
+                continue
+            stub_args.append(failvars[i])
+            if kind == FLOAT:
+                stub_argtypes.append("d")
+            else:
+                stub_argtypes.append("i")
+        assembler = self.clt.assembler
+        stub_name = assembler.get_guard_exit_name(failkinds, faillocs, hasexc)
+        if not bldr.has_helper_func(stub_name):
+            with bldr.make_helper_func(stub_name, stub_argtypes) as hb:
+                # If there might be an exception, capture it to the frame.
+                if hasexc:
+                    hb.emit_comment("PRESERVE EXCEPTION INFO")
+                    pos_exctyp = js.ConstInt(self.cpu.pos_exception())
+                    pos_excval = js.ConstInt(self.cpu.pos_exc_value())
+                    exctyp = js.HeapData(js.Int32, pos_exctyp)
+                    excval = js.HeapData(js.Int32, pos_excval)
+                    with hb.emit_if_block(exctyp):
+                        addr = js.FrameGuardExcAddr()
+                        hb.emit_store(excval, addr, js.Int32)
+                        hb.emit_store(js.zero, pos_exctyp, js.Int32)
+                        hb.emit_store(js.zero, pos_excval, js.Int32)
+                # Store the failargs into the frame.
+                hb.emit_comment("SPILL %d FAILARGS" % (len(faillocs),))
+                for i in xrange(len(failkinds)):
+                    kind = failkinds[i]
+                    if kind == HOLE:
+                        continue
+                    typ = js.HeapType.from_kind(kind)
+                    myvar = inputvars[i]
+                    assert isinstance(myvar, js.Variable)
+                    if kind == FLOAT:
+                        var = myvar
+                    else:
+                        # +1 for the guard record input arg
+                        var = hb.allocate_intvar(int(myvar.varname[1:])+1)
+                    pos = faillocs[i]
+                    hb.emit_store(var, js.FrameSlotAddr(pos), typ)
+                # Write the gcmap and faildescr from the guard record.
+                record_var = hb.allocate_intvar(0)
+                offset = js.ConstInt(GUARDRECORD_GCMAP)
+                gcmap = js.HeapData(js.Int32, js.Plus(record_var, offset))
+                self.emit_store_gcmapref(hb, gcmap)
+                hb.emit_comment("STORE FAILDESCR")
+                offset = js.ConstInt(GUARDRECORD_DESCR)
+                descr = js.HeapData(js.Int32, js.Plus(record_var, offset))
+                hb.emit_store(descr, js.FrameDescrAddr(), js.Int32)
+        if tailcall:
+            bldr.emit_return_helper_func(stub_name, stub_args)
+        else:
+            bldr.emit_call_helper_func(stub_name, stub_args)
 
     def emit_store_gcmap(self, bldr, gcmap, writebarrier=True):
         # Store the appropriate gcmap on the frame.
@@ -1013,8 +1374,8 @@ class CompiledBlockASMJS(object):
                 offset += typ.size - alignment
             locations[i] = offset
             offset += typ.size
-        if self.clt is not None:
-            self.clt.func.ensure_frame_depth(offset)
+        if self.func is not None:
+            self.func.ensure_frame_depth(offset)
         return locations
 
     def _get_inputvars_from_kinds(self, kinds, bldr=None):
@@ -1096,7 +1457,9 @@ class CompiledBlockASMJS(object):
                      self._suspend_box_expression(op.result, expr)
                      self.bldr.emit_comment("SUSPENDED JIT EXPR OP")
                 else:
-                    boxvar = self._allocate_box_variable(op.result)
+                    boxvar = self._get_reusable_variable(op.result, expr,
+                                                         op.getarglist())
+                    boxvar = self._allocate_box_variable(op.result, boxvar)
                     self.bldr.emit_assignment(boxvar, expr)
             # Free vars for boxes that are no longer needed.
             self.pos += step
@@ -1123,6 +1486,7 @@ class CompiledBlockASMJS(object):
         self.box_expressions = None
         self.box_expression_graveyard = None
         self.box_variable_refcounts = None
+        self.jump_arg_positions = None
 
     #
     # Methods for dealing with boxes and their values.
@@ -1189,14 +1553,85 @@ class CompiledBlockASMJS(object):
         if boxvar is not None:
             self.box_variable_refcounts[boxvar] += 1
         else:
+            # Boxes passed to the final JUMP go straight into the variable
+            # for their position if it's free, so the jump needn't copy them.
+            num = self.jump_arg_positions.get(box, -1)
             if box.type == FLOAT:
-                boxvar = self.bldr.allocate_doublevar()
+                if num >= 0 and self.bldr.has_free_doublevar(num):
+                    boxvar = self.bldr.allocate_doublevar(num)
+                else:
+                    boxvar = self.bldr.allocate_doublevar()
             else:
-                boxvar = self.bldr.allocate_intvar()
+                if num >= 0 and self.bldr.has_free_intvar(num):
+                    boxvar = self.bldr.allocate_intvar(num)
+                else:
+                    boxvar = self.bldr.allocate_intvar()
             self.box_variable_refcounts[boxvar] = 1
         self.box_variables[box] = boxvar
         return boxvar
 
+    def _get_jump_arg_positions(self, op):
+        """Map boxes passed to a final JUMP to their input variable numbers.
+
+        The target block receives its input args in variables numbered by
+        position and kind, as allocated by _get_inputvars_from_kinds.  If we
+        compute a box directly into that variable, then its value is carried
+        into the target block without any copying at the jump.
+        """
+        positions = {}
+        if op.getopnum() != rop.JUMP:
+            return positions
+        num_int_args = 0
+        num_double_args = 0
+        for i in xrange(op.numargs()):
+            box = op.getarg(i)
+            if not box:
+                continue
+            if box.type == FLOAT:
+                num = num_double_args
+                num_double_args += 1
+            else:
+                num = num_int_args
+                num_int_args += 1
+            if isinstance(box, Box) and box not in positions:
+                positions[box] = num
+        return positions
+
+    def _get_reusable_variable(self, box, expr, args=None):
+        """Find a variable used by expr that box can take over in place.
+
+        An expression is assigned to its box in a single statement, so the
+        box may overwrite a variable read by it if nothing else needs that
+        variable afterwards.  This lets loop-carried values such as
+        "i1 = int_add(i0, 1)" update the variable in which the final JUMP
+        passes them.  If args is given, expr is a newly-generated op whose
+        args each hold their own reference to their variable; otherwise it
+        is a suspended expression holding references to all its variables.
+        """
+        num = self.jump_arg_positions.get(box, -1)
+        if num < 0:
+            return None
+        if box.type == FLOAT:
+            wantvar = self.bldr.all_doublevars.get(num, None)
+        else:
+            wantvar = self.bldr.all_intvars.get(num, None)
+        if wantvar is None:
+            return None
+        if self.box_variable_refcounts.get(wantvar, 0) != 1:
+            return None
+        for var in js.iter_variables(expr):
+            if var is wantvar:
+                break
+        else:
+            return None
+        if args is None:
+            return wantvar
+        for arg in args:
+            if self.box_variables.get(arg, None) is wantvar:
+                if self._is_final_use(arg, self.pos):
+                    return wantvar
+        return None
+
     def _genop_flush_box(self, box):
         if not isinstance(box, Box):
             return self._get_jsval(box)
@@ -1208,7 +1643,8 @@ class CompiledBlockASMJS(object):
                 self._allocate_box_variable(box, boxexpr)
             else:
                 self.bldr.emit_comment("FLUSH SUSPENDED BOX")
-                boxvar = self._allocate_box_variable(box)
+                boxvar = self._get_reusable_variable(box, boxexpr)
+                boxvar = self._allocate_box_variable(box, boxvar)
                 self.bldr.emit_assignment(boxvar, boxexpr)
         return boxvar
 
@@ -1323,8 +1759,8 @@ class CompiledBlockASMJS(object):
                 offset += typ.size - alignment
             locations[i] = offset
             offset += typ.size
-        if self.clt is not None:
-            self.clt.func.ensure_frame_depth(offset)
+        if self.func is not None:
+            self.func.ensure_frame_depth(offset)
         return locations
 
     def _genop_spill_to_frame(self, box, offset=-1):
@@ -2048,7 +2484,7 @@ class CompiledBlockASMJS(object):
         # XXX TODO: Probably this is all sorts of technically incorrect.
         # It needs to write into the heap, so we use the frame as scratch.
         os.write(2, "WARNING: genop_read_timestamp probably doesn't work\n")
-        self.clt.func.ensure_frame_depth(2*WORD)
+        self.func.ensure_frame_depth(2*WORD)
         addr = js.FrameSlotAddr(0)
         self.bldr.emit_expr(js.CallFunc("gettimeofday", [addr]))
         secs = js.HeapData(js.Int32, addr)
@@ -2367,6 +2803,7 @@ class CompiledBlockASMJS(object):
         descr._asmjs_failvars = [None] * len(faillocs)
         descr._asmjs_hasexc = self._guard_might_have_exception(op)
         descr._asmjs_gcmap = gcmap
+        self._set_guard_record_exit(descr)
         return descr
 
     def _guard_might_have_exception(self, op):
@@ -2627,7 +3064,7 @@ class ctx_spill_to_frame(object):
     def __exit__(self, exc_typ, exc_val, exc_tb):
         # Pop any items that were pushed in this context.
         orig_offset = self.orig_spilled_frame_offset
-        self.block.clt.func.ensure_frame_depth(self.block.spilled_frame_offset)
+        self.block.func.ensure_frame_depth(self.block.spilled_frame_offset)
         for pos, box in self.block.spilled_frame_values.items():
             if pos >= orig_offset:
                 del self.block.spilled_frame_values[pos]
@@ -0,0 +1,97 @@
+"""Count heap loads and stores made by jitted asmjs code per loop iteration.
+
+This runs a few small jitted loops untranslated, using the asmjs backend and
+the asmjs-to-python simulation of the generated code, and reports how many
+HEAP loads and stores the compiled code makes per iteration.  Values kept in
+asmjs local variables don't show up here; anything spilled to or reloaded
+from the jitframe does.
+
+    python heapops.py [N]
+"""
+
+import sys
+
+from rpython.jit.backend.asmjs import support
+from rpython.jit.backend.detect_cpu import getcpuclass
+from rpython.jit.metainterp.warmspot import ll_meta_interp
+from rpython.rlib.jit import JitDriver, dont_look_inside
+
+
+class Node(object):
+    def __init__(self, value, next):
+        self.value = value
+        self.next = next
+
+
+@dont_look_inside
+def visit(node):
+    return node.value & 3
+
+
+def int_loop(n):
+    driver = JitDriver(greens=[], reds=["n", "total"])
+    total = 0
+    while n > 0:
+        driver.jit_merge_point(n=n, total=total)
+        total += n * 3 + (n >> 2)
+        n -= 1
+    return total
+
+
+def ref_loop(n):
+    # Three live refs across several residual calls per iteration.
+    driver = JitDriver(greens=[], reds=["n", "total", "a", "b", "c"])
+    a = Node(1, None)
+    b = Node(2, a)
+    c = Node(3, b)
+    total = 0
+    while n > 0:
+        driver.jit_merge_point(n=n, total=total, a=a, b=b, c=c)
+        total += visit(a)
+        total += visit(b)
+        total += visit(c)
+        a, b, c = b, c, a
+        n -= 1
+    return total
+
+
+CASES = [
+    ("int loop", int_loop),
+    ("ref loop with calls", ref_loop),
+]
+
+
+def measure(func, n):
+    """Return (loads, stores) per iteration of the compiled loop.
+
+    The loop is run twice so that setup and compilation costs cancel out,
+    leaving only the cost of the extra iterations in the second run.
+    """
+    CPU = getcpuclass("asmjs")
+
+    def main(n):
+        return func(n)
+
+    support.reset_heap_access_counts()
+    ll_meta_interp(main, [n], CPUClass=CPU, type_system="lltype")
+    short = dict(support.heap_access_counts)
+    support.reset_heap_access_counts()
+    ll_meta_interp(main, [2 * n], CPUClass=CPU, type_system="lltype")
+    long = dict(support.heap_access_counts)
+    loads = (long["loads"] - short["loads"]) / float(n)
+    stores = (long["stores"] - short["stores"]) / float(n)
+    return loads, stores
+
+
+def main(n):
+    for name, func in CASES:
+        loads, stores = measure(func, n)
+        print "%-24s %8.2f loads/iter %8.2f stores/iter" % (name, loads,
+                                                             stores)
+
+
+if __name__ == "__main__":
+    n = 50
+    if len(sys.argv) > 1:
+        n = int(sys.argv[1])
+    main(n)
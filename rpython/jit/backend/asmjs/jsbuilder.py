@@ -134,6 +134,22 @@ class ASMJSBuilder(object):
                 self.all_doublevars[num] = var
         return var
 
+    def has_free_intvar(self, num):
+        """Check whether the int variable with the given number is unused.
+
+        This is true if it has not been allocated yet, or has been freed.
+        """
+        var = self.all_intvars.get(num, None)
+        return var is None or var in self.free_intvars
+
+    def has_free_doublevar(self, num):
+        """Check whether the double variable with the given number is unused.
+
+        This is true if it has not been allocated yet, or has been freed.
+        """
+        var = self.all_doublevars.get(num, None)
+        return var is None or var in self.free_doublevars
+
     def free_intvar(self, var):
         """Free up the given int variable for future re-use."""
         assert isinstance(var, jsval.IntVar)
@@ -362,6 +378,11 @@ class ASMJSBuilder(object):
             self.emit_value(args[i])
         self.source_chunks.append(")|0;\n")  # alway returns frame
 
+    def emit_return_helper_func(self, name, args):
+        """Emit an immediate return of the frame from a helper func call."""
+        self.source_chunks.append("return ")
+        self.emit_call_helper_func(name, args)
+
 
 class ctx_if_block(object):
 
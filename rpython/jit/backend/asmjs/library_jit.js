@@ -36,6 +36,9 @@ var LibraryJIT = {
       // In theory we could use zero to report compilation failure, but
       // the try-catch may prevent optimization of this function.
       Module._jitCompiledFunctions = [null];
+      Module._jitCompileStats = {"sync": 0, "async": 0, "forced": 0,
+                                 "superseded": 0, "ms": 0.0};
+      Module._jitCompileTimes = {};
     }
     var id = Module._jitCompiledFunctions.length;
     Module._jitCompiledFunctions[id] = null;
@@ -64,7 +67,18 @@ var LibraryJIT = {
   //  The source will be loaded, compiled, and linked with the main Module.
   //  An opaque integer "function id" will be returned, which can be passed
   //  to jitInvoke to invoke the newly-compiled function.
+  //
+  //  If the host sets Module.jitAsyncCompile to a true value, compilation
+  //  is deferred rather than done straight away.  The source is queued and
+  //  the function is marked as pending, then compiled from the host event
+  //  loop once the current task has finished.  Several recompiles of the
+  //  same function before then are collapsed into a single compile of the
+  //  latest source.  The metainterp doesn't enter a loop whose function
+  //  is pending (see jitIsReady), but keeps interpreting.  Only transfers
+  //  from already-running JIT code, which has no interpreter to fall back
+  //  to, compile a pending function on demand.
   //  
+  jitRecompile__deps: ['jitLinkSource', 'jitSchedulePending'],
   jitRecompile: function(id, addr) {
     id = id|0;
     addr = addr|0;
@@ -76,8 +90,32 @@ var LibraryJIT = {
       i++;
     }
     var source = sourceChars.join("");
-    // Compile it into an asmjs linkable function, and link it.
-    var mkfunc = new Function("return (" + source + ")");
+    if (Module.jitAsyncCompile) {
+      if (!Module._jitPendingSources) {
+        Module._jitPendingSources = {};
+      }
+      if (Module._jitPendingSources[id] !== undefined) {
+        Module._jitCompileStats.superseded++;
+      }
+      Module._jitPendingSources[id] = source;
+      _jitSchedulePending();
+      return id;
+    }
+    Module._jitCompiledFunctions[id] = _jitLinkSource(id, source, "sync");
+    return id
+  },
+
+  //  Compile and link the given source, accounting the time it takes
+  //  both in total and against the function with the given id.
+  //
+  //  The `kind` argument says which counter to charge: "sync" for an
+  //  immediate compile, "async" for one done from the event loop, and
+  //  "forced" for a pending compile that was needed before it was done.
+  //
+  jitLinkSource__deps: ['jitLoadModule'],
+  jitLinkSource: function(id, source, kind) {
+    var start = Date.now();
+    var mkfunc = _jitLoadModule(source);
     var stdlib = {
       "Math": Math,
       "Int8Array": Int8Array,
@@ -95,15 +133,262 @@ var LibraryJIT = {
       }
       Module.tempDoublePtr = tempDoublePtr;
     }
-    Module._jitCompiledFunctions[id] = mkfunc()(stdlib, Module, buffer);
-    return id
+    var func = mkfunc()(stdlib, Module, buffer);
+    var ms = Date.now() - start;
+    Module._jitCompileStats[kind]++;
+    Module._jitCompileStats.ms += ms;
+    Module._jitCompileTimes[id] = (Module._jitCompileTimes[id] || 0) + ms;
+    return func;
+  },
+
+  //  Arrange for pending compiles to be done from the host event loop.
+  //
+  //  Each pending function is compiled in a separate task, so that a burst
+  //  of (re)assembly cannot stall the host for longer than the time taken
+  //  to compile a single function.
+  //
+  jitSchedulePending__deps: ['jitCompilePending'],
+  jitSchedulePending: function() {
+    if (Module._jitPendingScheduled) {
+      return;
+    }
+    Module._jitPendingScheduled = true;
+    setTimeout(function() {
+      Module._jitPendingScheduled = false;
+      for (var id in Module._jitPendingSources) {
+        _jitCompilePending(id|0, "async");
+        break;
+      }
+      for (var id in Module._jitPendingSources) {
+        _jitSchedulePending();
+        break;
+      }
+    }, 0);
+  },
+
+  //  Compile the pending source for a function, if there is any,
+  //  and patch it into place.
+  //
+  jitCompilePending__deps: ['jitLinkSource'],
+  jitCompilePending: function(id, kind) {
+    var pending = Module._jitPendingSources;
+    if (!pending || pending[id] === undefined) {
+      return;
+    }
+    var source = pending[id];
+    delete pending[id];
+    Module._jitCompiledFunctions[id] = _jitLinkSource(id, source, kind);
+  },
+
+  //  Check whether a function has compiled code that is up-to-date.
+  //
+  //  This is always true unless asynchronous compilation is enabled and
+  //  the latest source for the function has not yet been compiled.
+  //
+  jitIsReady: function(id) {
+    id = id|0;
+    if (Module._jitPendingSources) {
+      if (Module._jitPendingSources[id] !== undefined) {
+        return 0;
+      }
+    }
+    if (!Module._jitCompiledFunctions[id]) {
+      return 0;
+    }
+    return 1;
+  },
+
+  //  Compile all pending functions immediately.
+  //
+  jitFlushPending__deps: ['jitCompilePending'],
+  jitFlushPending: function() {
+    for (var id in Module._jitPendingSources) {
+      _jitCompilePending(id|0, "forced");
+    }
+  },
+
+  //  Get the total time in milliseconds spent compiling the function
+  //  with the given id, across all the times it has been (re)compiled.
+  //
+  jitCompileTime: function(id) {
+    id = id|0;
+    if (!Module._jitCompileTimes) {
+      return 0.0;
+    }
+    return +(Module._jitCompileTimes[id] || 0);
+  },
+
+  //  Get a counter of JIT compilation activity, selected by the constants
+  //  defined in library_jit.h.  Time spent compiling is in milliseconds.
+  //
+  jitCompileStat: function(which) {
+    which = which|0;
+    var stats = Module._jitCompileStats;
+    if (!stats) {
+      return 0;
+    }
+    switch (which) {
+      case 0: return stats.sync|0;
+      case 1: return stats.async|0;
+      case 2: return stats.forced|0;
+      case 3: return stats.superseded|0;
+      case 4: return stats.ms|0;
+    }
+    return 0;
+  },
+
+  //  Hash a string of asmjs source code into a cache key.
+  //
+  //  This combines two 32-bit FNV-1a style hashes, the second one with a
+  //  different offset basis and an extra xor-shift, with the length of the
+  //  source.  It is only a key: both caches keep the source and compare it
+  //  before reusing an entry, since running code compiled for different
+  //  source (with different embedded heap addresses) would go unnoticed.
+  //
+  jitSourceHash: function(source) {
+    var h1 = 0x811c9dc5;
+    var h2 = 0x050c5d1f;
+    for (var i = 0; i < source.length; i++) {
+      var c = source.charCodeAt(i);
+      h1 ^= c;
+      h1 = Math.imul(h1, 0x01000193);
+      h2 ^= c;
+      h2 = Math.imul(h2, 0x01000193) ^ (h2 >>> 15);
+    }
+    return ((h1 >>> 0).toString(16) + "-" + (h2 >>> 0).toString(16) + "-" +
+            source.length.toString(16));
+  },
+
+  //  Get a factory for the asmjs module defined by the given source.
+  //
+  //  Parsing and compiling the generated source is the most expensive
+  //  part of jitRecompile(), and it's common to generate exactly the same
+  //  source more than once, both within a single run and across runs.
+  //  So we keep an in-memory cache of compiled module factories keyed by
+  //  a hash of the source, and consult an optional persistent store.
+  //
+  //  The in-memory cache holds at most Module.jitModuleCacheSize entries
+  //  (default 256), evicting the least recently used one when full.  Each
+  //  entry keeps its source, and is only reused for identical source.
+  //
+  //  The persistent store may be provided by the host as Module.jitCodeCache,
+  //  an object with the following methods:
+  //
+  //    load(key, source):  return a module factory for the given source,
+  //                        or null if it isn't in the store.
+  //    save(key, source):  compile the given source, record it in the
+  //                        store, and return its module factory, or null
+  //                        if it could not be compiled that way.
+  //
+  //  In a browser this would typically be backed by a pre-loaded snapshot
+  //  of IndexedDB; under node, setting Module.jitCodeCacheDir to the name of
+  //  a directory makes it use jitFileCodeCache(), a stand-in that uses V8's
+  //  code cache to skip compilation of previously-seen source.
+  //
+  jitLoadModule__deps: ['jitSourceHash', 'jitFileCodeCache'],
+  jitLoadModule: function(source) {
+    var cache = Module._jitModuleCache;
+    if (!cache) {
+      cache = Module._jitModuleCache = new Map();
+      Module._jitModuleCacheStats = {"hits": 0, "misses": 0, "evictions": 0};
+    }
+    var key = _jitSourceHash(source);
+    var entry = cache.get(key);
+    if (entry && entry.source === source) {
+      // Move it to the most recently used end of the map.
+      cache.delete(key);
+      cache.set(key, entry);
+      Module._jitModuleCacheStats.hits++;
+      return entry.mkfunc;
+    }
+    Module._jitModuleCacheStats.misses++;
+    var mkfunc = null;
+    var store = Module.jitCodeCache;
+    if (!store && Module.jitCodeCacheDir) {
+      store = Module.jitCodeCache = _jitFileCodeCache(Module.jitCodeCacheDir);
+    }
+    if (store) {
+      mkfunc = store.load(key, source) || store.save(key, source);
+    }
+    if (!mkfunc) {
+      mkfunc = new Function("return (" + source + ")");
+    }
+    if (entry) {
+      // A different source with the same key; replace it.
+      cache.delete(key);
+    }
+    var maxsize = Module.jitModuleCacheSize || 256;
+    while (cache.size >= maxsize) {
+      cache.delete(cache.keys().next().value);
+      Module._jitModuleCacheStats.evictions++;
+    }
+    cache.set(key, {"source": source, "mkfunc": mkfunc});
+    return mkfunc;
+  },
+
+  //  Create a file-backed persistent code cache, for use under node.
+  //
+  //  Each entry is stored as a pair of files in the given directory: the
+  //  source itself, and the V8 code cache data produced when compiling it.
+  //  jitLoadModule() creates one when Module.jitCodeCacheDir is set before
+  //  any code is JIT-compiled.
+  //
+  jitFileCodeCache: function(dirname) {
+    var fs = require("fs");
+    var path = require("path");
+    var vm = require("vm");
+    function compile(source, cachedData) {
+      var script = new vm.Script("(function(){return (" + source + ");})",
+                                 {"cachedData": cachedData});
+      return {"script": script,
+              "mkfunc": script.runInThisContext()};
+    }
+    return {
+      "load": function(key, source) {
+        var srcfile = path.join(dirname, key + ".js");
+        var datafile = path.join(dirname, key + ".cache");
+        try {
+          if (fs.readFileSync(srcfile, "utf8") !== source) {
+            return null;
+          }
+          var res = compile(source, fs.readFileSync(datafile));
+          if (res.script.cachedDataRejected) {
+            return null;
+          }
+          return res.mkfunc;
+        } catch (e) {
+          return null;
+        }
+      },
+      "save": function(key, source) {
+        var res;
+        try {
+          res = compile(source, undefined);
+        } catch (e) {
+          return null;
+        }
+        try {
+          var data = res.script.createCachedData();
+          fs.writeFileSync(path.join(dirname, key + ".cache"), data);
+          fs.writeFileSync(path.join(dirname, key + ".js"), source);
+        } catch (e) {
+          // Failing to persist an entry is not an error.
+        }
+        return res.mkfunc;
+      }
+    };
   },
 
   // Copy a JIT-compiled function to another id.
   //
+  jitCopy__deps: ['jitCompilePending'],
   jitCopy: function(srcId, dstId) {
     srcId = srcId|0;
     dstId = dstId|0;
+    _jitCompilePending(srcId, "forced");
+    if (Module._jitPendingSources) {
+      delete Module._jitPendingSources[dstId];
+    }
     Module._jitCompiledFunctions[dstId] = Module._jitCompiledFunctions[srcId];
   },
 
@@ -116,23 +401,65 @@ var LibraryJIT = {
   // If you pass an id that does not have compiled code associated with it,
   // it will produce a return value of zero.
   //
+  // The metainterp only invokes functions that are ready.  JIT code calling
+  // into another loop may find its function pending though, and since it
+  // can't fall back to the interpreter, the function is compiled first.
+  //
+  // If the invoked function requests a tail-transfer into another function
+  // via jitTrampoline(), that function is invoked in turn with the returned
+  // frame, and so on until one returns without requesting a transfer.
+  // A pending target is compiled first for the same reason.
+  //
+  jitInvoke__deps: ['jitCompilePending'],
   jitInvoke: function(id, frame, tladdr, label) {
     id = id|0;
     label = label|0;
     frame = frame|0;
     tladdr = tladdr|0;
+    if (Module._jitPendingSources) {
+      _jitCompilePending(id, "forced");
+    }
     var func = Module._jitCompiledFunctions[id];
-    if (func) {
-        return func(frame, tladdr, label)|0;
-    } else {
-        return 0|0;
+    while (func) {
+        Module._jitTrampolineId = 0;
+        frame = func(frame, tladdr, label)|0;
+        id = Module._jitTrampolineId|0;
+        if (!id) {
+            return frame|0;
+        }
+        label = Module._jitTrampolineLabel|0;
+        if (Module._jitPendingSources) {
+          _jitCompilePending(id, "forced");
+        }
+        func = Module._jitCompiledFunctions[id];
     }
+    return 0|0;
+  },
+
+  // Request a tail-transfer into another JIT-compiled function.
+  //
+  // This is called by JIT-compiled code just before returning, to ask the
+  // enclosing jitInvoke() to continue execution in the function with the
+  // given id, using the given label.  It lets code in one function jump
+  // into another without growing the javascript stack.
+  //
+  jitTrampoline: function(id, label) {
+    id = id|0;
+    label = label|0;
+    Module._jitTrampolineId = id;
+    Module._jitTrampolineLabel = label;
   },
 
   // Free a JIT-compiled function.
   //
   jitFree: function(id) {
     id = id|0;
+    if (Module._jitPendingSources) {
+      delete Module._jitPendingSources[id];
+    }
+    if (Module._jitCompileTimes) {
+      delete Module._jitCompileTimes[id];
+    }
     Module._jitCompiledFunctions[id] = null;
   }
 }
@@ -1,5 +1,6 @@
 
 from rpython.rlib.unroll import unrolling_iterable
+from rpython.rlib.jit_hooks import FUNC_STATS_CONTAINER
 from rpython.rtyper.lltypesystem import lltype, llmemory, rffi
 from rpython.rtyper.lltypesystem.lloperation import llop
 from rpython.rtyper.llinterp import LLInterpreter
@@ -125,6 +126,29 @@ class CPU_ASMJS(AbstractLLCPU):
         return self.assembler.assemble_bridge(faildescr, inputargs, operations,
                                               original_loop_token, log=log)
 
+    def is_loop_ready(self, looptoken):
+        clt = looptoken.compiled_loop_token
+        assert isinstance(clt, CompiledLoopTokenASMJS)
+        return clt.is_ready()
+
+    def get_compile_stat(self, which):
+        """Get one of the JIT_STAT_* counters of host compilation activity."""
+        return support.jitCompileStat(which)
+
+    def get_all_func_stats(self):
+        funcs = self.assembler.get_all_funcs()
+        l = lltype.malloc(FUNC_STATS_CONTAINER, len(funcs))
+        for i in range(len(funcs)):
+            func = funcs[i]
+            l[i].funcid = func.compiled_funcid
+            l[i].source_bytes = func.source_bytes
+            l[i].num_blocks = func.get_num_blocks()
+            l[i].num_reassemblies = func.num_reassemblies
+            l[i].num_merges = func.num_merges
+            l[i].generate_ms = func.generate_ms
+            l[i].compile_ms = func.get_compile_ms()
+        return l
+
     def free_loop_and_bridges(self, compiled_loop_token):
         AbstractLLCPU.free_loop_and_bridges(self, compiled_loop_token)
         self.assembler.free_loop_and_bridges(compiled_loop_token)
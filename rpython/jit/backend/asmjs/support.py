@@ -15,15 +15,21 @@ can be tested.  It is very slow and depends on the generated asmjs code being
 
 import sys
 import math
+import time
 import ctypes
 import struct
 import subprocess
 import contextlib
+from collections import OrderedDict
+from hashlib import md5
+
+import py
 
 from rpython.rlib.parsing.tree import RPythonVisitor
 from rpython.rlib.parsing.ebnfparse import parse_ebnf, make_parse_function
 from rpython.rtyper.lltypesystem import lltype, rffi, ll2ctypes
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
+from rpython.tool.gcc_cache import try_atomic_write
 
 # First, we have the definitions of the javascript JIT helper functions.
 # These have a native javascript implementation when translated; when
@@ -51,6 +57,22 @@ def jsexternal(args, result, **kwds):
 _jitCompiledFunctions = { 0: None }
 _jitNextFuncId = 1
 
+# Stand-in for Module.jitAsyncCompile.  When set, jitRecompile() only queues
+# the new source, which is compiled by jitFlushPending() (standing in for the
+# host event loop) or on demand when the function is next invoked.
+jitAsyncCompile = False
+_jitPendingSources = {}
+
+# Indices for jitCompileStat(), matching those in library_jit.h.
+JIT_STAT_SYNC_COMPILES = 0
+JIT_STAT_ASYNC_COMPILES = 1
+JIT_STAT_FORCED_COMPILES = 2
+JIT_STAT_SUPERSEDED_COMPILES = 3
+JIT_STAT_COMPILE_MS = 4
+
+_jitCompileStats = [0, 0, 0, 0, 0.0]
+_jitCompileTimes = {}
+
 
 @jsexternal([rffi.CCHARP], rffi.INT)
 def jitCompile(jssource):
@@ -78,27 +100,95 @@ def jitExists(funcid):
 @jsexternal([rffi.INT, rffi.CCHARP], lltype.Void)
 def jitRecompile(funcid, jssource):
     jssource_str = "".join(jssource)[:-1]
+    if jitAsyncCompile:
+        if funcid in _jitPendingSources:
+            _jitCompileStats[JIT_STAT_SUPERSEDED_COMPILES] += 1
+        _jitPendingSources[funcid] = jssource_str
+        return
+    _jitLinkSource(funcid, jssource_str, JIT_STAT_SYNC_COMPILES)
+
+
+def _jitLinkSource(funcid, jssource_str, which):
+    start = time.time()
     _jitCompiledFunctions[funcid] = load_asmjs(jssource_str)
+    ms = (time.time() - start) * 1000
+    _jitCompileStats[which] += 1
+    _jitCompileStats[JIT_STAT_COMPILE_MS] += ms
+    _jitCompileTimes[funcid] = _jitCompileTimes.get(funcid, 0.0) + ms
+
+
+def _jitCompilePending(funcid, which):
+    jssource_str = _jitPendingSources.pop(funcid, None)
+    if jssource_str is not None:
+        _jitLinkSource(funcid, jssource_str, which)
+
+
+@jsexternal([rffi.INT], rffi.INT)
+def jitIsReady(funcid):
+    if funcid in _jitPendingSources:
+        return 0
+    return jitExists(funcid)
+
+
+@jsexternal([], lltype.Void)
+def jitFlushPending():
+    for funcid in sorted(_jitPendingSources):
+        _jitCompilePending(funcid, JIT_STAT_FORCED_COMPILES)
+
+
+def run_pending_compiles():
+    """Compile all pending functions, as the host event loop would."""
+    for funcid in sorted(_jitPendingSources):
+        _jitCompilePending(funcid, JIT_STAT_ASYNC_COMPILES)
+
+
+@jsexternal([rffi.INT], rffi.DOUBLE)
+def jitCompileTime(funcid):
+    return _jitCompileTimes.get(funcid, 0.0)
+
+
+@jsexternal([rffi.INT], rffi.INT)
+def jitCompileStat(which):
+    return int(_jitCompileStats[which])
 
 
 @jsexternal([rffi.INT, rffi.INT], lltype.Void)
 def jitCopy(srcId, dstId):
+    _jitCompilePending(srcId, JIT_STAT_FORCED_COMPILES)
+    _jitPendingSources.pop(dstId, None)
     _jitCompiledFunctions[dstId] = _jitCompiledFunctions[srcId]
 
 
 @jsexternal([rffi.INT, rffi.INT, rffi.INT, rffi.INT], rffi.INT,
             _nowrapper=True, random_effects_on_gcobjs=True)
 def jitInvoke(funcid, frame, tladdr, label):
+    _jitCompilePending(funcid, JIT_STAT_FORCED_COMPILES)
     func = _jitCompiledFunctions.get(funcid, None)
-    if func is None:
-        res = 0
-    else:
-        res = int(func(frame, tladdr, label))
-    return res
+    while func is not None:
+        _jitTrampolineTarget[0] = 0
+        frame = int(func(frame, tladdr, label))
+        funcid = _jitTrampolineTarget[0]
+        if not funcid:
+            return frame
+        label = _jitTrampolineTarget[1]
+        _jitCompilePending(funcid, JIT_STAT_FORCED_COMPILES)
+        func = _jitCompiledFunctions.get(funcid, None)
+    return 0
+
+
+_jitTrampolineTarget = [0, 0]
+
+
+@jsexternal([rffi.INT, rffi.INT], lltype.Void)
+def jitTrampoline(funcid, label):
+    _jitTrampolineTarget[0] = funcid
+    _jitTrampolineTarget[1] = label
 
 
 @jsexternal([rffi.INT], lltype.Void)
 def jitFree(funcid):
+    _jitPendingSources.pop(funcid, None)
+    _jitCompileTimes.pop(funcid, None)
     _jitCompiledFunctions.pop(funcid, None)
 
 
@@ -122,10 +212,7 @@ def load_asmjs(jssource, stdlib=None, foreign=None, heap=None):
 def compile_asmjs(jssource):
     """Compile asmjs module code into an equivalent python factory function."""
     print jssource
-    ast = parse_asmjs(jssource)
-    visitor = CompileASMJSVisitor()
-    visitor.dispatch(ast)
-    pysource = visitor.getpysource()
+    pysource = translate_asmjs(jssource)
     print pysource
     ns = {}
     pycode = compile(pysource, "<pyasmjs>", "exec")
@@ -135,6 +222,44 @@ def compile_asmjs(jssource):
         return func
 
 
+# Translating asmjs to python is very slow, and the tests tend to generate
+# the same code over and over again.  This is the untranslated stand-in for
+# the module cache in library_jit.js: translated source is cached in memory,
+# and on disk keyed by a hash of the asmjs source and of this file, so that
+# changes to the translator invalidate old entries.  Like its counterpart,
+# the in-memory cache keeps only the most recently used entries.
+
+_translated_asmjs = OrderedDict()
+_translated_asmjs_max_size = 256
+_translator_hash = None
+
+
+def translate_asmjs(jssource):
+    """Translate asmjs module code into equivalent python source code."""
+    global _translator_hash
+    if _translator_hash is None:
+        with open(__file__.rstrip("co")) as f:
+            _translator_hash = md5(f.read()).hexdigest()
+    key = md5(_translator_hash + jssource).hexdigest()
+    pysource = _translated_asmjs.pop(key, None)
+    if pysource is None:
+        from rpython.config.translationoption import CACHE_DIR
+        cache_dir = py.path.local(CACHE_DIR).join("asmjs_cache")
+        path = cache_dir.ensure(dir=1).join(key + ".py")
+        try:
+            pysource = path.read()
+        except py.error.Error:
+            ast = parse_asmjs(jssource)
+            visitor = CompileASMJSVisitor()
+            visitor.dispatch(ast)
+            pysource = visitor.getpysource()
+            try_atomic_write(path, pysource)
+        while len(_translated_asmjs) >= _translated_asmjs_max_size:
+            _translated_asmjs.popitem(last=False)
+    _translated_asmjs[key] = pysource
+    return pysource
+
+
 _parse_asmjs = None
 
 
@@ -709,6 +834,16 @@ class CompileASMJSVisitor(RPythonVisitor):
         self.emit(node.additional_info)
 
 
+# Counts of loads and stores made through the simulated typed-array views,
+# which lets tests and benchmarks measure the heap traffic of jitted code.
+heap_access_counts = {"loads": 0, "stores": 0}
+
+
+def reset_heap_access_counts():
+    heap_access_counts["loads"] = 0
+    heap_access_counts["stores"] = 0
+
+
 def makeHeapView(format, convert=lambda x: x):
     """Given native-endian struct pack format, build a heapview class.
 
@@ -726,12 +861,14 @@ def makeHeapView(format, convert=lambda x: x):
             self.heap = heap
 
         def __getitem__(self, addr):
+            heap_access_counts["loads"] += 1
             data = ""
             for i in xrange(itemsize):
                 data += self.heap[(itemsize * addr) + i]
             return struct.unpack(format, data)[0]
 
         def __setitem__(self, addr, value):
+            heap_access_counts["stores"] += 1
             data = struct.pack(format, convert(value))
             for i in xrange(len(data)):
                 self.heap[(itemsize * addr) + i] = data[i]
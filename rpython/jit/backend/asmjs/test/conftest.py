@@ -1,6 +1,9 @@
 import py
 def pytest_runtest_setup(item):
     from rpython.translator import platform
+    # tests that only run javascript don't need to build for emscripten
+    if not getattr(item.module, "needs_emscripten_platform", True):
+        return
     if platform.platform.name != "emscripten":
         py.test.skip("test requires emscripten platform")
     from rpython.rtyper.lltypesystem import ll2ctypes
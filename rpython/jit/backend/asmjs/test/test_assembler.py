@@ -0,0 +1,74 @@
+from rpython.jit.backend.asmjs.assembler import CompiledBlockASMJS
+from rpython.jit.metainterp.history import (BoxInt, BoxFloat, ConstInt,
+                                            TargetToken)
+from rpython.jit.metainterp.resoperation import rop, ResOperation
+
+
+class FakeCPU(object):
+    def get_baseofs_of_frame_field(self):
+        return 0
+
+class FakeInvalidation(object):
+    counter = 0
+
+class FakeCLT(object):
+    cpu = FakeCPU()
+    invalidation = FakeInvalidation()
+
+class FakeFunc(object):
+    def ensure_frame_depth(self, depth):
+        pass
+
+
+def generate_source(inputargs, operations):
+    token = TargetToken()
+    block = CompiledBlockASMJS(FakeCLT(), FakeFunc(), 0, operations, token,
+                               inputargs, [], token, None)
+    block.generate_code()
+    return "".join([fragment.source for fragment in block.compiled_fragments])
+
+def get_assignments(source):
+    return [line for line in source.splitlines()
+                 if line and not line.startswith("//")]
+
+
+def test_loop_carried_values_stay_in_input_vars():
+    # Values computed for the final jump go straight into the variables
+    # in which the target block expects its input args.
+    i0, i1, i2, i3, i4 = BoxInt(), BoxInt(), BoxInt(), BoxInt(), BoxInt()
+    operations = [
+        ResOperation(rop.INT_ADD, [i0, ConstInt(1)], i2),
+        ResOperation(rop.INT_MUL, [i1, i2], i3),
+        ResOperation(rop.INT_SUB, [i3, i2], i4),
+        ResOperation(rop.JUMP, [i2, i4], None, descr=TargetToken()),
+    ]
+    assignments = get_assignments(generate_source([i0, i1], operations))
+    assert assignments == [
+        "i0=(((i0)+(1))|(0));",
+        "i1=(((imul(i1,i0)|0)-(i0))|(0));",
+    ]
+
+def test_jump_arg_var_not_reused_while_still_needed():
+    # i0 is still needed after i2 is computed, so i2 can't overwrite it.
+    i0, i1, i2, i3 = BoxInt(), BoxInt(), BoxInt(), BoxInt()
+    operations = [
+        ResOperation(rop.INT_ADD, [i0, ConstInt(1)], i2),
+        ResOperation(rop.INT_ADD, [i0, i2], i3),
+        ResOperation(rop.JUMP, [i2, i3], None, descr=TargetToken()),
+    ]
+    assignments = get_assignments(generate_source([i0, i1], operations))
+    assert assignments[0] == "i2=(((i0)+(1))|(0));"
+
+def test_float_jump_args_use_double_vars():
+    f0, f1 = BoxFloat(), BoxFloat()
+    i0, i1 = BoxInt(), BoxInt()
+    operations = [
+        ResOperation(rop.FLOAT_ADD, [f0, f0], f1),
+        ResOperation(rop.INT_ADD, [i0, ConstInt(1)], i1),
+        ResOperation(rop.JUMP, [i1, f1], None, descr=TargetToken()),
+    ]
+    assignments = get_assignments(generate_source([i0, f0], operations))
+    assert assignments == [
+        "f0=((f0)+(f0));",
+        "i0=(((i0)+(1))|(0));",
+    ]
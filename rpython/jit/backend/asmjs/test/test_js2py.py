@@ -9,6 +9,7 @@ import random
 import unittest
 import subprocess
 
+from rpython.rtyper.lltypesystem import rffi
 from rpython.translator.platform import emscripten_platform
 from rpython.jit.backend.asmjs import support, jsvalue, jsbuilder
 
@@ -107,3 +108,83 @@ class TestJSToPythonConversion(unittest.TestCase):
 
     def test_integer_operations_3(self):
         self._perform_integer_operations()
+
+
+class TestTranslationCache(unittest.TestCase):
+
+    def test_translation_is_cached(self):
+        jssrc = build_jssrc(make_random_expr(5, 42))
+        pysrc = support.translate_asmjs(jssrc)
+        support._translated_asmjs.clear()
+        # The second translation should come from the on-disk cache.
+        orig_parse_asmjs = support.parse_asmjs
+        support.parse_asmjs = None
+        try:
+            self.assertEqual(support.translate_asmjs(jssrc), pysrc)
+        finally:
+            support.parse_asmjs = orig_parse_asmjs
+
+    def test_translation_cache_is_bounded(self):
+        orig_max_size = support._translated_asmjs_max_size
+        support._translated_asmjs_max_size = 2
+        try:
+            jssrcs = [build_jssrc(make_random_expr(3, seed))
+                      for seed in range(3)]
+            for jssrc in jssrcs:
+                support.translate_asmjs(jssrc)
+            self.assertEqual(len(support._translated_asmjs), 2)
+            # Using the oldest entry again makes it the newest.
+            first = support._translated_asmjs.keys()[0]
+            support.translate_asmjs(jssrcs[1])
+            self.assertEqual(support._translated_asmjs.keys()[1], first)
+        finally:
+            support._translated_asmjs_max_size = orig_max_size
+
+
+class TestAsyncCompile(unittest.TestCase):
+
+    def setUp(self):
+        support.jitAsyncCompile = True
+
+    def tearDown(self):
+        support.jitAsyncCompile = False
+        support._jitPendingSources.clear()
+
+    def _recompile(self, funcid, expr):
+        with rffi.scoped_str2charp(build_jssrc(expr)) as jssrc:
+            support.jitRecompile(funcid, jssrc)
+
+    def _invoke(self, funcid):
+        args = [rffi.cast(rffi.INT, x) for x in (funcid, 0, 0, 0)]
+        return support.jitInvoke(*args)
+
+    def test_compile_is_deferred_until_event_loop(self):
+        funcid = support.jitReserve()
+        self._recompile(funcid, jsvalue.ConstInt(7))
+        self.assertEqual(support.jitIsReady(funcid), 0)
+        # Later recompiles supersede the pending source.
+        superseded = support.jitCompileStat(
+            support.JIT_STAT_SUPERSEDED_COMPILES)
+        self._recompile(funcid, jsvalue.ConstInt(42))
+        self.assertEqual(
+            support.jitCompileStat(support.JIT_STAT_SUPERSEDED_COMPILES),
+            superseded + 1)
+        compiles = support.jitCompileStat(support.JIT_STAT_ASYNC_COMPILES)
+        support.run_pending_compiles()
+        self.assertEqual(support.jitIsReady(funcid), 1)
+        self.assertEqual(
+            support.jitCompileStat(support.JIT_STAT_ASYNC_COMPILES),
+            compiles + 1)
+        self.assertEqual(self._invoke(funcid), 42)
+        support.jitFree(funcid)
+
+    def test_invoking_pending_function_compiles_it(self):
+        funcid = support.jitReserve()
+        self._recompile(funcid, jsvalue.ConstInt(7))
+        compiles = support.jitCompileStat(support.JIT_STAT_FORCED_COMPILES)
+        self.assertEqual(self._invoke(funcid), 7)
+        self.assertEqual(support.jitIsReady(funcid), 1)
+        self.assertEqual(
+            support.jitCompileStat(support.JIT_STAT_FORCED_COMPILES),
+            compiles + 1)
+        support.jitFree(funcid)
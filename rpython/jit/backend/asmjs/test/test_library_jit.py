@@ -0,0 +1,95 @@
+#
+# Test the helper functions in library_jit.js by linking the library the
+# way emscripten does, and running the result under node.
+#
+
+import os
+import re
+import subprocess
+
+import py
+
+from rpython.jit.backend.asmjs import support
+
+needs_emscripten_platform = False
+
+LIBRARY = os.path.join(os.path.dirname(support.__file__), "library_jit.js")
+HEADER = os.path.join(os.path.dirname(support.__file__), "..", "..", "..",
+                      "translator", "platform", "emscripten_platform",
+                      "library_jit.h")
+
+# Emscripten only includes the library functions that are called from C,
+# i.e. those declared in library_jit.h, and their __deps.  Anything else
+# is not defined in the final program.
+LINKER = r"""
+var fs = require("fs");
+var vm = require("vm");
+var library = {};
+global.LibraryManager = {"library": library};
+global.mergeInto = function(target, source) {
+  for (var name in source) {
+    target[name] = source[name];
+  }
+};
+eval(fs.readFileSync(process.argv[2], "utf8"));
+var included = {};
+function include(name) {
+  if (!included[name]) {
+    included[name] = true;
+    (library[name + "__deps"] || []).forEach(include);
+  }
+}
+process.argv[3].split(",").forEach(include);
+var program = "";
+for (var name in included) {
+  program += "var _" + name + " = " + library[name].toString() + ";\n";
+}
+global.require = require;
+global.Module = {};
+vm.runInThisContext(program + process.argv[4]);
+"""
+
+
+def run_linked(tmpdir, jssrc):
+    node = py.path.local.sysfind("node")
+    if node is None:
+        py.test.skip("test requires node")
+    roots = re.findall(r"^\w+\s+(\w+)\(", open(HEADER).read(), re.M)
+    linker = tmpdir.join("link.js")
+    linker.write(LINKER)
+    p = subprocess.Popen([str(node), str(linker), LIBRARY, ",".join(roots),
+                          jssrc], stdout=subprocess.PIPE,
+                         stderr=subprocess.STDOUT)
+    output = p.communicate()[0]
+    assert p.returncode == 0, output
+    return output.strip().split("\n")
+
+
+def test_file_code_cache(tmpdir):
+    cachedir = tmpdir.ensure("cache", dir=True)
+    output = run_linked(tmpdir, r"""
+        var source = "function M(){return 42;}";
+        Module.jitCodeCacheDir = %r;
+        console.log(_jitLoadModule(source)()());
+        console.log(typeof Module.jitCodeCache.load);
+        // a new run finds the compiled code on disk
+        Module = {"jitCodeCache": _jitFileCodeCache(%r)};
+        var saved = Module.jitCodeCache.save;
+        Module.jitCodeCache.save = function() { throw "not cached"; };
+        console.log(_jitLoadModule(source)()());
+    """ % (str(cachedir), str(cachedir)))
+    assert output == ["42", "function", "42"]
+    assert len(cachedir.listdir()) == 2
+
+def test_module_cache_compares_source(tmpdir):
+    output = run_linked(tmpdir, r"""
+        _jitSourceHash = function(source) { return "collision"; };
+        var f1 = _jitLoadModule("function M(){return 1;}");
+        var f2 = _jitLoadModule("function M(){return 2;}");
+        console.log(f1()(), f2()());
+        console.log(_jitLoadModule("function M(){return 2;}") === f2);
+        console.log(Module._jitModuleCache.size);
+        console.log(JSON.stringify(Module._jitModuleCacheStats));
+    """)
+    assert output == ["1 2", "true", "1",
+                      '{"hits":1,"misses":2,"evictions":0}']
@@ -56,6 +56,76 @@ class TestASMJSRunner(LLtypeBackendTest):
     def test_compile_bridge_while_running_guard_no_exc(self):
         py.test.xfail("XXX TODO can't bridge from running code yet")
 
+    def test_compile_bridge_into_separate_function(self):
+        self.cpu.assembler.bridge_reassembly_threshold = 0
+        i0 = BoxInt()
+        i1 = BoxInt()
+        i2 = BoxInt()
+        faildescr1 = BasicFailDescr(1)
+        faildescr2 = BasicFailDescr(2)
+        looptoken = JitCellToken()
+        targettoken = TargetToken()
+        operations = [
+            ResOperation(rop.LABEL, [i0], None, descr=targettoken),
+            ResOperation(rop.INT_ADD, [i0, ConstInt(1)], i1),
+            ResOperation(rop.INT_LE, [i1, ConstInt(9)], i2),
+            ResOperation(rop.GUARD_TRUE, [i2], None, descr=faildescr1),
+            ResOperation(rop.JUMP, [i1], None, descr=targettoken),
+            ]
+        inputargs = [i0]
+        operations[3].setfailargs([None, i1])
+        self.cpu.compile_loop(inputargs, operations, looptoken)
+        func = looptoken.compiled_loop_token.func
+
+        i1b = BoxInt()
+        i3 = BoxInt()
+        bridge = [
+            ResOperation(rop.INT_LE, [i1b, ConstInt(19)], i3),
+            ResOperation(rop.GUARD_TRUE, [i3], None, descr=faildescr2),
+            ResOperation(rop.JUMP, [i1b], None, descr=targettoken),
+        ]
+        bridge[1].setfailargs([i1b])
+        self.cpu.compile_bridge(faildescr1, [i1b], bridge, looptoken)
+
+        # The bridge lives in its own function, linked in at runtime.
+        bridge_func = faildescr1._asmjs_block.func
+        assert bridge_func is not func
+        assert bridge_func.is_bridge_func
+        assert func.num_bridges == 0
+        assert bridge_func.num_bridges == 1
+
+        deadframe = self.cpu.execute_token(looptoken, 2)
+        fail = self.cpu.get_latest_descr(deadframe)
+        assert fail.identifier == 2
+        res = self.cpu.get_int_value(deadframe, 0)
+        assert res == 20
+
+    def test_guards_share_exit_stub(self):
+        # Many guards with the same fail-arg layout exit via a single stub,
+        # which still writes the right descr for whichever one failed.
+        i0 = BoxInt()
+        layouts = self.cpu.assembler.guard_exit_layouts
+        num_layouts = len(layouts)
+        faildescrs = [BasicFailDescr(i) for i in range(10)]
+        operations = []
+        for i in range(10):
+            i1 = BoxInt()
+            operations.append(ResOperation(rop.INT_NE, [i0, ConstInt(i)], i1))
+            guard = ResOperation(rop.GUARD_TRUE, [i1], None,
+                                 descr=faildescrs[i])
+            guard.setfailargs([i0])
+            operations.append(guard)
+        operations.append(ResOperation(rop.FINISH, [i0], None,
+                                       descr=BasicFinalDescr(99)))
+        looptoken = JitCellToken()
+        self.cpu.compile_loop([i0], operations, looptoken)
+        assert len(layouts) == num_layouts + 1
+        for i, expected in [(0, 0), (7, 7), (42, 99)]:
+            deadframe = self.cpu.execute_token(looptoken, i)
+            fail = self.cpu.get_latest_descr(deadframe)
+            assert fail.identifier == expected
+            assert self.cpu.get_int_value(deadframe, 0) == i
+
     def test_execute_ptr_operation(self):
         cpu = self.cpu
         u = lltype.malloc(U)
@@ -291,3 +361,12 @@ class TestASMJSRunner(LLtypeBackendTest):
                         assert result == expected
                     else:
                         assert result != expected
+
+
+class TestASMJSRunnerSeparateBridges(TestASMJSRunner):
+    """Re-run all the tests with every bridge compiled separately."""
+
+    def get_cpu(self):
+        cpu = TestASMJSRunner.get_cpu(self)
+        cpu.assembler.bridge_reassembly_threshold = 0
+        return cpu
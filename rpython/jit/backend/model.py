@@ -45,6 +45,16 @@ class AbstractCPU(object):
         """
         raise NotImplementedError
 
+    def get_all_func_stats(self):
+        """ Function that will return the code-generation statistics of
+        backends that compile into separately-generated functions.  Other
+        backends have none to report.
+
+        Returns an instance of FUNC_STATS_CONTAINER from rlib.jit_hooks
+        """
+        from rpython.rlib.jit_hooks import FUNC_STATS_CONTAINER
+        return lltype.malloc(FUNC_STATS_CONTAINER, 0)
+
     def set_debug(self, value):
         """ Enable or disable debugging info. Does nothing by default. Returns
         the previous setting.
@@ -89,6 +99,12 @@ class AbstractCPU(object):
         """
         raise NotImplementedError
 
+    def is_loop_ready(self, looptoken):
+        """Check whether the code for 'looptoken' is in place.  Backends
+        that compile in the background return False until it is, and the
+        front-end keeps interpreting instead of entering the loop."""
+        return True
+
     def get_latest_descr(self, deadframe):
         """Returns the Descr for the last operation executed by the frame."""
         raise NotImplementedError
@@ -563,6 +563,45 @@ class TestLLWarmspot(WarmspotTests, LLJitMixin):
     CPUClass = runner.LLGraphCPU
     type_system = 'lltype'
 
+    def run_with_loop_ready(self, ready):
+        entered = []
+        class MaybeReadyCPU(runner.LLGraphCPU):
+            def is_loop_ready(self, looptoken):
+                return ready
+            def make_execute_token(self, *argtypes):
+                execute_token = runner.LLGraphCPU.make_execute_token(
+                    self, *argtypes)
+                def counting_execute_token(looptoken, *args):
+                    entered.append(looptoken)
+                    return execute_token(looptoken, *args)
+                return counting_execute_token
+        myjitdriver = JitDriver(greens=[], reds=['n', 'total'])
+        def loop(n):
+            total = 0
+            while n > 0:
+                myjitdriver.can_enter_jit(n=n, total=total)
+                myjitdriver.jit_merge_point(n=n, total=total)
+                total += n
+                n -= 1
+            return total
+        def main(n):
+            total = 0
+            for i in range(5):
+                total += loop(n)
+            return total
+        self.CPUClass = MaybeReadyCPU
+        res = self.meta_interp(main, [30])
+        assert res == 5 * 465
+        return len(entered)
+
+    def test_loop_not_ready_keeps_interpreting(self):
+        # The loop is run once when it's compiled, as the tests do that
+        # directly.  After that it's only entered when the backend says
+        # it's ready.
+        assert self.run_with_loop_ready(False) == 1
+        self.check_trace_count(1)    # and it's not traced again either
+        assert self.run_with_loop_ready(True) == 5
+
 class TestWarmspotDirect(object):
     def setup_class(cls):
         from rpython.jit.metainterp.typesystem import llhelper
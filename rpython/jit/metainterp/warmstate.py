@@ -442,6 +442,9 @@ class WarmEnterState(object):
                 return
             if not confirm_enter_jit(*args):
                 return
+            if not cpu.is_loop_ready(procedure_token):
+                # the backend is still compiling it: keep interpreting
+                return
             # extract and unspecialize the red arguments to pass to
             # the assembler
             execute_args = ()
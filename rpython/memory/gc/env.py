@@ -7,6 +7,7 @@ from rpython.rlib.debug import debug_print, debug_start, debug_stop
 from rpython.rlib.rstring import assert_str0
 from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.rtyper.lltypesystem.lloperation import llop
+from rpython.translator.tool.cbuild import ExternalCompilationInfo
 
 # ____________________________________________________________
 # Reading env vars.  Supports returning ints, uints or floats,
@@ -126,6 +127,40 @@ else:
         return addressable_size       # XXX implement me for other platforms
 
 
+# ____________________________________________________________
+# Get a hard limit on the memory that the whole process can use, or 0 if
+# there is none.  This is only known on emscripten, where everything lives
+# in a linear memory of 'TOTAL_MEMORY' bytes that cannot grow.  Its size is
+# only known at run-time, because it can be changed from the JS side.
+
+_memory_ceiling_eci = ExternalCompilationInfo(
+    post_include_bits=["RPY_EXTERN long pypy_gc_memory_ceiling(void);"],
+    separate_module_sources=["""
+#ifdef __EMSCRIPTEN__
+#include <emscripten.h>
+RPY_EXTERN long pypy_gc_memory_ceiling(void) {
+    return EM_ASM_INT_V({ return TOTAL_MEMORY; });
+}
+#else
+RPY_EXTERN long pypy_gc_memory_ceiling(void) {
+    return 0;
+}
+#endif
+"""])
+
+_get_memory_ceiling = rffi.llexternal('pypy_gc_memory_ceiling', [],
+                                      lltype.Signed,
+                                      compilation_info=_memory_ceiling_eci,
+                                      sandboxsafe=True, _nowrapper=True)
+
+def get_memory_ceiling():
+    debug_start("gc-hardware")
+    result = _get_memory_ceiling()
+    debug_print("memory ceiling =", result)
+    debug_stop("gc-hardware")
+    return result
+
+
 # ____________________________________________________________
 # Estimation of the nursery size, based on the L2 cache.
 
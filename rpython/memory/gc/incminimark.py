@@ -6,6 +6,13 @@ Environment variables can be used to fine-tune the following parameters:
                          '4M'.  Small values
                          (like 1 or 1KB) are useful for debugging.
 
+ PYPY_GC_NURSERY_MAX     If set to more than the nursery size, the size
+                         of the nursery adapts to the program: it grows up
+                         to this limit while few objects survive minor
+                         collections and these take a noticeable part of
+                         the time, and it shrinks down to 1/4 of
+                         PYPY_GC_NURSERY while many objects survive.
+
  PYPY_GC_NURSERY_DEBUG   If set to non-zero, will fill nursery with garbage,
                          to help debugging.
 
@@ -30,19 +37,29 @@ Environment variables can be used to fine-tune the following parameters:
                          will first collect more often, then raise an
                          RPython MemoryError, and if that is not enough,
                          crash the program with a fatal error.  Try values
-                         like '1.6GB'.
+                         like '1.6GB'.  On platforms with a fixed-size
+                         memory (emscripten's TOTAL_MEMORY), it is capped
+                         to 3/4 of that size, and going over it raises
+                         MemoryError instead of crashing.
 
  PYPY_GC_MAX_DELTA       The major collection threshold will never be set
                          to more than PYPY_GC_MAX_DELTA the amount really
                          used after a collection.  Defaults to 1/8th of the
                          total RAM size (which is constrained to be at most
-                         2/3/4GB on 32-bit systems).  Try values like '200MB'.
+                         2/3/4GB on 32-bit systems), or of the fixed-size
+                         memory if there is one.  Try values like '200MB'.
 
  PYPY_GC_MIN             Don't collect while the memory size is below this
                          limit.  Useful to avoid spending all the time in
                          the GC in very small programs.  Defaults to 8
                          times the nursery.
 
+ PYPY_GC_RELEASE_PAGES   If set to non-zero, the memory of the free pages
+                         inside partially used arenas is given back to the
+                         OS after every major collection, and almost empty
+                         pages are only reused last.  Useful for long-running
+                         processes whose heap changes shape over time.
+
  PYPY_GC_DEBUG           Enable extra checks around collections that are
                          too slow for normal use.  Values are 0 (off),
                          1 (on major collections) or 2 (also on minor
@@ -63,7 +80,9 @@ from rpython.memory.gc.base import GCBase, MovingGCBase
 from rpython.memory.gc import env
 from rpython.memory.support import mangle_hash
 from rpython.rlib.rarithmetic import ovfcheck, LONG_BIT, intmask, r_uint
-from rpython.rlib.rarithmetic import LONG_BIT_SHIFT
+from rpython.rlib.rarithmetic import LONG_BIT_SHIFT, r_longlong
+from rpython.rlib import rgc
+from rpython.rlib.rtimer import read_timestamp
 from rpython.rlib.debug import ll_assert, debug_print, debug_start, debug_stop
 from rpython.rlib.objectmodel import specialize
 from rpython.memory.gc.minimarkpage import out_of_memory
@@ -171,6 +190,26 @@ STATE_FINALIZING = 3
 
 GC_STATES = ['SCANNING', 'MARKING', 'SWEEPING', 'FINALIZING']
 
+# With a fixed-size memory (see set_memory_ceiling()), the fraction of it
+# that the GC heap may use.  The rest is kept for the nursery, for memory
+# not managed by the GC, and for fragmentation of the arenas.
+MEMORY_CEILING_FRACTION = 0.75
+
+# With an adaptive nursery (see _nursery_size_policy()), grow it while at
+# most NURSERY_GROW_SURVIVAL of it survives minor collections and these
+# take at least NURSERY_GROW_TIME_SHARE of the time; shrink it while at
+# least NURSERY_SHRINK_SURVIVAL of it survives.
+NURSERY_GROW_SURVIVAL = 0.1
+NURSERY_GROW_TIME_SHARE = 0.02
+NURSERY_SHRINK_SURVIVAL = 0.25
+
+# The statistics returned by get_stats(); see rgc.get_gc_stats().
+STATS = lltype.Array(lltype.SignedLongLong, hints={'nolength': True})
+PAUSE_MINOR = rgc.GC_PHASES.index('minor')
+PAUSE_MARKING = rgc.GC_PHASES.index('marking')
+PAUSE_SWEEPING = rgc.GC_PHASES.index('sweeping')
+PAUSE_FINALIZING = rgc.GC_PHASES.index('finalizing')
+
 
 FORWARDSTUB = lltype.GcStruct('forwarding_stub',
                               ('forw', llmemory.Address))
@@ -273,6 +312,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
                  growth_rate_max=2.5,   # for tests
                  card_page_indices=0,
                  large_object=8*WORD,
+                 nursery_size_max=0,
                  ArenaCollectionClass=None,
                  **kwds):
         MovingGCBase.__init__(self, config, **kwds)
@@ -288,7 +328,9 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.max_heap_size = 0.0
         self.max_heap_size_already_raised = False
         self.max_delta = float(r_uint(-1))
+        self.memory_ceiling = 0.0
         self.max_number_of_pinned_objects = 0      # computed later
+        self.gc_increment_step_from_env = False
         #
         self.card_page_indices = card_page_indices
         if self.card_page_indices > 0:
@@ -305,6 +347,22 @@ class IncrementalMiniMarkGC(MovingGCBase):
         self.nursery_top  = llmemory.NULL
         self.debug_tiny_nursery = -1
         self.debug_rotating_nurseries = lltype.nullptr(NURSARRAY)
+        #
+        # Adaptive nursery size, see _adapt_nursery_size().  The nursery
+        # size is fixed if 'nursery_size_max' is 0.
+        self.nursery_size_min = 0
+        self.nursery_size_max = nursery_size_max
+        self.nursery_survival_avg = 0.0
+        self.nursery_time_share_avg = 0.0
+        self.last_minor_collection_end = r_longlong(0)
+        #
+        # Allocation sampling, see set_allocation_sampling()
+        self.sample_hook = lltype.nullptr(rgc.ALLOCATION_SAMPLE_HOOK)
+        self.sample_every = 0
+        self.sample_countdown = 0
+        self.sample_base = llmemory.NULL
+        self.sample_real_top = llmemory.NULL
+        self.sample_hook_running = False
         self.extra_threshold = 0
         #
         # The ArenaCollection() handles the nonmovable objects allocation.
@@ -352,6 +410,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
 
         self.gc_state = STATE_SCANNING
         #
+        # Pause times and allocation statistics, see get_stats().
+        self.stats = lltype.malloc(STATS, rgc.GC_STATS_COUNT, flavor='raw',
+                                   zero=True, track_allocation=False)
+        #
         # A list of all objects with finalizers (these are never young).
         self.objects_with_finalizers = self.AddressDeque()
         self.young_objects_with_light_finalizers = self.AddressStack()
@@ -394,12 +456,16 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # up the env var, which requires the GC; and then really
         # allocate the nursery of the final size.
         if not self.read_from_env:
+            if self.nursery_size_max > self.nursery_size:
+                self._setup_adaptive_nursery(self.nursery_size_max)
+            else:
+                self.nursery_size_max = 0
             self.allocate_nursery()
-            self.gc_increment_step = self.nursery_size * 4
             self.gc_nursery_debug = False
         else:
             #
             defaultsize = self.nursery_size
+            self.nursery_size_max = 0
             minsize = 2 * (self.nonlarge_max + 1)
             self.nursery_size = minsize
             self.allocate_nursery()
@@ -418,10 +484,20 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 newsize = env.estimate_best_nursery_size()
                 if newsize <= 0:
                     newsize = defaultsize
+            #
+            # With a fixed-size memory, don't let the nursery take more
+            # than a small fraction of it
+            memory_ceiling = env.get_memory_ceiling()
+            if memory_ceiling > 0:
+                newsize = min(newsize, memory_ceiling // 32)
             if newsize < minsize:
                 self.debug_tiny_nursery = newsize & ~(WORD-1)
                 newsize = minsize
             #
+            nursery_max = env.read_from_env('PYPY_GC_NURSERY_MAX')
+            if memory_ceiling > 0:
+                nursery_max = min(nursery_max, memory_ceiling // 32)
+            #
             major_coll = env.read_float_from_env('PYPY_GC_MAJOR_COLLECT')
             if major_coll > 1.0:
                 self.major_collection_threshold = major_coll
@@ -444,14 +520,18 @@ class IncrementalMiniMarkGC(MovingGCBase):
             max_delta = env.read_uint_from_env('PYPY_GC_MAX_DELTA')
             if max_delta > 0:
                 self.max_delta = float(max_delta)
+            elif memory_ceiling > 0:
+                self.max_delta = 0.125 * memory_ceiling
             else:
                 self.max_delta = 0.125 * env.get_total_memory()
 
             gc_increment_step = env.read_uint_from_env('PYPY_GC_INCREMENT_STEP')
             if gc_increment_step > 0:
                 self.gc_increment_step = gc_increment_step
-            else:
-                self.gc_increment_step = newsize * 4
+                self.gc_increment_step_from_env = True
+            #
+            if env.read_from_env('PYPY_GC_RELEASE_PAGES') > 0:
+                self.ac.fragmentation_aware = True
             #
             nursery_debug = env.read_uint_from_env('PYPY_GC_NURSERY_DEBUG')
             if nursery_debug > 0:
@@ -461,15 +541,34 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self.minor_collection()    # to empty the nursery
             llarena.arena_free(self.nursery)
             self.nursery_size = newsize
+            if nursery_max > newsize and self.debug_tiny_nursery < 0:
+                self._setup_adaptive_nursery(nursery_max)
             self.allocate_nursery()
+            if memory_ceiling > 0:
+                self.set_memory_ceiling(memory_ceiling)
+        self._update_nursery_limits()
+
+    def _update_nursery_limits(self):
+        # Limits that are derived from the size of the nursery.  Called
+        # again whenever the nursery is resized.
+        if not self.gc_increment_step_from_env:
+            self.gc_increment_step = self.nursery_size * 4
         #
         # Estimate this number conservatively
         bigobj = self.nonlarge_max + 1
         self.max_number_of_pinned_objects = self.nursery_size / (bigobj * 2)
 
+    def _setup_adaptive_nursery(self, maxsize):
+        minsize = 2 * (self.nonlarge_max + 1)
+        self.nursery_size_min = max(self.nursery_size // 4, minsize)
+        self.nursery_size_min &= ~(WORD-1)
+        self.nursery_size_max = maxsize & ~(WORD-1)
+
     def _nursery_memory_size(self):
+        # with an adaptive nursery, reserve enough memory for the largest
+        # size it can grow to
         extra = self.nonlarge_max + 1
-        return self.nursery_size + extra
+        return max(self.nursery_size, self.nursery_size_max) + extra
 
     def _alloc_nursery(self):
         # the start of the nursery: we actually allocate a bit more for
@@ -604,7 +703,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             result = self.nursery_free
             self.nursery_free = new_free = result + totalsize
             if new_free > self.nursery_top:
-                result = self.collect_and_reserve(totalsize)
+                result = self.collect_and_reserve(totalsize, typeid)
             #
             # Build the object.
             llarena.arena_reserve(result, totalsize)
@@ -663,7 +762,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             result = self.nursery_free
             self.nursery_free = new_free = result + totalsize
             if new_free > self.nursery_top:
-                result = self.collect_and_reserve(totalsize)
+                result = self.collect_and_reserve(totalsize, typeid)
             #
             # Build the object.
             llarena.arena_reserve(result, totalsize)
@@ -687,13 +786,33 @@ class IncrementalMiniMarkGC(MovingGCBase):
             self.minor_and_major_collection()
 
 
-    def collect_and_reserve(self, totalsize):
+    def collect_and_reserve(self, totalsize, typeid):
         """To call when nursery_free overflows nursery_top.
         First check if pinned objects are in front of nursery_top. If so,
         jump over the pinned object and try again to reserve totalsize.
         Otherwise do a minor collection, and possibly a major collection, and
-        finally reserve totalsize bytes.
+        finally reserve totalsize bytes.  'typeid' is the type of the object
+        to be allocated, or 0 if unknown; it is only used for sampling.
         """
+        if self.sample_real_top:
+            # Not a real overflow: nursery_top was lowered to take an
+            # allocation sample.  Restore nursery_free before calling the
+            # hook, which can allocate.
+            self.nursery_free = self.nursery_free - totalsize
+            self.nursery_top = self.sample_real_top
+            self.sample_real_top = llmemory.NULL
+            self.sample_base = self.nursery_free
+            self._take_allocation_sample(totalsize, typeid)
+            self._restore_nursery_top()    # in case the hook allocated
+            result = self.nursery_free
+            if result + totalsize <= self.nursery_top:
+                self.nursery_free = result + totalsize
+                self._lower_nursery_top_for_sample()
+                return result
+            # else the hook filled the nursery; continue below
+            self.nursery_free = result + totalsize
+        elif self.sample_every > 0:
+            self._restore_nursery_top()
 
         minor_collection_count = 0
         while True:
@@ -737,6 +856,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 minor_collection_count += 1
                 self.minor_collection()
                 if minor_collection_count == 1:
+                    if self.memory_ceiling > 0.0:
+                        self._check_memory_ceiling(totalsize)
                     #
                     # If the gc_state is not STATE_SCANNING, we're in the middle of
                     # an incremental major collection.  In this case, always progress
@@ -750,6 +871,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
                         # The nursery might not be empty now, because of
                         # execute_finalizers().  If it is almost full again,
                         # we need to fix it with another call to minor_collection().
+                        self._restore_nursery_top()
                         if self.nursery_free + totalsize > self.nursery_top:
                             self.minor_collection()
                     #
@@ -761,6 +883,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # Tried to do something about nursery_free overflowing
             # nursery_top before this point. Try to reserve totalsize now.
             # If this succeeds break out of loop.
+            if self.sample_every > 0:
+                self._restore_nursery_top()
             result = self.nursery_free
             if self.nursery_free + totalsize <= self.nursery_top:
                 self.nursery_free = result + totalsize
@@ -772,9 +896,85 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if self.nursery_top - self.nursery_free > self.debug_tiny_nursery:
                 self.nursery_free = self.nursery_top - self.debug_tiny_nursery
         #
+        if self.sample_every > 0:
+            self._lower_nursery_top_for_sample()
         return result
     collect_and_reserve._dont_inline_ = True
 
+    # ----------
+    # Allocation sampling.  To get a sample every 'sample_every' bytes
+    # without slowing down the fast path of malloc, we lower nursery_top
+    # to the point where the next sample is due; collect_and_reserve()
+    # then sees that 'sample_real_top' is set and takes the sample.
+
+    def set_allocation_sampling(self, hook, every):
+        """Call 'hook(typeindex, size)' about once every 'every' bytes
+        allocated in the nursery, or stop sampling if 'every' is 0.
+        See rgc.set_allocation_sampling()."""
+        self._restore_nursery_top()
+        if every > 0 and hook:
+            self.sample_hook = hook
+            self.sample_every = every
+            self.sample_countdown = every
+            self._lower_nursery_top_for_sample()
+        else:
+            self.sample_hook = lltype.nullptr(rgc.ALLOCATION_SAMPLE_HOOK)
+            self.sample_every = 0
+
+    def _lower_nursery_top_for_sample(self):
+        ll_assert(not self.sample_real_top, "nursery_top already lowered")
+        self.sample_base = self.nursery_free
+        if self.sample_countdown < self.nursery_top - self.nursery_free:
+            self.sample_real_top = self.nursery_top
+            self.nursery_top = self.nursery_free + self.sample_countdown
+
+    def _restore_nursery_top(self):
+        # Count the bytes allocated since _lower_nursery_top_for_sample(),
+        # and put back the real nursery_top if it was lowered.
+        if self.sample_every > 0 and self.nursery_free:
+            self.sample_countdown -= self.nursery_free - self.sample_base
+            if self.sample_countdown <= 0:
+                self.sample_countdown = 1   # take a sample soon
+            self.sample_base = self.nursery_free
+        if self.sample_real_top:
+            self.nursery_top = self.sample_real_top
+            self.sample_real_top = llmemory.NULL
+
+    def _take_allocation_sample(self, totalsize, typeid):
+        self.sample_countdown = self.sample_every
+        if self.sample_hook_running:
+            return      # allocation done by the hook itself
+        if llop.is_group_member_nonzero(lltype.Bool, typeid):
+            typeindex = self.get_member_index(typeid)
+        else:
+            typeindex = -1     # e.g. from the JIT
+        self.sample_hook_running = True
+        try:
+            self.sample_hook(typeindex, raw_malloc_usage(totalsize))
+        finally:
+            self.sample_hook_running = False
+
+    def _check_memory_ceiling(self, totalsize):
+        # Only used if there is a fixed-size memory (see set_memory_ceiling).
+        # Called just after a minor collection or before a large allocation.
+        # If the next nursery's worth of objects, plus 'totalsize', could
+        # bring us above max_heap_size, do a full major collection now.
+        # If that is not enough, raise MemoryError while we still can:
+        # running out of memory later, e.g. when allocating a new arena
+        # in the middle of a minor collection, is a fatal error.
+        margin = float(self._nursery_memory_size() +
+                       raw_malloc_usage(totalsize))
+        if float(self.get_total_memory_used()) + margin <= self.max_heap_size:
+            return
+        debug_start("gc-emergency-collect")
+        debug_print("memory used:", self.get_total_memory_used())
+        self.minor_and_major_collection()
+        debug_print("memory used after collection:",
+                    self.get_total_memory_used())
+        debug_stop("gc-emergency-collect")
+        if float(self.get_total_memory_used()) + margin > self.max_heap_size:
+            raise MemoryError
+
 
     def external_malloc(self, typeid, length, can_make_young=True):
         """Allocate a large object using the ArenaCollection or
@@ -820,6 +1020,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
                 self.gc_step_until(STATE_SWEEPING)
                 self.gc_step_until(STATE_FINALIZING,
                                    raw_malloc_usage(totalsize))
+        if self.memory_ceiling > 0.0:
+            self._check_memory_ceiling(totalsize)
         #
         # Check if the object would fit in the ArenaCollection.
         if raw_malloc_usage(totalsize) <= self.small_request_threshold:
@@ -899,6 +1101,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             # Record the newly allocated object and its full malloced size.
             # The object is young or old depending on the argument.
             self.rawmalloced_total_size += r_uint(allocsize)
+            self.stats[rgc.GC_STAT_RAWMALLOCED] += allocsize
             if can_make_young:
                 if not self.young_rawmalloced_objects:
                     self.young_rawmalloced_objects = self.AddressDict()
@@ -926,14 +1129,27 @@ class IncrementalMiniMarkGC(MovingGCBase):
             if self.max_heap_size < self.next_major_collection_threshold:
                 self.next_major_collection_threshold = self.max_heap_size
 
+    def set_memory_ceiling(self, ceiling):
+        """Tell the GC that the whole process cannot use more than
+        'ceiling' bytes, as with emscripten's fixed-size memory.  This
+        caps max_heap_size to a fraction of 'ceiling', leaving room for
+        the nursery and memory not managed by the GC; and running out of
+        it then raises MemoryError instead of aborting."""
+        self.memory_ceiling = float(ceiling)
+        limit = self.memory_ceiling * MEMORY_CEILING_FRACTION
+        if self.max_heap_size <= 0.0 or limit < self.max_heap_size:
+            self.set_max_heap_size(r_uint(limit))
+
     def raw_malloc_memory_pressure(self, sizehint):
         # Decrement by 'sizehint' plus a very little bit extra.  This
         # is needed e.g. for _rawffi, which may allocate a lot of tiny
         # arrays.
         self.next_major_collection_threshold -= (sizehint + 2 * WORD)
+        self.stats[rgc.GC_STAT_MEMORY_PRESSURE] += sizehint
         if self.next_major_collection_threshold < 0:
             # cannot trigger a full collection now, but we can ensure
             # that one will occur very soon
+            self._restore_nursery_top()
             self.nursery_free = self.nursery_top
 
     def can_optimize_clean_setarrayitems(self):
@@ -1513,6 +1729,13 @@ class IncrementalMiniMarkGC(MovingGCBase):
         that remain alive and move them out."""
         #
         debug_start("gc-minor")
+        start = read_timestamp()
+        self._restore_nursery_top()
+        if self.nursery_free:
+            nursery_used = self.nursery_free - self.nursery
+        else:
+            # called from collect_and_reserve(): the nursery is full
+            nursery_used = self.nursery_top - self.nursery
         #
         # All nursery barriers are invalid from this point on.  They
         # are evaluated anew as part of the minor collection.
@@ -1616,6 +1839,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
         if self.young_rawmalloced_objects:
             self.free_young_rawmalloced_objects()
         #
+        # With an adaptive nursery, this is where its size can change.
+        if self.nursery_size_max > 0:
+            self._adapt_nursery_size(nursery_used, start)
+        #
         # All live nursery objects are out of the nursery or pinned inside
         # the nursery.  Create nursery barriers to protect the pinned objects,
         # fill the rest of the nursery with zeros and reset the current nursery
@@ -1666,6 +1893,8 @@ class IncrementalMiniMarkGC(MovingGCBase):
         # XXX gc-minimark-pinning does a debug_rotate_nursery() here (groggi)
         self.nursery_free = self.nursery
         self.nursery_top = self.nursery_barriers.popleft()
+        if self.sample_every > 0:
+            self._lower_nursery_top_for_sample()
         #
         # clear GCFLAG_PINNED_OBJECT_PARENT_KNOWN from all parents in the list.
         self.old_objects_pointing_to_pinned.foreach(
@@ -1680,8 +1909,78 @@ class IncrementalMiniMarkGC(MovingGCBase):
         #
         self.root_walker.finished_minor_collection()
         #
+        self.stats[rgc.GC_STAT_NURSERY_ALLOCATED] += nursery_used
+        self.stats[rgc.GC_STAT_NURSERY_SURVIVED] += self.nursery_surviving_size
+        self._record_pause(PAUSE_MINOR, start)
         debug_stop("gc-minor")
 
+    def _adapt_nursery_size(self, nursery_used, start):
+        # Called near the end of a minor collection, when all surviving
+        # objects are out of the nursery (unless some are pinned).  Keeps
+        # running averages of the fraction of the nursery that survives
+        # and of the fraction of the time spent in minor collections, and
+        # changes the size of the nursery accordingly.
+        now = r_longlong(read_timestamp())
+        previous_end = self.last_minor_collection_end
+        self.last_minor_collection_end = now
+        if nursery_used < self.nursery_size // 2 or previous_end == 0:
+            # the nursery was not full, e.g. gc.collect(): this minor
+            # collection says nothing about the program
+            return
+        survival = (float(self.nursery_surviving_size) /
+                    float(nursery_used))
+        interval = now - previous_end
+        if interval > 0:
+            time_share = float(now - r_longlong(start)) / float(interval)
+        else:
+            time_share = 1.0
+        self.nursery_survival_avg = (self.nursery_survival_avg +
+                                     survival) * 0.5
+        self.nursery_time_share_avg = (self.nursery_time_share_avg +
+                                       time_share) * 0.5
+        #
+        if self.surviving_pinned_objects.non_empty():
+            return      # the nursery cannot be resized around pinned objects
+        newsize = self._nursery_size_policy(self.nursery_survival_avg,
+                                            self.nursery_time_share_avg)
+        if newsize != self.nursery_size:
+            self._resize_nursery(newsize)
+
+    def _nursery_size_policy(self, survival, time_share):
+        # Return the new size of the nursery.  When few objects survive,
+        # a larger nursery costs little more per minor collection and
+        # makes them rarer, which is worth it if they take a noticeable
+        # part of the time.  When many objects survive, they are probably
+        # long-lived, and a larger nursery would only copy more of them at
+        # once; use a smaller one to keep the pauses short and the nursery
+        # in the cache.
+        size = self.nursery_size
+        if survival <= NURSERY_GROW_SURVIVAL:
+            if time_share >= NURSERY_GROW_TIME_SHARE:
+                size = min(size * 2, self.nursery_size_max)
+        elif survival >= NURSERY_SHRINK_SURVIVAL:
+            size = max(size // 2, self.nursery_size_min)
+        return size & ~(WORD-1)
+
+    def _resize_nursery(self, newsize):
+        debug_start("gc-set-nursery-size")
+        debug_print("nursery size:", self.nursery_size, "->", newsize,
+                    "survival:", self.nursery_survival_avg,
+                    "time share:", self.nursery_time_share_avg)
+        if newsize < self.nursery_size:
+            # the end of the nursery is not reset by minor_collection()
+            # any more
+            if self.gc_nursery_debug:
+                zero = 3
+            else:
+                zero = 0
+            llarena.arena_reset(self.nursery + newsize,
+                                self.nursery_size - newsize, zero)
+        self.nursery_size = newsize
+        self._update_nursery_limits()
+        self.stats[rgc.GC_STAT_NURSERY_RESIZES] += 1
+        debug_stop("gc-set-nursery-size")
+
     def _reset_flag_old_objects_pointing_to_pinned(self, obj, ignore):
         assert self.header(obj).tid & GCFLAG_PINNED_OBJECT_PARENT_KNOWN
         self.header(obj).tid &= ~GCFLAG_PINNED_OBJECT_PARENT_KNOWN
@@ -2047,6 +2346,13 @@ class IncrementalMiniMarkGC(MovingGCBase):
     def major_collection_step(self, reserving_size=0):
         debug_start("gc-collect-step")
         debug_print("starting gc state: ", GC_STATES[self.gc_state])
+        start = read_timestamp()
+        if self.gc_state == STATE_SWEEPING:
+            phase = PAUSE_SWEEPING
+        elif self.gc_state == STATE_FINALIZING:
+            phase = PAUSE_FINALIZING
+        else:
+            phase = PAUSE_MARKING
         # Debugging checks
         if self.pinned_objects_in_nursery == 0:
             ll_assert(self.nursery_free == self.nursery,
@@ -2156,6 +2462,7 @@ class IncrementalMiniMarkGC(MovingGCBase):
             #
             if done:
                 self.num_major_collects += 1
+                self.stats[rgc.GC_STAT_MAJOR_COLLECTIONS] += 1
                 #
                 # We also need to reset the GCFLAG_VISITED on prebuilt GC objects.
                 self.prebuilt_root_objects.foreach(self._reset_gcflag_visited, None)
@@ -2181,7 +2488,10 @@ class IncrementalMiniMarkGC(MovingGCBase):
                     # major collect and (possibly) reaching here again with an
                     # even higher memory consumption.  To prevent it, if it's
                     # the second time we are here, then abort the program.
-                    if self.max_heap_size_already_raised:
+                    # With a memory ceiling, _check_memory_ceiling() stops
+                    # us before that, so we can keep raising MemoryError.
+                    if (self.max_heap_size_already_raised and
+                            self.memory_ceiling <= 0.0):
                         out_of_memory("using too much memory, aborting")
                     self.max_heap_size_already_raised = True
                     self.gc_state = STATE_SCANNING
@@ -2207,8 +2517,58 @@ class IncrementalMiniMarkGC(MovingGCBase):
             pass #XXX which exception to raise here. Should be unreachable.
 
         debug_print("stopping, now in gc state: ", GC_STATES[self.gc_state])
+        self._record_pause(phase, start)
+        if phase == PAUSE_FINALIZING:
+            self.debug_print_stats()
         debug_stop("gc-collect-step")
 
+    def _record_pause(self, phase, start):
+        duration = r_longlong(read_timestamp()) - r_longlong(start)
+        base = phase * rgc.GC_PAUSE_STATS
+        stats = self.stats
+        stats[base + rgc.GC_PAUSE_COUNT] += 1
+        stats[base + rgc.GC_PAUSE_TOTAL_TIME] += duration
+        if duration > stats[base + rgc.GC_PAUSE_MAX_TIME]:
+            stats[base + rgc.GC_PAUSE_MAX_TIME] = duration
+        # the histogram bucket is the number of bits in 'duration'
+        bucket = 0
+        while duration > 0 and bucket < rgc.GC_PAUSE_HISTOGRAM_SIZE - 1:
+            duration >>= 1
+            bucket += 1
+        stats[base + rgc.GC_PAUSE_HISTOGRAM + bucket] += 1
+
+    def get_stats(self, stat_no):
+        if stat_no == rgc.GC_STAT_RELEASED_MEMORY:
+            return r_longlong(self.ac.num_released_pages * self.ac.page_size)
+        if stat_no == rgc.GC_STAT_NURSERY_SIZE:
+            return r_longlong(self.nursery_size)
+        if 0 <= stat_no < rgc.GC_STATS_COUNT:
+            return self.stats[stat_no]
+        return r_longlong(0)
+
+    def debug_print_stats(self):
+        # Called at the end of each major collection.  The 'gc-stats'
+        # section of PYPYLOG gets the statistics collected so far.
+        debug_start("gc-stats")
+        stats = self.stats
+        for phase in range(len(rgc.GC_PHASES)):
+            base = phase * rgc.GC_PAUSE_STATS
+            debug_print(rgc.GC_PHASES[phase],
+                        "pauses:", stats[base + rgc.GC_PAUSE_COUNT],
+                        "total:", stats[base + rgc.GC_PAUSE_TOTAL_TIME],
+                        "max:", stats[base + rgc.GC_PAUSE_MAX_TIME])
+        debug_print("nursery allocated:",
+                    stats[rgc.GC_STAT_NURSERY_ALLOCATED],
+                    "survived:", stats[rgc.GC_STAT_NURSERY_SURVIVED])
+        debug_print("raw-malloced:", stats[rgc.GC_STAT_RAWMALLOCED],
+                    "memory pressure:", stats[rgc.GC_STAT_MEMORY_PRESSURE])
+        debug_print("major collections:",
+                    stats[rgc.GC_STAT_MAJOR_COLLECTIONS],
+                    "released:", self.get_stats(rgc.GC_STAT_RELEASED_MEMORY))
+        debug_print("nursery size:", self.nursery_size,
+                    "resizes:", stats[rgc.GC_STAT_NURSERY_RESIZES])
+        debug_stop("gc-stats")
+
     def _sweep_old_objects_pointing_to_pinned(self, obj, new_list):
         if self.header(obj).tid & GCFLAG_VISITED:
             new_list.append(obj)
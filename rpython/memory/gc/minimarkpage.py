@@ -16,6 +16,7 @@ assert 1 << WORD_POWER_2 == WORD
 # The actual allocation occurs in whole arenas, which are then subdivided
 # into pages.  For each arena we allocate one of the following structures:
 
+ADDRESS_ARRAY = rffi.CArray(llmemory.Address)
 ARENA_PTR = lltype.Ptr(lltype.ForwardReference())
 ARENA = lltype.Struct('ArenaReference',
     # -- The address of the arena, as returned by malloc()
@@ -25,6 +26,12 @@ ARENA = lltype.Struct('ArenaReference',
     ('totalpages', lltype.Signed),
     # -- A chained list of free pages in the arena.  Ends with NULL.
     ('freepages', llmemory.Address),
+    # -- The free pages whose memory was given back to the OS, see
+    #    release_free_pages().  They are counted in 'nfreepages' too, but
+    #    they are not in the chained list 'freepages', because writing
+    #    the link would bring the memory back.  Allocated lazily.
+    ('releasedpages', lltype.Ptr(ADDRESS_ARRAY)),
+    ('nreleasedpages', lltype.Signed),
     # -- A linked list of arenas.  See below.
     ('nextarena', ARENA_PTR),
     )
@@ -53,6 +60,9 @@ ARENA_NULL = lltype.nullptr(ARENA)
 #
 # - free: used to be partially full, and is now free again.  The page is
 #   on the chained list of free pages 'freepages' from its arena.
+#
+# - released: a free page whose memory was returned to the OS.  It is
+#   listed in the array 'releasedpages' from its arena.
 
 # Each allocated page contains blocks of a given size, which can again be in
 # one of three states: allocated, free, or uninitialized.  The uninitialized
@@ -82,6 +92,11 @@ PAGE_HEADER = lltype.Struct('PageHeader',
 PAGE_PTR.TO.become(PAGE_HEADER)
 PAGE_NULL = lltype.nullptr(PAGE_HEADER)
 
+# In the fragmentation-aware mode, a page with less than 1/4 of its blocks
+# in use after a major collection is "sparse": we allocate in it only when
+# all other pages of its size class are full.
+SPARSE_PAGE_FRACTION = 4
+
 # ----------
 
 
@@ -104,6 +119,7 @@ class ArenaCollection(object):
         self.full_page_for_size     = self._new_page_ptr_list(length)
         self.old_page_for_size      = self._new_page_ptr_list(length)
         self.old_full_page_for_size = self._new_page_ptr_list(length)
+        self.sparse_page_for_size   = self._new_page_ptr_list(length)
         self.nblocks_for_size = lltype.malloc(rffi.CArray(lltype.Signed),
                                               length, flavor='raw',
                                               immortal=True)
@@ -140,6 +156,12 @@ class ArenaCollection(object):
         # the total memory used, counting every block in use, without
         # the additional bookkeeping stuff.
         self.total_memory_used = r_uint(0)
+        #
+        # fragmentation-aware mode: at the end of mass_free(), give back
+        # to the OS the memory of the free pages of partially used arenas,
+        # and prefer allocating in pages that are already well filled.
+        self.fragmentation_aware = False
+        self.num_released_pages = 0
 
 
     def _new_page_ptr_list(self, length):
@@ -201,7 +223,7 @@ class ArenaCollection(object):
         # The result is simply 'current_arena.freepages'.
         arena = self.current_arena
         result = arena.freepages
-        if arena.nfreepages > 0:
+        if arena.nfreepages > arena.nreleasedpages:
             #
             # The 'result' was part of the chained list; read the next.
             arena.nfreepages -= 1
@@ -210,6 +232,18 @@ class ArenaCollection(object):
                                 llmemory.sizeof(llmemory.Address),
                                 0)
             #
+        elif arena.nreleasedpages > 0:
+            #
+            # Only released pages are left.  Take one; the OS gives us
+            # back the memory when we write to it.
+            ll_assert(self.num_uninitialized_pages == 0,
+                      "released pages in an arena with uninitialized pages")
+            arena.nfreepages -= 1
+            arena.nreleasedpages -= 1
+            self.num_released_pages -= 1
+            result = arena.releasedpages[arena.nreleasedpages]
+            freepages = NULL
+            #
         else:
             # The 'result' is part of the uninitialized pages.
             ll_assert(self.num_uninitialized_pages > 0,
@@ -221,7 +255,7 @@ class ArenaCollection(object):
                 freepages = NULL
         #
         arena.freepages = freepages
-        if freepages == NULL:
+        if freepages == NULL and arena.nreleasedpages == 0:
             # This was the last page, so put the arena away into
             # arenas_lists[0].
             ll_assert(arena.nfreepages == 0, 
@@ -309,6 +343,8 @@ class ArenaCollection(object):
         arena.nfreepages = 0        # they are all uninitialized pages
         arena.totalpages = npages
         arena.freepages = firstpage
+        arena.releasedpages = lltype.nullptr(ADDRESS_ARRAY)
+        arena.nreleasedpages = 0
         self.num_uninitialized_pages = npages
         self.current_arena = arena
         #
@@ -359,6 +395,8 @@ class ArenaCollection(object):
         #
         if size_class >= 0:
             self._rehash_arenas_lists()
+            if self.fragmentation_aware:
+                self.release_free_pages()
             self.size_class_with_old_pages = -1
         #
         return True
@@ -395,6 +433,10 @@ class ArenaCollection(object):
                 if arena.nfreepages == arena.totalpages:
                     #
                     # The whole arena is empty.  Free it.
+                    self.num_released_pages -= arena.nreleasedpages
+                    if arena.releasedpages:
+                        lltype.free(arena.releasedpages, flavor='raw',
+                                    track_allocation=False)
                     llarena.arena_free(arena.base)
                     lltype.free(arena, flavor='raw', track_allocation=False)
                     #
@@ -412,6 +454,45 @@ class ArenaCollection(object):
         self.min_empty_nfreepages = 1
 
 
+    def release_free_pages(self):
+        """Give back to the OS the memory of all free pages in the arenas
+        that are still partially used.  (Arenas that are completely free
+        are already freed by _rehash_arenas_lists().)  The pages remain
+        free pages of their arena, but they are only reused after the
+        non-released ones.
+        """
+        i = 1    # arenas_lists[0] contains arenas without free pages
+        while i < self.max_pages_per_arena:
+            arena = self.arenas_lists[i]
+            while arena != ARENA_NULL:
+                self._release_arena_pages(arena)
+                arena = arena.nextarena
+            i += 1
+
+
+    def _release_arena_pages(self, arena):
+        if arena.freepages == NULL:
+            return
+        if not arena.releasedpages:
+            arena.releasedpages = lltype.malloc(ADDRESS_ARRAY,
+                                                arena.totalpages,
+                                                flavor='raw',
+                                                track_allocation=False)
+        pageaddr = arena.freepages
+        while pageaddr != NULL:
+            nextpage = pageaddr.address[0]
+            llarena.arena_reset(pageaddr, llmemory.sizeof(llmemory.Address),
+                                0)
+            release_memory(pageaddr, self.page_size)
+            ll_assert(arena.nreleasedpages < arena.totalpages,
+                      "too many released pages")
+            arena.releasedpages[arena.nreleasedpages] = pageaddr
+            arena.nreleasedpages += 1
+            self.num_released_pages += 1
+            pageaddr = nextpage
+        arena.freepages = NULL
+
+
     def mass_free_in_pages(self, size_class, ok_to_free_func, max_pages):
         nblocks = self.nblocks_for_size[size_class]
         block_size = size_class * WORD
@@ -442,6 +523,16 @@ class ArenaCollection(object):
                     page.nextpage = remaining_full_pages
                     remaining_full_pages = page
                     #
+                elif (self.fragmentation_aware and surviving > 0 and
+                          surviving < nblocks // SPARSE_PAGE_FRACTION):
+                    #
+                    # The page is almost empty.  Keep it aside; it is put
+                    # at the end of 'page_for_size' when we are done with
+                    # this size class, so that it has a chance to become
+                    # completely free before we allocate in it again.
+                    page.nextpage = self.sparse_page_for_size[size_class]
+                    self.sparse_page_for_size[size_class] = page
+                    #
                 elif surviving > 0:
                     #
                     # There is at least 1 object surviving.  Re-insert
@@ -470,11 +561,27 @@ class ArenaCollection(object):
             else:
                 step += 1
         #
+        if step == 2 and self.sparse_page_for_size[size_class] != PAGE_NULL:
+            # all pages of this size class have been walked
+            remaining_partial_pages = self._append_sparse_pages(
+                remaining_partial_pages, size_class)
         self.page_for_size[size_class] = remaining_partial_pages
         self.full_page_for_size[size_class] = remaining_full_pages
         return max_pages
 
 
+    def _append_sparse_pages(self, pages, size_class):
+        sparse = self.sparse_page_for_size[size_class]
+        self.sparse_page_for_size[size_class] = PAGE_NULL
+        if pages == PAGE_NULL:
+            return sparse
+        page = pages
+        while page.nextpage != PAGE_NULL:
+            page = page.nextpage
+        page.nextpage = sparse
+        return pages
+
+
     def free_page(self, page):
         """Free a whole page."""
         #
@@ -594,6 +701,13 @@ def _dummy_size(size):
         size = llmemory.sizeof(lltype.Char) * size
     return size
 
+def release_memory(addr, size):
+    """Return to the OS the memory of the pages between 'addr' and
+    'addr + size', which must not contain anything we need any more."""
+    if we_are_translated():
+        from rpython.rlib import rmmap
+        rmmap.madvise_free(addr, size)
+
 def out_of_memory(errmsg):
     """Signal a fatal out-of-memory error and abort.  For situations where
     it is hard to write and test code that would handle a MemoryError
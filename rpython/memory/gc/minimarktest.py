@@ -20,6 +20,8 @@ class SimpleArenaCollection(object):
         self.small_request_threshold = small_request_threshold
         self.all_objects = []
         self.total_memory_used = 0
+        self.fragmentation_aware = False     # ignored
+        self.num_released_pages = 0
 
     def malloc(self, size):
         nsize = raw_malloc_usage(size)
@@ -668,8 +668,169 @@ class TestIncrementalMiniMarkGCSimple(TestMiniMarkGCSimple):
         self.gc.debug_gc_step_until(incminimark.STATE_SCANNING)
         assert self.stackroots[1].x == 13
 
+    def test_stats(self):
+        from rpython.rlib import rgc
+        for i in range(200):
+            self.stackroots.append(self.malloc(S))
+        self.gc.collect()
+        stats = [self.gc.get_stats(i) for i in range(rgc.GC_STATS_COUNT)]
+        for phase in range(len(rgc.GC_PHASES)):
+            base = phase * rgc.GC_PAUSE_STATS
+            count = stats[base + rgc.GC_PAUSE_COUNT]
+            assert count > 0
+            histogram = stats[base + rgc.GC_PAUSE_HISTOGRAM:
+                              base + rgc.GC_PAUSE_STATS]
+            assert sum(histogram) == count
+            assert (stats[base + rgc.GC_PAUSE_MAX_TIME] <=
+                    stats[base + rgc.GC_PAUSE_TOTAL_TIME])
+        # every object survived
+        allocated = stats[rgc.GC_STAT_NURSERY_ALLOCATED]
+        survived = stats[rgc.GC_STAT_NURSERY_SURVIVED]
+        assert survived == 200 * llmemory.raw_malloc_usage(
+            self.gc.gcheaderbuilder.size_gc_header + llmemory.sizeof(S))
+        assert allocated >= survived
+        assert stats[rgc.GC_STAT_MAJOR_COLLECTIONS] == self.gc.num_major_collects
+        #
+        self.stackroots.append(self.malloc(VAR, 100))
+        assert (self.gc.get_stats(rgc.GC_STAT_RAWMALLOCED) >=
+                100 * llmemory.raw_malloc_usage(llmemory.sizeof(lltype.Ptr(S))))
+        self.gc.raw_malloc_memory_pressure(1234)
+        assert self.gc.get_stats(rgc.GC_STAT_MEMORY_PRESSURE) == 1234
+        assert self.gc.get_stats(rgc.GC_STATS_COUNT) == 0
+
+    def test_allocation_sampling(self):
+        from rpython.rlib import rgc
+        samples = []
+        def hook(typeindex, size):
+            samples.append((typeindex, size))
+            self.malloc(S)      # allocating from the hook is fine
+        hook_ptr = lltype.functionptr(rgc.ALLOCATION_SAMPLE_HOOK, 'hook',
+                                      _callable=hook)
+        size = llmemory.raw_malloc_usage(
+            self.gc.gcheaderbuilder.size_gc_header + llmemory.sizeof(S))
+        every = 20 * size
+        self.gc.set_allocation_sampling(hook_ptr, every)
+        for i in range(2000):
+            self.malloc(S)
+        self.gc.set_allocation_sampling(hook_ptr, 0)
+        for i in range(2000):
+            self.malloc(S)
+        # one sample per 20 objects, not counting the ones from the hook
+        assert 2000 // 21 - 5 <= len(samples) <= 2000 // 20 + 5
+        typeindex = self.gc.get_member_index(self.get_type_id(S))
+        assert samples == [(typeindex, size)] * len(samples)
+
+    def test_memory_ceiling(self):
+        # a heap-filling workload under a small fixed-size memory must
+        # get MemoryError, repeatedly, instead of a fatal error
+        self.gc.set_memory_ceiling(4000 * WORD)
+        assert self.gc.max_heap_size == 3000 * WORD
+        for attempt in range(3):
+            head = lltype.nullptr(S)
+            self.stackroots.append(head)
+            py.test.raises(MemoryError, self._fill_memory)
+            assert self.gc.get_total_memory_used() <= self.gc.max_heap_size
+            # drop everything; then we can allocate again
+            del self.stackroots[:]
+            self.gc.collect()
+            assert self.gc.get_total_memory_used() < 100 * WORD
+            self.malloc(S)
+
+    def _fill_memory(self):
+        while True:
+            p = self.malloc(S)
+            self.write(p, 'next', self.stackroots[0])
+            self.stackroots[0] = p
+            if len(self.stackroots) < 10:
+                self.stackroots.append(self.malloc(VAR, 10))
+
+    def test_memory_ceiling_keeps_lower_max_heap_size(self):
+        self.gc.set_max_heap_size(1000 * WORD)
+        self.gc.set_memory_ceiling(4000 * WORD)
+        assert self.gc.max_heap_size == 1000 * WORD
+        assert self.gc.memory_ceiling == 4000 * WORD
+
+    def test_nursery_size_policy(self):
+        from rpython.memory.gc import incminimark
+        gc = self.gc
+        gc._setup_adaptive_nursery(128 * WORD)
+        assert gc.nursery_size_min == 16 * WORD    # minimal nursery size
+        assert gc.nursery_size_max == 128 * WORD
+        grow = incminimark.NURSERY_GROW_SURVIVAL
+        shrink = incminimark.NURSERY_SHRINK_SURVIVAL
+        often = incminimark.NURSERY_GROW_TIME_SHARE
+        assert gc._nursery_size_policy(grow, often) == 64 * WORD
+        assert gc._nursery_size_policy(grow, often / 2) == 32 * WORD
+        assert gc._nursery_size_policy((grow + shrink) / 2, 1.0) == 32 * WORD
+        assert gc._nursery_size_policy(shrink, 1.0) == 16 * WORD
+        gc.nursery_size = 128 * WORD
+        assert gc._nursery_size_policy(0.0, 1.0) == 128 * WORD
+        gc.nursery_size = 16 * WORD
+        assert gc._nursery_size_policy(1.0, 1.0) == 16 * WORD
+
+    def test_adaptive_nursery(self, monkeypatch):
+        from rpython.memory.gc import incminimark
+        from rpython.rlib import rgc
+        monkeypatch.setattr(incminimark, 'NURSERY_GROW_TIME_SHARE', 0.0)
+        gc = self.gc
+        assert gc.get_stats(rgc.GC_STAT_NURSERY_SIZE) == 32 * WORD
+        # nothing survives: the nursery grows up to its maximum size
+        for i in range(500):
+            self.malloc(S)
+        assert gc.nursery_size == 128 * WORD
+        assert gc.get_stats(rgc.GC_STAT_NURSERY_SIZE) == 128 * WORD
+        assert gc.get_stats(rgc.GC_STAT_NURSERY_RESIZES) == 2
+        bigobj = gc.nonlarge_max + 1
+        assert gc.gc_increment_step == 4 * 128 * WORD
+        assert gc.max_number_of_pinned_objects == 128 * WORD / (bigobj * 2)
+        # everything survives: the nursery shrinks down to its minimum size
+        for i in range(200):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        assert gc.nursery_size == 16 * WORD
+        assert gc.get_stats(rgc.GC_STAT_NURSERY_RESIZES) == 5
+        assert gc.gc_increment_step == 4 * 16 * WORD
+        assert gc.max_number_of_pinned_objects == 16 * WORD / (bigobj * 2)
+        gc.collect()
+        assert [p.x for p in self.stackroots] == range(200)
+    test_adaptive_nursery.GC_PARAMS = {'nursery_size_max': 128 * WORD}
+
+    def test_resize_nursery_keeps_increment_step_from_env(self):
+        gc = self.gc
+        gc.gc_increment_step = 12345 * WORD
+        gc.gc_increment_step_from_env = True
+        gc._resize_nursery(gc.nursery_size // 2)
+        assert gc.gc_increment_step == 12345 * WORD
+        bigobj = gc.nonlarge_max + 1
+        assert gc.max_number_of_pinned_objects == (
+            gc.nursery_size / (bigobj * 2))
+
 class TestIncrementalMiniMarkGCFull(DirectGCTest):
     from rpython.memory.gc.incminimark import IncrementalMiniMarkGC as GCClass
+    def test_release_free_pages(self):
+        from rpython.rlib import rgc
+        self.gc.ac.fragmentation_aware = True
+        for i in range(300):
+            p = self.malloc(S)
+            p.x = i
+            self.stackroots.append(p)
+        self.gc.collect()
+        assert self.gc.get_stats(rgc.GC_STAT_RELEASED_MEMORY) == 0
+        # keep one object out of ten: most pages are now free, but most
+        # arenas are still partially used
+        self.stackroots[:] = self.stackroots[::10]
+        self.gc.collect()
+        released = self.gc.get_stats(rgc.GC_STAT_RELEASED_MEMORY)
+        assert released > 0
+        assert released == self.gc.ac.num_released_pages * self.gc.ac.page_size
+        # the released pages are reused
+        for i in range(300):
+            self.stackroots.append(self.malloc(S))
+        self.gc.collect()
+        assert self.gc.ac.num_released_pages * self.gc.ac.page_size < released
+        assert [p.x for p in self.stackroots[:30]] == range(0, 300, 10)
+
     def test_malloc_fixedsize_no_cleanup(self):
         p = self.malloc(S)
         import pytest
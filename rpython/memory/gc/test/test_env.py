@@ -28,6 +28,10 @@ def test_get_total_memory():
     # total memory should be at least a megabyte
     assert env.get_total_memory() > 1024*1024
 
+def test_get_memory_ceiling():
+    # only emscripten has a fixed-size memory
+    assert env.get_memory_ceiling() == 0
+
 def test_read_from_env():
     saved = os.environ
     try:
@@ -402,11 +402,61 @@ def test_mass_free_half_page_becomes_more_free():
 
 # ____________________________________________________________
 
-def test_random(incremental=False):
+def test_release_free_pages():
+    from rpython.memory.gc.minimarkpage import ARENA_NULL
+    pagesize = hdrsize + 7*WORD
+    ac = arena_collection_for_test(pagesize, "2222", fill_with_objects=2)
+    ac.fragmentation_aware = True
+    # put the arena aside, as if we had started to allocate from another one
+    arena = ac.current_arena
+    ac.current_arena = ARENA_NULL
+    arena.nextarena = ARENA_NULL
+    ac.arenas_lists[0] = arena
+    page_of = lambda addr: (addr - ac._startpageaddr) // pagesize
+    ok_to_free = OkToFree(ac, lambda addr: page_of(addr) in (0, 2))
+    ac.mass_free(ok_to_free)
+    # the two free pages were released
+    assert arena.nfreepages == 2
+    assert arena.nreleasedpages == 2
+    assert arena.freepages == NULL
+    assert ac.num_released_pages == 2
+    released = [arena.releasedpages[0], arena.releasedpages[1]]
+    assert sorted(released) == [pagenum(ac, 0), pagenum(ac, 2)]
+    #
+    # they are reused like free pages
+    del ac.allocate_new_arena    # restore the one from the class
+    obj = ac.malloc(3*WORD)
+    assert ac.current_arena == arena
+    assert page_of(obj) == page_of(released[1])
+    assert arena.nreleasedpages == 1
+    obj = ac.malloc(4*WORD)
+    assert page_of(obj) == page_of(released[0])
+    assert ac.current_arena == ARENA_NULL
+    assert arena.nfreepages == arena.nreleasedpages == 0
+    assert ac.num_released_pages == 0
+
+def test_sparse_pages_last():
+    pagesize = hdrsize + 24*WORD
+    ac = arena_collection_for_test(pagesize, "11", fill_with_objects=1)
+    ac.fragmentation_aware = True
+    # keep only one object in page 0, and all objects in page 1
+    ok_to_free = OkToFree(ac, lambda addr: (addr - ac._startpageaddr)
+                                           // pagesize == 0 and
+                                           (addr - ac._startpageaddr)
+                                           % pagesize > hdrsize)
+    ac.mass_free(ok_to_free)
+    page = ac.page_for_size[1]
+    checkpage(ac, page, 1)
+    checkpage(ac, page.nextpage, 0)
+    assert page.nextpage.nextpage == PAGE_NULL
+    assert ac.sparse_page_for_size[1] == PAGE_NULL
+
+def test_random(incremental=False, fragmentation_aware=False):
     import random
     pagesize = hdrsize + 24*WORD
     num_pages = 3
     ac = arena_collection_for_test(pagesize, " " * num_pages)
+    ac.fragmentation_aware = fragmentation_aware
     live_objects = {}
     #
     # Run the test until three arenas are freed.  This is a quick test
@@ -477,3 +527,9 @@ def test_random(incremental=False):
 
 def test_random_incremental():
     test_random(incremental=True)
+
+def test_random_fragmentation_aware():
+    test_random(fragmentation_aware=True)
+
+def test_random_incremental_fragmentation_aware():
+    test_random(incremental=True, fragmentation_aware=True)
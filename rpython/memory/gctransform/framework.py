@@ -2,6 +2,7 @@ from rpython.annotator import model as annmodel
 from rpython.rtyper.llannotation import SomeAddress, SomePtr
 from rpython.rlib import rgc
 from rpython.rlib.objectmodel import specialize
+from rpython.rlib.rarithmetic import r_longlong
 from rpython.rlib.unroll import unrolling_iterable
 from rpython.rtyper import rmodel, annlowlevel
 from rpython.rtyper.lltypesystem import lltype, llmemory, rffi, llgroup
@@ -326,6 +327,18 @@ class BaseFrameworkGCTransformer(GCTransformer):
         else:
             self.shrink_array_ptr = None
 
+        if hasattr(GCClass, 'get_stats'):
+            self.get_stats_ptr = getfn(GCClass.get_stats.im_func,
+                    [s_gc, annmodel.SomeInteger()],
+                    annmodel.SomeInteger(knowntype=r_longlong))
+
+        if hasattr(GCClass, 'set_allocation_sampling'):
+            self.set_allocation_sampling_ptr = getfn(
+                GCClass.set_allocation_sampling.im_func,
+                [s_gc, SomePtr(lltype.Ptr(rgc.ALLOCATION_SAMPLE_HOOK)),
+                 annmodel.SomeInteger()],
+                annmodel.s_None)
+
         if hasattr(GCClass, 'heap_stats'):
             self.heap_stats_ptr = getfn(GCClass.heap_stats.im_func,
                     [s_gc], SomePtr(lltype.Ptr(ARRAY_TYPEID_MAP)),
@@ -791,6 +804,21 @@ class BaseFrameworkGCTransformer(GCTransformer):
         hop.genop("direct_call", [self.write_barrier_ptr,
                                   self.c_const_gc, v_addr])
 
+    def gct_gc_get_stats(self, hop):
+        if not hasattr(self, 'get_stats_ptr'):
+            return GCTransformer.gct_gc_get_stats(self, hop)
+        [v_stat_no] = hop.spaceop.args
+        hop.genop("direct_call", [self.get_stats_ptr, self.c_const_gc,
+                                  v_stat_no],
+                  resultvar=hop.spaceop.result)
+
+    def gct_gc_set_allocation_sampling(self, hop):
+        if not hasattr(self, 'set_allocation_sampling_ptr'):
+            return GCTransformer.gct_gc_set_allocation_sampling(self, hop)
+        [v_hook, v_every] = hop.spaceop.args
+        hop.genop("direct_call", [self.set_allocation_sampling_ptr,
+                                  self.c_const_gc, v_hook, v_every])
+
     def gct_gc_heap_stats(self, hop):
         if not hasattr(self, 'heap_stats_ptr'):
             return GCTransformer.gct_gc_heap_stats(self, hop)
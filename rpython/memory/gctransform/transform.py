@@ -376,6 +376,12 @@ class BaseGCTransformer(object):
         return hop.cast_result(rmodel.inputconst(lltype.Ptr(ARRAY_TYPEID_MAP),
                                         lltype.nullptr(ARRAY_TYPEID_MAP)))
 
+    def gct_gc_get_stats(self, hop):
+        return hop.cast_result(rmodel.inputconst(lltype.SignedLongLong, 0))
+
+    def gct_gc_set_allocation_sampling(self, hop):
+        pass      # not supported: just remove the operation
+
 class MinimalGCTransformer(BaseGCTransformer):
     def __init__(self, parenttransformer):
         BaseGCTransformer.__init__(self, parenttransformer.translator)
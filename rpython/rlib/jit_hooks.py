@@ -140,3 +140,16 @@ LOOP_RUN_CONTAINER = lltype.GcArray(lltype.Struct('elem',
 @register_helper(lltype.Ptr(LOOP_RUN_CONTAINER))
 def stats_get_loop_run_times(warmrunnerdesc):
     return warmrunnerdesc.metainterp_sd.cpu.get_all_loop_runs()
+
+FUNC_STATS_CONTAINER = lltype.GcArray(lltype.Struct('elem',
+                                      ('funcid', lltype.Signed),
+                                      ('source_bytes', lltype.Signed),
+                                      ('num_blocks', lltype.Signed),
+                                      ('num_reassemblies', lltype.Signed),
+                                      ('num_merges', lltype.Signed),
+                                      ('generate_ms', lltype.Float),
+                                      ('compile_ms', lltype.Float)))
+
+@register_helper(lltype.Ptr(FUNC_STATS_CONTAINER))
+def stats_get_func_stats(warmrunnerdesc):
+    return warmrunnerdesc.metainterp_sd.cpu.get_all_func_stats()
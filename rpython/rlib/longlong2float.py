@@ -8,7 +8,7 @@ in which it does not work.
 
 from __future__ import with_statement
 from rpython.annotator import model as annmodel
-from rpython.rlib.rarithmetic import r_int64
+from rpython.rlib.rarithmetic import intmask, r_int64
 from rpython.rtyper.lltypesystem import lltype, rffi
 from rpython.rtyper.extregistry import ExtRegistryEntry
 from rpython.translator.tool.cbuild import ExternalCompilationInfo
@@ -99,3 +99,37 @@ class LongLong2FloatEntry(ExtRegistryEntry):
         [v_longlong] = hop.inputargs(lltype.SignedLongLong)
         hop.exception_cannot_occur()
         return hop.genop("convert_longlong_bytes_to_float", [v_longlong], resulttype=lltype.Float)
+
+
+# -------- NaN-boxing of 32-bit integers inside 64-bit floats --------
+#
+# A long long is either the bit pattern of a float, or a 32-bit integer
+# stored in the low half of a NaN whose high half is TAG_NAN_HIGH.  That
+# NaN is never produced by float arithmetic; a float that happens to have
+# exactly this high half cannot be stored this way (see can_encode_float).
+
+TAG_NAN_HIGH = 0x7FF40000
+TAG_NAN = r_int64(TAG_NAN_HIGH) << 32
+
+def can_encode_int32(value):
+    return value == rffi.cast(lltype.Signed, rffi.cast(rffi.INT, value))
+
+def can_encode_float(value):
+    return intmask(float2longlong(value) >> 32) != TAG_NAN_HIGH
+
+def is_int32_from_longlong_nan(value):
+    return intmask(value >> 32) == TAG_NAN_HIGH
+
+def encode_int32_into_longlong_nan(value):
+    return TAG_NAN + rffi.cast(rffi.LONGLONG, rffi.cast(rffi.UINT, value))
+
+def decode_int32_from_longlong_nan(value):
+    return rffi.cast(lltype.Signed, rffi.cast(rffi.INT, value))
+
+def maybe_decode_longlong_as_float(value):
+    """Return the float stored in value, or the value of the encoded
+    integer as a float.  The conversion is exact, because the integers
+    have only 32 bits."""
+    if is_int32_from_longlong_nan(value):
+        return float(decode_int32_from_longlong_nan(value))
+    return longlong2float(value)
@@ -770,11 +770,13 @@ class _r_dictkey(object):
 
 
 @specialize.call_location()
-def prepare_dict_update(dict, n_elements):
+def prepare_dict_update(dict, n_elements, exact=False):
     """RPython hint that the given dict (or r_dict) will soon be
-    enlarged by n_elements."""
+    enlarged by n_elements.  If 'exact' is True, the dict is being filled
+    once and for all, e.g. when copying another one into a fresh dict:
+    don't over-allocate for further growth."""
     if we_are_translated():
-        dict._prepare_dict_update(n_elements)
+        dict._prepare_dict_update(n_elements, exact)
         # ^^ call an extra method that doesn't exist before translation
 
 @specialize.call_location()
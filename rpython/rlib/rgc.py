@@ -188,6 +188,82 @@ def needs_write_barrier(obj):
         return False
     return can_move(obj)
 
+# Statistics kept by the GC, returned by get_gc_stats(stat_no).  For each
+# of the GC_PHASES there are GC_PAUSE_STATS numbers, starting at
+# 'phase * GC_PAUSE_STATS': the number of pauses, their total and maximum
+# duration, and a histogram where the bucket 'k' counts the pauses that
+# took less than 2**k (and, if k > 0, at least 2**(k-1)).  Durations are in
+# the units of read_timestamp(), like the timestamps in PYPYLOG.  The other
+# statistics follow.
+
+GC_PHASES = ['minor', 'marking', 'sweeping', 'finalizing']
+GC_PAUSE_COUNT = 0
+GC_PAUSE_TOTAL_TIME = 1
+GC_PAUSE_MAX_TIME = 2
+GC_PAUSE_HISTOGRAM = 3
+GC_PAUSE_HISTOGRAM_SIZE = 40
+GC_PAUSE_STATS = GC_PAUSE_HISTOGRAM + GC_PAUSE_HISTOGRAM_SIZE
+
+GC_STAT_NURSERY_ALLOCATED = len(GC_PHASES) * GC_PAUSE_STATS  # bytes
+GC_STAT_NURSERY_SURVIVED = GC_STAT_NURSERY_ALLOCATED + 1     # bytes
+GC_STAT_RAWMALLOCED = GC_STAT_NURSERY_ALLOCATED + 2          # bytes
+GC_STAT_MEMORY_PRESSURE = GC_STAT_NURSERY_ALLOCATED + 3      # bytes
+GC_STAT_MAJOR_COLLECTIONS = GC_STAT_NURSERY_ALLOCATED + 4
+GC_STAT_RELEASED_MEMORY = GC_STAT_NURSERY_ALLOCATED + 5      # bytes
+GC_STAT_NURSERY_SIZE = GC_STAT_NURSERY_ALLOCATED + 6         # bytes
+GC_STAT_NURSERY_RESIZES = GC_STAT_NURSERY_ALLOCATED + 7
+GC_STATS_COUNT = GC_STAT_NURSERY_ALLOCATED + 8
+
+def get_gc_stats(stat_no):
+    """Return one of the GC statistics listed above, as a r_longlong.
+    Only some GCs keep them; the others, as well as running untranslated,
+    return 0.
+    """
+    from rpython.rlib.rarithmetic import r_longlong
+    return r_longlong(0)
+
+class GetGcStatsEntry(ExtRegistryEntry):
+    _about_ = get_gc_stats
+
+    def compute_result_annotation(self, s_stat_no):
+        from rpython.annotator import model as annmodel
+        from rpython.rlib.rarithmetic import r_longlong
+        return annmodel.SomeInteger(knowntype=r_longlong)
+
+    def specialize_call(self, hop):
+        [v_stat_no] = hop.inputargs(lltype.Signed)
+        hop.exception_cannot_occur()
+        return hop.genop('gc_get_stats', [v_stat_no],
+                         resulttype=hop.r_result)
+
+# Allocation sampling: the GC calls 'hook(typeindex, size)' about once
+# every 'every' bytes allocated in the nursery.  'typeindex' is the same as
+# returned by get_rpy_type_index(), or -1 if unknown (e.g. for allocations
+# done by the JIT).  The hook is called from inside the allocation, so it
+# should do as little as possible.
+
+ALLOCATION_SAMPLE_HOOK = lltype.FuncType([lltype.Signed, lltype.Signed],
+                                         lltype.Void)
+
+def set_allocation_sampling(hook, every):
+    """Start calling 'hook', a pointer to an ALLOCATION_SAMPLE_HOOK, about
+    once every 'every' bytes of nursery allocation; or stop if 'every' is 0.
+    Only some GCs support it; ignored when running untranslated.
+    """
+
+class SetAllocationSamplingEntry(ExtRegistryEntry):
+    _about_ = set_allocation_sampling
+
+    def compute_result_annotation(self, s_hook, s_every):
+        from rpython.annotator import model as annmodel
+        return annmodel.s_None
+
+    def specialize_call(self, hop):
+        v_hook, v_every = hop.inputargs(hop.args_r[0], lltype.Signed)
+        hop.exception_cannot_occur()
+        return hop.genop('gc_set_allocation_sampling', [v_hook, v_every],
+                         resulttype=lltype.Void)
+
 def _heap_stats():
     raise NotImplementedError # can't be run directly
 
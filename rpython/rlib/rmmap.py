@@ -61,7 +61,8 @@ if _POSIX:
                       'MS_SYNC']
     opt_constant_names = ['MAP_ANON', 'MAP_ANONYMOUS', 'MAP_NORESERVE',
                           'PROT_EXEC',
-                          'MAP_DENYWRITE', 'MAP_EXECUTABLE']
+                          'MAP_DENYWRITE', 'MAP_EXECUTABLE',
+                          'MADV_DONTNEED']
     for name in constant_names:
         setattr(CConfig, name, rffi_platform.ConstantInteger(name))
     for name in opt_constant_names:
@@ -149,6 +150,9 @@ if _POSIX:
                                    save_err_on_unsafe=rffi.RFFI_SAVE_ERRNO)
     # 'mmap' on linux32 is a macro that calls 'mmap64'
     _, c_munmap_safe = external('munmap', [PTR, size_t], rffi.INT)
+    if MADV_DONTNEED is not None:
+        _, c_madvise_safe = external('madvise', [PTR, size_t, rffi.INT],
+                                     rffi.INT)
     c_msync, _ = external('msync', [PTR, size_t, rffi.INT], rffi.INT,
                           save_err_on_unsafe=rffi.RFFI_SAVE_ERRNO)
     if has_mremap:
@@ -709,6 +713,28 @@ if _POSIX:
         res = c_mmap_safe(addr, map_size, prot, flags, -1, 0)
         return res == addr
 
+    def madvise_free(addr, map_size):
+        """Tell the OS that we don't need the content of the memory pages
+        fully contained between 'addr' and 'addr + map_size' any more, so
+        that it can reuse the physical memory.  The pages stay mapped and
+        come back, zero-filled, the next time they are touched.  Returns
+        the number of bytes released, which can be 0.
+        """
+        if MADV_DONTNEED is None:
+            return 0
+        start = rffi.cast(lltype.Signed, addr)
+        end = start + map_size
+        start = (start + PAGESIZE - 1) & ~(PAGESIZE - 1)
+        end = end & ~(PAGESIZE - 1)
+        if end <= start:
+            return 0
+        res = c_madvise_safe(rffi.cast(PTR, start),
+                             rffi.cast(size_t, end - start),
+                             rffi.cast(rffi.INT, MADV_DONTNEED))
+        if rffi.cast(lltype.Signed, res) != 0:
+            return 0
+        return end - start
+
     # XXX is this really necessary?
     class Hint:
         pos = -0x4fff0000   # for reproducible results
@@ -896,4 +922,10 @@ elif _MS_WINDOWS:
     def free(ptr, map_size):
         VirtualFree_safe(ptr, 0, MEM_RELEASE)
 
+    def madvise_free(addr, map_size):
+        """Not implemented on Windows: always releases 0 bytes."""
+        # XXX could use VirtualAlloc(MEM_RESET) on pages that we got from
+        # VirtualAlloc() ourselves
+        return 0
+
 # register_external here?
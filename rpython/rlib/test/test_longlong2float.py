@@ -1,6 +1,10 @@
 from rpython.translator.c.test.test_genc import compile
 from rpython.rlib.longlong2float import longlong2float, float2longlong
 from rpython.rlib.longlong2float import uint2singlefloat, singlefloat2uint
+from rpython.rlib.longlong2float import (
+    can_encode_int32, can_encode_float, is_int32_from_longlong_nan,
+    encode_int32_into_longlong_nan, decode_int32_from_longlong_nan,
+    maybe_decode_longlong_as_float)
 from rpython.rlib.rarithmetic import r_singlefloat
 from rpython.rtyper.test.test_llinterp import interpret
 
@@ -63,3 +67,47 @@ def test_compiled_single():
     for x in enum_floats():
         res = fn2(x)
         assert repr(res) == repr(float(r_singlefloat(x)))
+
+# ____________________________________________________________
+
+def enum_int32s():
+    yield 0
+    yield 1
+    yield -1
+    yield 42
+    yield 2**31 - 1
+    yield -2**31
+
+def test_encode_int32_roundtrip():
+    for x in enum_int32s():
+        assert can_encode_int32(x)
+        ll = encode_int32_into_longlong_nan(x)
+        assert is_int32_from_longlong_nan(ll)
+        assert decode_int32_from_longlong_nan(ll) == x
+        assert maybe_decode_longlong_as_float(ll) == float(x)
+
+def test_floats_are_not_encoded_ints():
+    for x in enum_floats():
+        assert can_encode_float(x)
+        ll = float2longlong(x)
+        assert not is_int32_from_longlong_nan(ll)
+        assert repr(maybe_decode_longlong_as_float(ll)) == repr(x)
+
+def test_cannot_encode():
+    import sys
+    if sys.maxint > 2**31:
+        assert not can_encode_int32(2**31)
+        assert not can_encode_int32(-2**31 - 1)
+    tagged = longlong2float(encode_int32_into_longlong_nan(5))
+    assert not can_encode_float(tagged)
+
+def test_encode_int32_interpreted():
+    def f(x):
+        ll = encode_int32_into_longlong_nan(x)
+        if not is_int32_from_longlong_nan(ll):
+            return -1.0
+        return maybe_decode_longlong_as_float(ll) + decode_int32_from_longlong_nan(ll)
+
+    for x in [0, 5, -7, 2**31 - 1]:
+        res = interpret(f, [x])
+        assert res == 2.0 * x
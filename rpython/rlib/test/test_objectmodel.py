@@ -329,6 +329,16 @@ class TestObjectModel(BaseRtypingTest):
         res = self.interpret(g, [3])
         assert res == 42     # "did not crash"
 
+    def test_prepare_dict_update_exact(self):
+        def g(n):
+            d = {}
+            prepare_dict_update(d, n, exact=True)
+            for i in range(n):
+                d[i] = i
+            return len(d)
+        res = self.interpret(g, [3])
+        assert res == 3
+
     def test_prepare_dict_update_2(self):
         try:
             from collections import OrderedDict
@@ -497,3 +497,22 @@ def test_compile_alloc_free():
 
     fn = compile(test_alloc_free, [], gcpolicy='boehm')
     fn()
+
+def test_madvise_free():
+    from rpython.rlib.rmmap import madvise_free, PAGESIZE
+    map_size = 4 * PAGESIZE
+    data = alloc(map_size)
+    for i in range(4):
+        data[i * PAGESIZE] = 'X'
+    res = madvise_free(rffi.ptradd(data, 1), 2 * PAGESIZE)
+    if os.name == 'nt':
+        assert res == 0
+    else:
+        # only the second page is fully inside the range
+        assert res == PAGESIZE
+        assert data[PAGESIZE] == '\x00'
+    assert data[0] == 'X'
+    assert data[2 * PAGESIZE] == 'X'
+    data[PAGESIZE] = 'Y'      # still usable
+    assert data[PAGESIZE] == 'Y'
+    free(data, map_size)
@@ -785,6 +785,12 @@ class LLFrame(object):
     def op_gc_heap_stats(self):
         raise NotImplementedError
 
+    def op_gc_get_stats(self, stat_no):
+        raise NotImplementedError("gc_get_stats")
+
+    def op_gc_set_allocation_sampling(self, hook, every):
+        raise NotImplementedError("gc_set_allocation_sampling")
+
     def op_gc_obtain_free_space(self, size):
         raise NotImplementedError
 
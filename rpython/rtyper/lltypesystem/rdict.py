@@ -288,7 +288,7 @@ class DictRepr(AbstractDictRepr):
         return hop.gendirectcall(ll_update, v_dic1, v_dic2)
 
     def rtype_method__prepare_dict_update(self, hop):
-        v_dict, v_num = hop.inputargs(self, lltype.Signed)
+        v_dict, v_num, _ = hop.inputargs(self, lltype.Signed, lltype.Void)
         hop.exception_cannot_occur()
         hop.gendirectcall(ll_prepare_dict_update, v_dict, v_num)
 
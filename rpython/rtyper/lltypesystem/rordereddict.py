@@ -299,9 +299,13 @@ class OrderedDictRepr(AbstractDictRepr):
         return hop.gendirectcall(ll_dict_update, v_dic1, v_dic2)
 
     def rtype_method__prepare_dict_update(self, hop):
-        v_dict, v_num = hop.inputargs(self, lltype.Signed)
+        v_dict, v_num, _ = hop.inputargs(self, lltype.Signed, lltype.Void)
         hop.exception_cannot_occur()
-        hop.gendirectcall(ll_prepare_dict_update, v_dict, v_num)
+        if hop.args_s[2].const:
+            ll_func = ll_prepare_dict_fill
+        else:
+            ll_func = ll_prepare_dict_update
+        hop.gendirectcall(ll_func, v_dict, v_num)
 
     def _rtype_method_kvi(self, hop, ll_func):
         v_dic, = hop.inputargs(self)
@@ -1165,6 +1169,44 @@ def ll_prepare_dict_update(d, num_extra):
     x = num_extra - d.num_live_items
     jit.conditional_call(d.resize_counter <= x * 3,
                          _ll_dict_resize_to, d, num_extra)
+    # Also make room in 'd.entries' for 'num_extra' more items in one
+    # step.  This over-allocates like ll_dict_grow(), so that repeated
+    # updates with a few items each don't copy 'd.entries' every time.
+    jit.conditional_call(len(d.entries) < d.num_ever_used_items + num_extra,
+                         _ll_dict_reserve_entries, d, num_extra, False)
+
+def ll_prepare_dict_fill(d, num_extra):
+    # Like ll_prepare_dict_update(), for a dict that is about to get
+    # exactly 'num_extra' items and no more for now, like the fresh storage
+    # of a W_DictMultiObject that switches strategy: 'd.entries' gets
+    # exactly the required length, so that a small dict doesn't carry
+    # around up to 8 unused entries.
+    x = num_extra - d.num_live_items
+    jit.conditional_call(d.resize_counter <= x * 3,
+                         _ll_dict_resize_to, d, num_extra)
+    jit.conditional_call(len(d.entries) < d.num_ever_used_items + num_extra,
+                         _ll_dict_reserve_entries, d, num_extra, True)
+
+@jit.dont_look_inside
+def _ll_dict_reserve_entries(d, num_extra, exact):
+    new_allocated = d.num_ever_used_items + num_extra
+    if not exact:
+        new_allocated = _overallocate_entries_len(new_allocated)
+    # Like in ll_dict_grow(), the entry indexes must fit into 'd.indexes';
+    # if they would not, leave it to ll_dict_grow() to sort it out later.
+    fun = d.lookup_function_no & FUNC_MASK
+    if fun == FUNC_BYTE:
+        if new_allocated > ((1 << 8) - MIN_INDEXES_MINUS_ENTRIES):
+            return
+    elif fun == FUNC_SHORT:
+        if new_allocated > ((1 << 16) - MIN_INDEXES_MINUS_ENTRIES):
+            return
+    elif IS_64BIT and fun == FUNC_INT:
+        if new_allocated > ((1 << 32) - MIN_INDEXES_MINUS_ENTRIES):
+            return
+    newitems = lltype.malloc(lltype.typeOf(d).TO.entries.TO, new_allocated)
+    rgc.ll_arraycopy(d.entries, newitems, 0, 0, d.num_ever_used_items)
+    d.entries = newitems
 
 # this is an implementation of keys(), values() and items()
 # in a single function.
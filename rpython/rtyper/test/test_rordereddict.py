@@ -300,6 +300,44 @@ class TestRDictDirect(object):
         rordereddict.ll_prepare_dict_update(ll_d, 7)
         # used to get UninitializedMemoryAccess
 
+    def test_prepare_dict_fill_reserves_exact_entries(self):
+        DICT = self._get_str_dict()
+        ll_d = rordereddict.ll_newdict(DICT)
+        rordereddict.ll_prepare_dict_fill(ll_d, 3)
+        assert len(ll_d.entries) == 3
+        for i in range(3):
+            rordereddict.ll_dict_setitem(ll_d, llstr(chr(i)), i)
+        assert len(ll_d.entries) == 3
+        rordereddict.ll_prepare_dict_fill(ll_d, 20)
+        assert len(ll_d.entries) == 23
+        for i in range(3, 23):
+            rordereddict.ll_dict_setitem(ll_d, llstr(chr(i)), i)
+        assert len(ll_d.entries) == 23
+        for i in range(23):
+            assert rordereddict.ll_dict_getitem(ll_d, llstr(chr(i))) == i
+        # no room left, so it grows as usual
+        rordereddict.ll_dict_setitem(ll_d, llstr("x"), 42)
+        assert len(ll_d.entries) > 24
+
+    def test_prepare_dict_update_overallocates_entries(self):
+        DICT = self._get_str_dict()
+        ll_d = rordereddict.ll_newdict(DICT)
+        rordereddict.ll_prepare_dict_update(ll_d, 3)
+        assert len(ll_d.entries) > 3
+        # many updates with one item each don't copy 'entries' every time
+        ll_d = rordereddict.ll_newdict(DICT)
+        ll_d2 = rordereddict.ll_newdict(DICT)
+        reallocations = 0
+        for i in range(300):
+            rordereddict.ll_dict_setitem(ll_d2, llstr(str(i)), i)
+            entries = ll_d.entries
+            rordereddict.ll_dict_update(ll_d, ll_d2)
+            if ll_d.entries != entries:
+                reallocations += 1
+            rordereddict.ll_dict_delitem(ll_d2, llstr(str(i)))
+        assert rordereddict.ll_dict_len(ll_d) == 300
+        assert reallocations <= 20
+
 class TestRDictDirectDummyKey(TestRDictDirect):
     class dummykeyobj:
         ll_dummy_value = llstr("dupa")
@@ -0,0 +1,76 @@
+"""Memory footprint of many small dicts rebuilt from other dicts.
+
+This is what happens to the storage of a W_DictMultiObject that switches
+strategy: a fresh dict is filled with the items of the old one.  The new
+dict is prescaled for exactly these items with
+prepare_dict_update(exact=True), unless '--no-prepare' is given.  The
+resident set size (RSS) is only known on Linux.
+
+    dictrss [num_dicts] [--items=N] [--no-prepare]
+"""
+import time
+from rpython.rlib import objectmodel
+from rpython.translator.goal.gcchurn import get_rss
+
+USAGE = """dictrss [num_dicts] [--items=N] [--no-prepare]"""
+
+DEFAULT_DICTS = 1000000
+
+
+class Value(object):
+    def __init__(self, i):
+        self.i = i
+
+
+def rebuild(d, prepare):
+    d_new = {}
+    if prepare:
+        objectmodel.prepare_dict_update(d_new, len(d), exact=True)
+    for key, value in d.iteritems():
+        d_new[key] = value
+    return d_new
+
+def main(num_dicts, items, prepare):
+    print "Dict RSS benchmark: %d dicts of %d items, prepare=%d" % (
+        num_dicts, items, prepare)
+    rss0 = get_rss()
+    t0 = time.time()
+    kept = []
+    for i in range(num_dicts):
+        d = {}
+        for j in range(items):
+            d[i * items + j] = Value(j)
+        kept.append(rebuild(d, prepare))
+    t1 = time.time()
+    print "Completed in %d ms, %d dicts kept, RSS grew by %d KB." % (
+        int((t1 - t0) * 1000.0), len(kept), get_rss() - rss0)
+
+
+def argerror():
+    print "Usage:"
+    print "   ", USAGE
+    return 2
+
+def entry_point(argv):
+    num_dicts = DEFAULT_DICTS
+    items = 2
+    prepare = True
+    for arg in argv[1:]:
+        if arg == '--no-prepare':
+            prepare = False
+        elif arg.startswith('--items='):
+            try:
+                items = int(arg[len('--items='):])
+            except ValueError:
+                return argerror()
+        else:
+            try:
+                num_dicts = int(arg)
+            except ValueError:
+                return argerror()
+    main(num_dicts, items, prepare)
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(entry_point(sys.argv))
@@ -0,0 +1,115 @@
+"""Churn benchmark for the memory footprint of long-running processes.
+
+It alternates phases that allocate many small objects with phases that
+allocate as many bigger objects.  Most objects live long enough to be
+moved out of the nursery, but only one in KEEP stays alive until the end.
+These survivors are spread over all the pages filled by their phase, so
+the pages and arenas stay partially used: the resident set size (RSS)
+shows how much of the free memory in them goes back to the OS, e.g. with
+PYPY_GC_RELEASE_PAGES=1.  The RSS is only known on Linux.
+
+    gcchurn [num_rounds] [--objects=N]
+"""
+import os, time
+
+USAGE = """gcchurn [num_rounds] [--objects=N]"""
+
+KEEP = 16           # keep one object in KEEP alive until the end
+WINDOW = 200000     # the other objects die in batches of this size
+DEFAULT_OBJECTS = 2000000
+
+
+class Base(object):
+    pass
+
+class Small(Base):
+    def __init__(self, i):
+        self.i = i
+
+class Large(Base):
+    def __init__(self, i):
+        self.i = i
+        self.a = i
+        self.b = i
+        self.c = i
+        self.d = i
+        self.e = i
+        self.f = i
+
+
+def get_rss():
+    "Resident set size in KB, or -1 if unknown."
+    from rpython.rlib.rmmap import PAGESIZE
+    try:
+        fd = os.open('/proc/self/statm', os.O_RDONLY, 0)
+    except OSError:
+        return -1
+    try:
+        data = os.read(fd, 200)
+    finally:
+        os.close(fd)
+    fields = data.split(' ')
+    if len(fields) < 2:
+        return -1
+    return int(fields[1]) * (PAGESIZE // 1024)
+
+def churn(large, n, kept):
+    batch = []
+    for i in range(n):
+        if large:
+            obj = Large(i)
+        else:
+            obj = Small(i)
+        if i % KEEP == 0:
+            kept.append(obj)
+        else:
+            batch.append(obj)
+            if len(batch) >= WINDOW:
+                batch = []
+
+def main(rounds, n):
+    print "Churn benchmark: %d rounds of %d objects" % (rounds, n)
+    print "round\tphase\ttime (ms)\tRSS (KB)"
+    kept = []
+    t_start = time.time()
+    for r in range(rounds):
+        for large in [False, True]:
+            t0 = time.time()
+            churn(large, n, kept)
+            t1 = time.time()
+            if large:
+                phase = 'large'
+            else:
+                phase = 'small'
+            print "%d\t%s\t%d\t\t%d" % (r, phase, int((t1 - t0) * 1000.0),
+                                         get_rss())
+    t_finish = time.time()
+    print "Completed in %d ms, %d objects kept, final RSS %d KB." % (
+        int((t_finish - t_start) * 1000.0), len(kept), get_rss())
+
+
+def argerror():
+    print "Usage:"
+    print "   ", USAGE
+    return 2
+
+def entry_point(argv):
+    rounds = 4
+    n = DEFAULT_OBJECTS
+    for arg in argv[1:]:
+        if arg.startswith('--objects='):
+            try:
+                n = int(arg[len('--objects='):])
+            except ValueError:
+                return argerror()
+        else:
+            try:
+                rounds = int(arg)
+            except ValueError:
+                return argerror()
+    main(rounds, n)
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(entry_point(sys.argv))
@@ -0,0 +1,117 @@
+"""Benchmark for programs whose allocation behaviour changes over time.
+
+It alternates two phases that allocate as many objects:
+
+  * 'ingest' builds temporary records and only remembers the latest one
+    for each of a few keys, like a batch job parsing its input: few
+    objects survive minor collections, always about as many;
+
+  * 'serve' stores every new record in a cache where it replaces an
+    older one, like a server keeping recent results: almost everything
+    survives minor collections, and dies later.
+
+The time of each phase, the average pause of its minor collections and
+the size of the nursery at its end show how the GC adapts to the phase,
+e.g. with PYPY_GC_NURSERY_MAX=64M.
+
+    gcphases [num_rounds] [--objects=N]
+"""
+import time
+from rpython.rlib import rgc
+
+USAGE = """gcphases [num_rounds] [--objects=N]"""
+
+NUM_KEYS = 1000
+CACHE_SIZE = 100000
+MINOR_STATS = rgc.GC_PHASES.index('minor') * rgc.GC_PAUSE_STATS
+DEFAULT_OBJECTS = 3000000
+
+
+class Record(object):
+    def __init__(self, key, fields):
+        self.key = key
+        self.fields = fields
+
+    def checksum(self):
+        total = self.key
+        for x in self.fields:
+            total += x
+        return total
+
+
+def make_record(i):
+    return Record(i, [i, i + 1, i + 2])
+
+def ingest(n, latest):
+    total = 0
+    for i in range(n):
+        record = make_record(i)
+        latest[i % len(latest)] = record
+        total += record.checksum()
+    return total
+
+def serve(n, cache):
+    total = 0
+    for i in range(n):
+        record = make_record(i)
+        cache[i % len(cache)] = record
+        total += record.key
+    return total
+
+def get_minor_pauses():
+    return (rgc.get_gc_stats(MINOR_STATS + rgc.GC_PAUSE_COUNT),
+            rgc.get_gc_stats(MINOR_STATS + rgc.GC_PAUSE_TOTAL_TIME))
+
+def main(rounds, n):
+    print "Phases benchmark: %d rounds of %d objects" % (rounds, n)
+    print "round\tphase\ttime (ms)\tminor pause\tnursery (KB)"
+    latest = [None] * NUM_KEYS
+    cache = [None] * CACHE_SIZE
+    t_start = time.time()
+    for r in range(rounds):
+        for phase in ['ingest', 'serve']:
+            count0, total0 = get_minor_pauses()
+            t0 = time.time()
+            if phase == 'ingest':
+                ingest(n, latest)
+            else:
+                serve(n, cache)
+            t1 = time.time()
+            count1, total1 = get_minor_pauses()
+            pause = 0
+            if count1 > count0:
+                pause = (total1 - total0) // (count1 - count0)
+            nursery = rgc.get_gc_stats(rgc.GC_STAT_NURSERY_SIZE) // 1024
+            print "%d\t%s\t%d\t\t%d\t\t%d" % (
+                r, phase, int((t1 - t0) * 1000.0), pause, nursery)
+    t_finish = time.time()
+    print "Completed in %d ms, %d nursery resizes." % (
+        int((t_finish - t_start) * 1000.0),
+        rgc.get_gc_stats(rgc.GC_STAT_NURSERY_RESIZES))
+
+
+def argerror():
+    print "Usage:"
+    print "   ", USAGE
+    return 2
+
+def entry_point(argv):
+    rounds = 4
+    n = DEFAULT_OBJECTS
+    for arg in argv[1:]:
+        if arg.startswith('--objects='):
+            try:
+                n = int(arg[len('--objects='):])
+            except ValueError:
+                return argerror()
+        else:
+            try:
+                rounds = int(arg)
+            except ValueError:
+                return argerror()
+    main(rounds, n)
+    return 0
+
+if __name__ == '__main__':
+    import sys
+    sys.exit(entry_point(sys.argv))
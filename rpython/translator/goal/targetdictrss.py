@@ -0,0 +1,6 @@
+from rpython.translator.goal import dictrss
+
+# _____ Define and setup target ___
+
+def target(*args):
+    return dictrss.entry_point, None
@@ -0,0 +1,6 @@
+from rpython.translator.goal import gcchurn
+
+# _____ Define and setup target ___
+
+def target(*args):
+    return gcchurn.entry_point, None
@@ -0,0 +1,6 @@
+from rpython.translator.goal import gcphases
+
+# _____ Define and setup target ___
+
+def target(*args):
+    return gcphases.entry_point, None
@@ -76,8 +76,8 @@ class EmscriptenPlatform(BasePosix):
       "-s", "EXPORT_ALL=1",
       # Sadly, asmjs requires a fixed pre-allocated array for memory.
       # We default to a modest 64MB; this can be changed in the JS at runtime.
-      # XXX TODO: automatically limit the GC to this much memory.
-      # XXX TODO: ensure that pypy GC can detect when this runs out.
+      # The incminimark GC reads the actual size at startup, limits its heap
+      # to a fraction of it, and raises MemoryError when that runs out.
       "-s", "TOTAL_MEMORY=67108864",
       # Some dummy includes to convince things to compile properly.
       # XXX TODO: only include these when needed.
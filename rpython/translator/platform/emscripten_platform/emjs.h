@@ -53,6 +53,19 @@ typedef enum {
 // Freeing a static handle is safe and has no effect.
 void emjs_free(emjs_handle);
 
+// Handles are allocated from a table of reusable slots, and encode the
+// generation of their slot so that use of a stale handle (one that has
+// already been freed) can be detected.  Freeing a stale handle is safe
+// and has no effect other than being counted.
+void emjs_free_many(emjs_handle* handles, int count);
+
+// Statistics about the handle table, selected by one of the constants below.
+#define EMJS_STAT_LIVE_HANDLES 0
+#define EMJS_STAT_PEAK_HANDLES 1
+#define EMJS_STAT_STALE_FREES 2
+#define EMJS_STAT_TABLE_SIZE 3
+int emjs_handle_stat(int which);
+
 // Duplicate a handle, giving another reference to its referred-to JS value.
 // There may thus be multiple handles poiting to the same JS value, each of
 // which is sufficient to keep it alive.  Duplicating a static handle is
@@ -197,4 +210,49 @@ double emjs_read_double(emjs_handle);
 int emjs_read_str(emjs_handle, char* buffer);
 int emjs_read_strn(emjs_handle, char* buffer, int maxlen);
 
+// Bulk operations, which marshal a whole structure through the heap in a
+// single call rather than making one call per item.  Functions returning
+// a count will return -1 if an error occurred.
+
+// Read up to `maxlen` items from an array-like object, writing a fresh
+// handle and the type of each item into the given output arrays.  Returns
+// the number of items read.
+int emjs_read_items(emjs_handle obj, emjs_handle* handles, emjs_type* types,
+                    int maxlen);
+
+// Get a handle to an array of the object's own enumerable property names.
+emjs_handle emjs_own_keys(emjs_handle obj);
+
+// Like emjs_read_items, but reading the properties named in array `keys`.
+int emjs_read_props(emjs_handle obj, emjs_handle keys, emjs_handle* handles,
+                    emjs_type* types, int maxlen);
+
+// Write the utf8 encoding of up to `maxlen` items from an array of strings
+// back-to-back into `buffer`, and the length of each into `lengths`.
+// Returns the total number of bytes required; if this is greater than
+// `buflen` then nothing is written and the call should be retried with a
+// bigger buffer.
+int emjs_read_strs(emjs_handle obj, char* buffer, int buflen, int* lengths,
+                   int maxlen);
+
+// Create an array from a C array of handles or of doubles.
+emjs_handle emjs_make_array_handles(emjs_handle* handles, int size);
+emjs_handle emjs_make_array_doubles(double* values, int size);
+
+// Access the raw bytes of a typed array, DataView or ArrayBuffer.
+// The typecode is the matching python array module typecode as a char,
+// or zero if the object is not a typed array.
+int emjs_byte_length(emjs_handle obj);
+int emjs_read_bytes(emjs_handle obj, char* buffer, int maxlen);
+int emjs_array_typecode(emjs_handle obj);
+
+// Create a typed array viewing `size` bytes of the heap starting at `ptr`,
+// with element type given by a python array module typecode.  The memory
+// is shared rather than copied, so the view is only valid as long as the
+// underlying C buffer remains allocated.
+emjs_handle emjs_make_heap_view(int typecode, void* ptr, int size);
+
+// Get the heap address viewed by a typed array created over the heap.
+int emjs_heap_offset(emjs_handle obj);
+
 #endif
@@ -27,6 +27,20 @@ var LibraryEMJS = {
     TRUE: 4,
     MAX_STATIC_HANDLE: 4,
 
+    // Slots in the handle table are reused via the free list, so each
+    // handle carries the generation of its slot in its high bits.  Using
+    // a handle after it has been freed can then be detected, rather than
+    // silently referring to whatever value now occupies the slot.
+    INDEX_BITS: 22,
+    INDEX_MASK: 0x3FFFFF,
+    GENERATION_MASK: 0x1FF,
+    generations: [0, 0, 0, 0, 0],
+
+    // Counters for monitoring the size of the handle table.
+    live_handles: 0,
+    peak_handles: 0,
+    stale_frees: 0,
+
     last_error: undefined
 
   },
@@ -45,34 +59,69 @@ var LibraryEMJS = {
     if (value === true) {
       return EMJS.TRUE;
     }
-    var h;
+    var idx;
     if (EMJS.free_handles.length) {
-      h = EMJS.free_handles.pop();
+      idx = EMJS.free_handles.pop();
     } else {
-      h = EMJS.handles.length;
+      idx = EMJS.handles.length;
+      if (idx > EMJS.INDEX_MASK) {
+        throw new Error("too many live emjs handles");
+      }
+      EMJS.generations.push(0);
+    }
+    EMJS.handles[idx] = value;
+    EMJS.live_handles++;
+    if (EMJS.live_handles > EMJS.peak_handles) {
+      EMJS.peak_handles = EMJS.live_handles;
     }
-    EMJS.handles[h] = value;
-    return h;
+    return (EMJS.generations[idx] << EMJS.INDEX_BITS) | idx;
   },
 
   emjs_deref__deps: ['$EMJS'],
   emjs_deref: function(h) {
     h = h|0;
-    //if (h > EMJS.MAX_STATIC_HANDLE && !EMJS.handles.hasOwnProperty(h)) {
-    //  throw new Error("invalid emjs_handle: " + h);
-    //}
-    return EMJS.handles[h];
+    var idx = h & EMJS.INDEX_MASK;
+    if (h > EMJS.MAX_STATIC_HANDLE &&
+        EMJS.generations[idx] !== (h >>> EMJS.INDEX_BITS)) {
+      throw new Error("invalid emjs_handle: " + h);
+    }
+    return EMJS.handles[idx];
   },
 
   emjs_free__deps: ['$EMJS'],
   emjs_free: function(h) {
     h = h|0;
-    //if (h > EMJS.MAX_STATIC_HANDLE && !EMJS.handles.hasOwnProperty(h)) {
-    //  throw new Error("invalid emjs_handle: " + h);
-    //}
     if (h > EMJS.MAX_STATIC_HANDLE) {
-      EMJS.handles[h] = null;
-      EMJS.free_handles.push(h);
+      var idx = h & EMJS.INDEX_MASK;
+      if (EMJS.generations[idx] !== (h >>> EMJS.INDEX_BITS)) {
+        // Already freed.  Don't touch the slot, since it may have
+        // been reused for a different value.
+        EMJS.stale_frees++;
+        return;
+      }
+      EMJS.handles[idx] = undefined;
+      EMJS.generations[idx] = (EMJS.generations[idx] + 1) &
+                              EMJS.GENERATION_MASK;
+      EMJS.free_handles.push(idx);
+      EMJS.live_handles--;
+    }
+  },
+
+  emjs_free_many__deps: ['emjs_free'],
+  emjs_free_many: function(handlesptr, count) {
+    for (var i = 0; i < count; i++) {
+      _emjs_free({{{ makeGetValue('handlesptr', 'i*4', 'i32') }}});
+    }
+  },
+
+  emjs_handle_stat__deps: ['$EMJS'],
+  emjs_handle_stat: function(which) {
+    switch (which) {
+      case 0: return EMJS.live_handles;
+      case 1: return EMJS.peak_handles;
+      case 2: return EMJS.stale_frees;
+      case 3: return EMJS.handles.length;
+      default: return -1;
     }
   },
 
@@ -316,30 +365,35 @@ var LibraryEMJS = {
     } catch (err) { EMJS.last_error = err; return EMJS.ERROR; }
   },
 
-  emjs_typeof__deps: ['$EMJS', 'emjs_deref'],
+  emjs_typeof__deps: ['$EMJS', 'emjs_deref', 'emjs_typeof_value'],
   emjs_typeof: function(h) {
     try {
       var obj = _emjs_deref(h);
-      var typstr = typeof obj;
-      switch (typstr) {
-        case "undefined":
-          return EMJS.TYPE_UNDEFINED;
-        case "boolean":
-          return EMJS.TYPE_BOOLEAN;
-        case "number":
-          return EMJS.TYPE_NUMBER;
-        case "string":
-          return EMJS.TYPE_STRING;
-        case "object":
-          return EMJS.TYPE_OBJECT;
-        case "function":
-          return EMJS.TYPE_FUNCTION;
-        default:
-          throw new Error("unknown typeof string: " + typstr); 
-      }
+      return _emjs_typeof_value(obj);
     } catch (err) { EMJS.last_error = err; return EMJS.TYPE_ERROR; }
   },
 
+  emjs_typeof_value__deps: ['$EMJS'],
+  emjs_typeof_value: function(obj) {
+    var typstr = typeof obj;
+    switch (typstr) {
+      case "undefined":
+        return EMJS.TYPE_UNDEFINED;
+      case "boolean":
+        return EMJS.TYPE_BOOLEAN;
+      case "number":
+        return EMJS.TYPE_NUMBER;
+      case "string":
+        return EMJS.TYPE_STRING;
+      case "object":
+        return EMJS.TYPE_OBJECT;
+      case "function":
+        return EMJS.TYPE_FUNCTION;
+      default:
+        throw new Error("unknown typeof string: " + typstr); 
+    }
+  },
+
   emjs_iter_all__deps: ['emjs_make_handle', 'emjs_deref', 'emjs_free'],
   emjs_iter_all: function(obj_h, fnptr, dataptr) {
     try {
@@ -632,6 +686,209 @@ var LibraryEMJS = {
       i = i + 1;
     }
     return i;
+  },
+
+  // Bulk operations.  These marshal a whole structure through the heap
+  // in a single call, to avoid paying a call (and a handle) per item.
+
+  emjs_read_items__deps: ['emjs_deref', 'emjs_make_handle',
+                          'emjs_typeof_value'],
+  emjs_read_items: function(h, handlesptr, typesptr, maxlen) {
+    try {
+      var obj = _emjs_deref(h);
+      var length = obj.length|0;
+      var i = 0;
+      while (i < length && i < maxlen) {
+        var item = obj[i];
+        var item_h = _emjs_make_handle(item);
+        var typ = _emjs_typeof_value(item);
+        {{{ makeSetValue('handlesptr', 'i*4', 'item_h', 'i32') }}};
+        {{{ makeSetValue('typesptr', 'i*4', 'typ', 'i32') }}};
+        i = i + 1;
+      }
+      return i;
+    } catch (err) { EMJS.last_error = err; return -1; }
+  },
+
+  emjs_read_props__deps: ['emjs_deref', 'emjs_make_handle',
+                          'emjs_typeof_value'],
+  emjs_read_props: function(h, keys_h, handlesptr, typesptr, maxlen) {
+    try {
+      var obj = _emjs_deref(h);
+      var keys = _emjs_deref(keys_h);
+      var i = 0;
+      while (i < keys.length && i < maxlen) {
+        var item = obj[keys[i]];
+        var item_h = _emjs_make_handle(item);
+        var typ = _emjs_typeof_value(item);
+        {{{ makeSetValue('handlesptr', 'i*4', 'item_h', 'i32') }}};
+        {{{ makeSetValue('typesptr', 'i*4', 'typ', 'i32') }}};
+        i = i + 1;
+      }
+      return i;
+    } catch (err) { EMJS.last_error = err; return -1; }
+  },
+
+  emjs_own_keys__deps: ['emjs_deref', 'emjs_make_handle'],
+  emjs_own_keys: function(h) {
+    try {
+      var obj = _emjs_deref(h);
+      var keys = [];
+      for (var prop in obj) {
+        if (!obj.hasOwnProperty(prop)) { continue; }
+        keys.push(prop);
+      }
+      return _emjs_make_handle(keys);
+    } catch (err) { EMJS.last_error = err; return EMJS.ERROR; }
+  },
+
+  emjs_read_strs__deps: ['emjs_deref'],
+  emjs_read_strs: function(h, bufptr, buflen, lengthsptr, maxlen) {
+    try {
+      var obj = _emjs_deref(h);
+      // Encode everything up front, so we can tell the caller how big
+      // a buffer it needs without writing a partial result.
+      var arrays = [];
+      var total = 0;
+      var i = 0;
+      while (i < obj.length && i < maxlen) {
+        var array = intArrayFromString("" + obj[i], true);
+        arrays.push(array);
+        total = total + array.length;
+        i = i + 1;
+      }
+      if (total > buflen) {
+        return total;
+      }
+      var pos = 0;
+      for (i = 0; i < arrays.length; i++) {
+        var array = arrays[i];
+        var length = array.length;
+        {{{ makeSetValue('lengthsptr', 'i*4', 'length', 'i32') }}};
+        for (var j = 0; j < length; j++) {
+          var chr = array[j];
+          {{{ makeSetValue('bufptr', 'pos', 'chr', 'i8') }}};
+          pos = pos + 1;
+        }
+      }
+      return total;
+    } catch (err) { EMJS.last_error = err; return -1; }
+  },
+
+  emjs_make_array_handles__deps: ['emjs_deref', 'emjs_make_handle'],
+  emjs_make_array_handles: function(handlesptr, size) {
+    try {
+      var res = new Array(size);
+      for (var i = 0; i < size; i++) {
+        var item_h = {{{ makeGetValue('handlesptr', 'i*4', 'i32') }}};
+        res[i] = _emjs_deref(item_h);
+      }
+      return _emjs_make_handle(res);
+    } catch (err) { EMJS.last_error = err; return EMJS.ERROR; }
+  },
+
+  emjs_make_array_doubles__deps: ['emjs_make_handle'],
+  emjs_make_array_doubles: function(valuesptr, size) {
+    try {
+      var res = new Array(size);
+      for (var i = 0; i < size; i++) {
+        res[i] = {{{ makeGetValue('valuesptr', 'i*8', 'double') }}};
+      }
+      return _emjs_make_handle(res);
+    } catch (err) { EMJS.last_error = err; return EMJS.ERROR; }
+  },
+
+  emjs_as_bytes__deps: ['emjs_deref'],
+  emjs_as_bytes: function(obj) {
+    if (obj instanceof ArrayBuffer) {
+      return new Uint8Array(obj);
+    }
+    if (ArrayBuffer.isView(obj)) {
+      return new Uint8Array(obj.buffer, obj.byteOffset, obj.byteLength);
+    }
+    throw new TypeError("not a typed array or ArrayBuffer");
+  },
+
+  emjs_byte_length__deps: ['emjs_deref', 'emjs_as_bytes'],
+  emjs_byte_length: function(h) {
+    try {
+      var obj = _emjs_deref(h);
+      return _emjs_as_bytes(obj).length|0;
+    } catch (err) { EMJS.last_error = err; return -1; }
+  },
+
+  emjs_read_bytes__deps: ['emjs_deref', 'emjs_as_bytes'],
+  emjs_read_bytes: function(h, bufptr, maxlen) {
+    try {
+      var bytes = _emjs_as_bytes(_emjs_deref(h));
+      if (bytes.length > maxlen) {
+        bytes = bytes.subarray(0, maxlen);
+      }
+      HEAPU8.set(bytes, bufptr);
+      return bytes.length|0;
+    } catch (err) { EMJS.last_error = err; return -1; }
+  },
+
+  emjs_array_typecode__deps: ['emjs_deref'],
+  emjs_array_typecode: function(h) {
+    // Map typed array types onto python's array module typecodes.
+    var obj = _emjs_deref(h);
+    if (obj instanceof Int8Array) { return 98; }            // 'b'
+    if (obj instanceof Uint8Array) { return 66; }           // 'B'
+    if (obj instanceof Uint8ClampedArray) { return 66; }    // 'B'
+    if (obj instanceof Int16Array) { return 104; }          // 'h'
+    if (obj instanceof Uint16Array) { return 72; }          // 'H'
+    if (obj instanceof Int32Array) { return 105; }          // 'i'
+    if (obj instanceof Uint32Array) { return 73; }          // 'I'
+    if (obj instanceof Float32Array) { return 102; }        // 'f'
+    if (obj instanceof Float64Array) { return 100; }        // 'd'
+    if (obj instanceof ArrayBuffer) { return 66; }          // 'B'
+    if (obj instanceof DataView) { return 66; }             // 'B'
+    return 0;
+  },
+
+  // Views onto the emscripten heap, for sharing memory without copying.
+
+  emjs_typed_array_ctor: function(typecode) {
+    switch (String.fromCharCode(typecode)) {
+      case "b": return Int8Array;
+      case "B": return Uint8Array;
+      case "h": return Int16Array;
+      case "H": return Uint16Array;
+      case "i": return Int32Array;
+      case "I": return Uint32Array;
+      case "l": return Int32Array;
+      case "L": return Uint32Array;
+      case "f": return Float32Array;
+      case "d": return Float64Array;
+      default:
+        throw new TypeError("unsupported typecode: " +
+                            String.fromCharCode(typecode));
+    }
+  },
+
+  emjs_make_heap_view__deps: ['emjs_make_handle', 'emjs_typed_array_ctor'],
+  emjs_make_heap_view: function(typecode, ptr, size) {
+    try {
+      var ctor = _emjs_typed_array_ctor(typecode);
+      var itemsize = ctor.BYTES_PER_ELEMENT;
+      if (ptr % itemsize || size % itemsize) {
+        throw new RangeError("heap view is not aligned to its item size");
+      }
+      var view = new ctor(HEAPU8.buffer, ptr, (size / itemsize)|0);
+      return _emjs_make_handle(view);
+    } catch (err) { EMJS.last_error = err; return EMJS.ERROR; }
+  },
+
+  emjs_heap_offset__deps: ['emjs_deref'],
+  emjs_heap_offset: function(h) {
+    try {
+      var obj = _emjs_deref(h);
+      if (!ArrayBuffer.isView(obj) || obj.buffer !== HEAPU8.buffer) {
+        throw new TypeError("not a view onto the heap");
+      }
+      return obj.byteOffset|0;
+    } catch (err) { EMJS.last_error = err; return -1; }
   }
 
 };
@@ -5,5 +5,16 @@ int jitCompile(char*);
 int jitRecompile(int, char*);
 void jitCopy(int, int);
 int jitInvoke(int, int, int, int);
+void jitTrampoline(int, int);
 void jitFree(int);
+int jitIsReady(int);
+void jitFlushPending(void);
+
+#define JIT_STAT_SYNC_COMPILES 0
+#define JIT_STAT_ASYNC_COMPILES 1
+#define JIT_STAT_FORCED_COMPILES 2
+#define JIT_STAT_SUPERSEDED_COMPILES 3
+#define JIT_STAT_COMPILE_MS 4
+int jitCompileStat(int);
+double jitCompileTime(int);
 